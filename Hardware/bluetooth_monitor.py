@@ -1,17 +1,26 @@
-import serial
+import asyncio
+import os
+import sys
 
-comPort = "/dev/rfcomm0"
-print("Attempting connection to: ", comPort)
-test = 0
+import numpy as np
+
+# Print every packet from one or more meters.
+#   python Hardware/bluetooth_monitor.py                      (/dev/rfcomm0)
+#   python Hardware/bluetooth_monitor.py /dev/rfcomm0 garden=/dev/rfcomm1
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ingest_async import IngestionEngine, parse_ports
+
+
+def show(device_id, timestamps, values, errors):
+    for ts, (flow, temperature, turbidity) in zip(timestamps, values):
+        print(f"{device_id}: {np.datetime_as_string(ts, unit='s')} Flow: {flow} Temperature: {temperature} Turbidity: {turbidity}")
+    if errors:
+        print(f"{device_id}: skipped {errors} malformed line(s)")
+
+
+ports = parse_ports(sys.argv[1:] or ["/dev/rfcomm0"])
+print("Listening on: ", ", ".join(f"{device_id}={port}" for device_id, port in ports.items()))
 try:
-    serialPort = serial.Serial(port=comPort, baudrate=9600, timeout=0, parity=serial.PARITY_EVEN, stopbits=1)
-    print("Connection Successful!")
-    test = 1
-except Exception as e:
-    print("Connection Failed :", e)
-size = 1024
-#serialPort2 = serial.Serial(port='COM6', baudrate=9600, timeout=0, parity=serial.PARITY_EVEN, stopbits=1)
-while test:
-    data = serialPort.readline(size)
-    if data:
-        print(data.decode("utf-8"))
+    asyncio.run(IngestionEngine(ports, on_batch=show).run())
+except KeyboardInterrupt:
+    pass
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import math
+import os
+import pty
+import random
+import sys
+import tty
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import wire
+
+# Stand-in for the Arduino meter: a pseudo-terminal that emits the same
+# packets sketch_feb16d sends over Bluetooth, at a configurable rate.
+# Open meter.port with pyserial (or ingest_async.py) as if it were
+# /dev/rfcomm0. Like the real link, bytes that nobody reads are lost once
+# the tty buffer is full instead of stalling the meter. With binary=True it
+# sends wire.py frames of FRAME_READINGS instead, like WIRE_BINARY=1.
+#
+#   python Hardware/fake_meter.py --count 3 --rate 10
+#   python Hardware/fake_meter.py --count 3 --rate 100 --binary
+
+FRAME_READINGS = 8
+
+
+class FakeMeter:
+    def __init__(self, rate=1.0, seed=None, bad_fraction=0.0, temp_sensor=True, binary=False):
+        self.rate = rate
+        self.binary = binary
+        self.seq = 0
+        self.bad_fraction = bad_fraction
+        self.temp_sensor = temp_sensor
+        self.random = random.Random(seed)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.sent = 0
+        self.lost = 0
+        self._stopped = False
+
+    def reading(self, now):
+        # (flow, temperature or None, turbidity)
+        hour = now.hour + now.minute / 60
+        flow = max(0.0, 5 + 5 * math.sin(2 * math.pi * hour / 24) + self.random.gauss(0, 1))
+        temperature = 15 + self.random.gauss(0, 2) if self.temp_sensor else None
+        return flow, temperature, self.random.randint(60, 100)
+
+    def packet(self, now=None):
+        now = now or datetime.now()
+        flow, temperature, turbidity = self.reading(now)
+        # Same field order and formatting as generate_datetime() + push_data()
+        line = f"Date: {now.strftime('%Y-%m-%d %H-%M-%S')};Flow: {flow:.2f};"
+        if temperature is not None:
+            line += f"Temperature: {temperature:.2f};"
+        else:
+            line += "Error: No DS18B20 sensor detected!;"
+        line += f"Turbidity: {turbidity}\r\n"
+        if self.random.random() < self.bad_fraction:
+            line = line[: self.random.randint(1, len(line) - 3)]  # truncated read
+        return line
+
+    def frame(self, count, now=None):
+        # count readings spaced 1/rate apart, ending now, as one binary frame
+        now = now or datetime.now()
+        times = [now - timedelta(seconds=(count - 1 - i) / self.rate) for i in range(count)]
+        base = int(times[0].timestamp())
+        readings = [self.reading(t) for t in times]
+        data = wire.encode_frame(
+            self.seq, base,
+            [round((t.timestamp() - base) * 1000) for t in times],
+            [r[0] for r in readings],
+            [float("nan") if r[1] is None else r[1] for r in readings],
+            [r[2] for r in readings],
+        )
+        self.seq += 1
+        if self.random.random() < self.bad_fraction:
+            data = data[: self.random.randint(1, len(data) - 1)]  # truncated read
+        return data
+
+    def encode(self, count):
+        if not self.binary:
+            return "".join(self.packet() for _ in range(count)).encode()
+        now = datetime.now()
+        frames, done = [], 0
+        while done < count:
+            n = min(FRAME_READINGS, count - done)
+            done += n
+            frames.append(self.frame(n, now - timedelta(seconds=(count - done) / self.rate)))
+        return b"".join(frames)
+
+    def write(self, data):
+        try:
+            os.write(self.master, data)
+            return True
+        except BlockingIOError:
+            return False
+        except OSError:
+            return False
+
+    async def run(self, duration=None):
+        # Emit on a fixed schedule; at high rates several packets go out per
+        # tick so the event loop isn't woken thousands of times a second
+        loop = asyncio.get_running_loop()
+        tick = max(1.0 / self.rate, 0.01)
+        started = loop.time()
+        due = 0
+        while not self._stopped and (duration is None or loop.time() - started < duration):
+            target = int((loop.time() - started) * self.rate) + 1
+            if target > due:
+                if self.write(self.encode(target - due)):
+                    self.sent += target - due
+                else:
+                    self.lost += target - due
+                due = target
+            await asyncio.sleep(tick)
+
+    def stop(self):
+        self._stopped = True
+
+    def close(self):
+        # Closing the master side looks like the Bluetooth link dropping
+        self.stop()
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+async def _main(args):
+    meters = [FakeMeter(rate=args.rate, seed=i, bad_fraction=args.bad, binary=args.binary) for i in range(args.count)]
+    for meter in meters:
+        print(meter.port, flush=True)
+    try:
+        await asyncio.gather(*(meter.run(args.duration) for meter in meters))
+    finally:
+        for meter in meters:
+            meter.close()
+        print(f"sent={sum(m.sent for m in meters)} lost={sum(m.lost for m in meters)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated HydroMIND meters on pseudo-terminals")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=1.0, help="packets per second per meter")
+    parser.add_argument("--bad", type=float, default=0.0, help="fraction of truncated packets")
+    parser.add_argument("--binary", action="store_true", help="send wire.py frames instead of text lines")
+    parser.add_argument("--duration", type=float, default=None, help="seconds to run (default: forever)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
@@ -6,6 +6,7 @@
 #include <DallasTemperature.h>
 #include <LiquidCrystal.h>
 #include <RTClib.h>
+#include <util/crc16.h>
 
 // define constants
 #define FLOW_SENSOR 12
@@ -16,6 +17,11 @@
 #define BUTTON_PIN 2
 #define DEBOUNCE_DELAY 50 // Debounce time in milliseconds
 
+// 1 = framed binary packets (see wire.py on the host), 0 = the text lines
+#define WIRE_BINARY 0
+#define FRAME_READINGS 8 // readings batched into one frame
+#define WIRE_VERSION 1
+
 // create objects
 SoftwareSerial bluetoothSerial(RX, TX);
 LiquidCrystal lcd(52, 50, 53, 51, 49, 47, 45, 43, 41, 39);
@@ -51,6 +57,20 @@ float tempC;
 long turbidity_raw, water_quality_score;
 int BluetoothData;
 
+// One reading as it goes on the wire, 7 bytes
+struct __attribute__((packed)) Reading {
+  uint16_t dt_ms;      // since the frame's base time
+  uint16_t flow_centi; // 0.01 L/min
+  int16_t temp_centi;  // 0.01 C, INT16_MIN = no sensor
+  uint8_t turbidity;
+};
+
+Reading frame[FRAME_READINGS];
+uint8_t frame_count = 0;
+uint16_t frame_seq = 0;
+uint32_t frame_base;
+unsigned long frame_base_ms;
+
 void buttonISR() {
   // Serial.println("tanveer");
   unsigned long currentTime = millis();
@@ -115,6 +135,54 @@ void push_data() {
 
 }
 
+void queue_reading() {
+  unsigned long now_ms = millis();
+  // dt_ms is 16 bits: after a stall of more than 65.5 s the open frame goes
+  // out first, and this reading starts the next one instead of wrapping
+  if (frame_count > 0 && now_ms - frame_base_ms > 65535UL) {
+    send_frame();
+  }
+  if (frame_count == 0) {
+    frame_base = rtc.now().unixtime();
+    frame_base_ms = now_ms;
+  }
+
+  Reading &r = frame[frame_count++];
+  r.dt_ms = now_ms - frame_base_ms;
+  r.flow_centi = (uint16_t) (flow_rate * 100 + 0.5);
+  r.temp_centi = tempC == -127.00 ? INT16_MIN : (int16_t) lround(tempC * 100);
+  r.turbidity = water_quality_score;
+
+  // A slow loop sends short frames rather than holding readings back
+  if (frame_count == FRAME_READINGS || now_ms - frame_base_ms > 60000) {
+    send_frame();
+  }
+}
+
+void send_frame() {
+  // magic, version, count, seq, base, readings, CRC-16/CCITT (low byte first)
+  uint8_t header[10] = {
+    0xA5, 0x5A, WIRE_VERSION, frame_count,
+    (uint8_t) frame_seq, (uint8_t) (frame_seq >> 8),
+    (uint8_t) frame_base, (uint8_t) (frame_base >> 8),
+    (uint8_t) (frame_base >> 16), (uint8_t) (frame_base >> 24)
+  };
+  const uint8_t *payload = (const uint8_t *) frame;
+  size_t payload_size = frame_count * sizeof(Reading);
+
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < sizeof(header); i++) crc = _crc_xmodem_update(crc, header[i]);
+  for (size_t i = 0; i < payload_size; i++) crc = _crc_xmodem_update(crc, payload[i]);
+
+  bluetoothSerial.write(header, sizeof(header));
+  bluetoothSerial.write(payload, payload_size);
+  bluetoothSerial.write((uint8_t) crc);
+  bluetoothSerial.write((uint8_t) (crc >> 8));
+
+  frame_count = 0;
+  frame_seq++;
+}
+
 void print_lcd(){
   lcd.clear();
   switch(buttonState) {
@@ -219,9 +287,13 @@ void loop() {
 
   print_lcd();
 
+#if WIRE_BINARY
+  queue_reading();
+#else
 	generate_datetime();	
 
   push_data();
+#endif
 
   delay(100);// prepare for next data ...
 }
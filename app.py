@@ -1,106 +1,102 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import pickle
-import plotly.graph_objects as go
-from prophet import Prophet
-from datetime import datetime, timedelta
-import openai
+from datetime import timedelta
 import os
+import threading
 import time 
-import serial
-import re
-openai_api_key = os.getenv("OPENAI_API_KEY")
-openai.api_key = openai_api_key
-
-from serial.serialutil import SerialException
-
+import storage
+import rollups
+import packets
+import downsample
+import detectors
+import metrics
+import wire
+from query_cache import QueryCache
+from ring_buffer import RingBuffer
+from segment_log import SegmentLog, Compactor
+# Prophet, OpenAI, plotly and pyserial are imported by the tab that uses them
+# (projection.py, usb_init), so a cold start only pays for what it shows.
+# benchmarks/import_report.py measures the difference.
+
+DATA_CSV = "1_year_data.csv"
+DATA_STORE = storage.store_path("1_year_data")
+ROLLUP_DIR = storage.store_path("1_year_data_rollups")
+REALTIME_WINDOW_SAMPLES = 3600
+REALTIME_FPS = 2
+REALTIME_MAX_BATCH = 5000
+SERIAL_PORT = os.getenv("HYDROMIND_SERIAL_PORT", "/dev/rfcomm0")
+SERIAL_QUEUE_SIZE = 10000
+LIVE_LOG_DIR = storage.store_path("live")
+LIVE_DEVICE_ID = "dashboard"
+
+
+def data_version():
+    # The raw store version the published rollups were built from. The
+    # compactor publishes it last, after the store, the change log and the
+    # rollups are all updated, so a rerun in the middle of a compaction
+    # keeps the previous version instead of seeing the store move first
+    manifest = rollups.read_manifest(ROLLUP_DIR)
+    return manifest["version"] if manifest else None
+
+# The date range, rollups and baselines are cached as shared resources, not
+# data: every session gets the same read-only objects instead of its own
+# unpickled copy. Nothing below modifies them.
+@st.cache_resource
+def conversion_lock():
+    # One conversion at a time, however many sessions notice the CSV changed
+    return threading.Lock()
+
+def ensure_store():
+    # The CSV is converted to the partitioned Parquet store on first use,
+    # and again whenever it is replaced by a newer export; samples compacted
+    # from the live log are carried over (storage.convert_csv). The rollups
+    # are rebuilt here after a conversion; after that the compactor keeps
+    # them current. A store changed by hand: python rollups.py <store>
+    with conversion_lock():
+        converted = storage.needs_conversion(DATA_CSV, DATA_STORE)
+        if converted:
+            storage.convert_csv(DATA_CSV, DATA_STORE)
+        if storage.store_exists(DATA_STORE) and (converted or not rollups.rollups_exist(ROLLUP_DIR)):
+            rollups.load_or_build(DATA_STORE, ROLLUP_DIR)
+    if not storage.store_exists(DATA_STORE):
+        st.error(f"File '{DATA_CSV}' not found. Please ensure the file exists.")
+        st.stop()
+
+@st.cache_resource(max_entries=2)
+def load_data(version=None):
+    # First and last sample time: only the footers of the first and last
+    # month are read, so a compaction costs a few file opens here
+    return storage.time_bounds(DATA_STORE)
+
+@st.cache_resource(max_entries=2)
+def load_rollups(version=None):
+    # 10-minute / hourly / 12-hour / daily bins as last published; never
+    # built here, so a rerun can't race the compactor over a rebuild
+    return rollups.load_rollups(ROLLUP_DIR)
+
+@st.cache_resource(max_entries=2)
+def load_baselines(version=None):
+    # Per-frame means and percentiles over the whole history (stats.py),
+    # saved alongside the rollups
+    return rollups.load_stats(ROLLUP_DIR)
 
 @st.cache_resource
-def load_prophet_model():
-    with open("./prediction/prophet_model.pkl", "rb") as f:
-        model = pickle.load(f)
-    return model
-
-@st.cache_data
-def load_historical_data():
-    # Load the daily aggregated CSV and resample to monthly totals
-    df_daily = pd.read_csv("daily_aggregated.csv", parse_dates=["timestamp"])
-    df_daily.set_index("timestamp", inplace=True)
-    monthly_data = df_daily.resample("M").agg({"daily_liters_sum": "sum"})
-    monthly_data.reset_index(inplace=True)
-    monthly_data.rename(columns={"timestamp": "ds", "daily_liters_sum": "y"}, inplace=True)
-    return monthly_data
-
-def create_forecast_chart(monthly_data, forecast):
-    last_hist_date = monthly_data['ds'].max()
-    forecast_future = forecast[forecast['ds'] > last_hist_date]
-    historical_trace = go.Scatter(
-        x=monthly_data['ds'],
-        y=monthly_data['y'],
-        mode='lines+markers',
-        name='Historical',
-        line=dict(color='blue')
-    )
-    forecast_trace = go.Scatter(
-        x=forecast_future['ds'],
-        y=forecast_future['yhat'],
-        mode='lines+markers',
-        name='Forecast',
-        line=dict(color='red')
-    )
-    ci_trace = go.Scatter(
-        x=forecast_future['ds'].tolist() + forecast_future['ds'][::-1].tolist(),
-        y=forecast_future['yhat_upper'].tolist() + forecast_future['yhat_lower'][::-1].tolist(),
-        fill='toself',
-        fillcolor='rgba(255, 0, 0, 0.2)',
-        line=dict(color='rgba(255,255,255,0)'),
-        hoverinfo="skip",
-        showlegend=True,
-        name='Confidence Interval'
-    )
-    fig = go.Figure(data=[historical_trace, forecast_trace, ci_trace])
-    fig.update_layout(
-        title="Historical Water Usage & 2-Year Forecast",
-        xaxis_title="Date",
-        yaxis_title="Monthly Water Usage (Liters)",
-        template="plotly_white"
+def query_cache():
+    # One per process: sessions looking at the same window share the result
+    return QueryCache(changes=lambda: rollups.read_changes(ROLLUP_DIR))
+
+def aggregate_data(rollup_tables, date, type, end_date=None, stat="mean"):
+    # Each view reads precomputed bins instead of grouping the raw samples
+    return rollups.read_view(rollup_tables, type, date, end_date, stat)
+
+def historical_data(rollup_tables, date, type, end_date, version):
+    # Mean bins and litres of one view, cached until samples land in its window
+    level, start, end = rollups.view_range(type, date, end_date)
+    return query_cache().get_or_compute(
+        ("historical", level, start, end), start, end, version,
+        lambda: (aggregate_data(rollup_tables, date, type, end_date),
+                 aggregate_data(rollup_tables, date, type, end_date, stat="sum")["volume_l"].sum()),
     )
-    return fig
-
-
-
-def load_data():
-    try:
-        data = pd.read_csv("1_year_data.csv")
-        data['timestamp'] = pd.to_datetime(data['timestamp'], format="%Y-%m-%d %H:%M:%S")
-        return data
-    except FileNotFoundError:
-        st.error("File '1_year_data.csv' not found. Please ensure the file exists.")
-        return pd.DataFrame()
-
-def aggregate_data(data, date, type):
-    if type == "Daily":
-        daily_data = data[data['timestamp'].dt.date == date]
-        numeric_columns = daily_data.select_dtypes(include=[np.number]).columns
-        return daily_data.groupby(pd.Grouper(key='timestamp', freq='10min'))[numeric_columns].mean().reset_index()
-    
-    elif type == "Weekly":
-        start_of_week = date - pd.Timedelta(days=date.weekday()) 
-        end_of_week = start_of_week + pd.Timedelta(days=6)  
-      
-        weekly_data = data[(data['timestamp'].dt.date >= start_of_week) & (data['timestamp'].dt.date <= end_of_week)]
- 
-        numeric_columns = weekly_data.select_dtypes(include=[np.number]).columns
-        return weekly_data.groupby(pd.Grouper(key='timestamp', freq='H'))[numeric_columns].mean().reset_index()
-    
-    elif type == "Monthly":
-        
-        monthly_data = data[(data['timestamp'].dt.year == date.year) & (data['timestamp'].dt.month == date.month)]
-        
-        numeric_columns = monthly_data.select_dtypes(include=[np.number]).columns
-    
-        return monthly_data.groupby(pd.Grouper(key='timestamp', freq='12H'))[numeric_columns].mean().reset_index()
 
 def plots(title, y_axis, time, data, y):
     st.subheader(title)
@@ -108,91 +104,28 @@ def plots(title, y_axis, time, data, y):
         'time': time,
         y_axis: data[y]
     }).set_index('time')
-    st.line_chart(chart_data)
+    # Only as many points as the chart can show, peaks kept
+    with metrics.stage("chart"):
+        st.line_chart(downsample.downsample_frame(chart_data, chart_points, chart_method))
     st.markdown("<br><br>", unsafe_allow_html=True)
 
-# --- Caching functions for efficiency ---
-@st.cache_resource
-def load_prophet_model():
-    with open("./prediction/prophet_model.pkl", "rb") as f:
-        model = pickle.load(f)
-    return model
-
-@st.cache_data
-def load_historical_data():
-    # Load the daily aggregated CSV and resample to monthly totals
-    df_daily = pd.read_csv("daily_aggregated.csv", parse_dates=["timestamp"])
-    df_daily.set_index("timestamp", inplace=True)
-    monthly_data = df_daily.resample("M").agg({"daily_liters_sum": "sum"})
-    monthly_data.reset_index(inplace=True)
-    monthly_data.rename(columns={"timestamp": "ds", "daily_liters_sum": "y"}, inplace=True)
-    return monthly_data
-
-def create_forecast_chart(monthly_data, forecast):
-    last_hist_date = monthly_data['ds'].max()
-    forecast_future = forecast[forecast['ds'] > last_hist_date]
-    historical_trace = go.Scatter(
-        x=monthly_data['ds'],
-        y=monthly_data['y'],
-        mode='lines+markers',
-        name='Historical',
-        line=dict(color='blue')
-    )
-    forecast_trace = go.Scatter(
-        x=forecast_future['ds'],
-        y=forecast_future['yhat'],
-        mode='lines+markers',
-        name='Forecast',
-        line=dict(color='red')
-    )
-    ci_trace = go.Scatter(
-        x=forecast_future['ds'].tolist() + forecast_future['ds'][::-1].tolist(),
-        y=forecast_future['yhat_upper'].tolist() + forecast_future['yhat_lower'][::-1].tolist(),
-        fill='toself',
-        fillcolor='rgba(255, 0, 0, 0.2)',
-        line=dict(color='rgba(255,255,255,0)'),
-        hoverinfo="skip",
-        showlegend=True,
-        name='Confidence Interval'
-    )
-    fig = go.Figure(data=[historical_trace, forecast_trace, ci_trace])
-    fig.update_layout(
-        title="Historical Water Usage & 2-Year Forecast",
-        xaxis_title="Date",
-        yaxis_title="Monthly Water Usage (Liters)",
-        template="plotly_white"
-    )
-    return fig
-
-def Historical(df_filtered,time_frame):
+def Historical(df_filtered,time_frame,days=1,volume=0.0,baselines=None):
 
     col1, col2 = st.columns([1, 1])
     #flow_total = df_filtered["flow_rate"].sum()
 
-    settings = {
-        "Temperature": {"average": 19.67, "range": (5, 15)},
-        "Flow_rate": {"average": 5.03, "range": (0, 150)},
-        "Purity": {"average": 79.67, "range": (60, 100)},
-    }
-    flow_avg = df_filtered["flow_rate"].mean()
-    temp_avg = df_filtered["temperature"].mean()
-    purity_avg = df_filtered["purity"].mean()
-    
+    # Typical period of the same length over the whole history; a custom
+    # range is compared with the typical day times its length
+    baseline = baselines.loc["Daily" if time_frame == "Custom" else time_frame]
+    scale = days if time_frame == "Custom" else 1
+
     flow_avg = df_filtered["flow_rate"].mean()
     temp_avg = df_filtered["temperature"].mean()
     purity_avg = df_filtered["purity"].mean()
 
-
-    temperature_range = settings["Temperature"]["average"]
-    flow_rate_range = settings["Flow_rate"]["average"]
-    purity_range = settings["Purity"]["average"]
-# Define the labels and corresponding average values
-    metrics = ["Temperature", "Flow Rate", "Purity"]
-    averages = [temp_avg, flow_avg, purity_avg]
-
     bar_data = pd.DataFrame({
     f"{time_frame} Average": [temp_avg, flow_avg, purity_avg],
-    "Overall_Average":[temperature_range, flow_rate_range, purity_range]
+    "Overall_Average":[baseline["temperature_mean"], baseline["flow_rate_mean"], baseline["purity_mean"]]
     }, index=["Temperature", "Flow Rate", "Purity"])
 
     with col1:
@@ -203,8 +136,10 @@ def Historical(df_filtered,time_frame):
         st.subheader("Historical Insights")
         st.bar_chart(bar_data)
     st.subheader("Cost Analysis")
-    current_volume = calculate_vol(flow_avg, time_frame)
-    average_volume = calculate_vol(flow_rate_range, time_frame)
+    # Litres integrated from the samples, against the typical period's litres
+    current_volume = volume
+    average_volume = baseline["volume_l_mean"] * scale
+    typical_range = f"Typical range (10th-90th percentile): {baseline['volume_l_p10'] * scale:,.0f} - {baseline['volume_l_p90'] * scale:,.0f} L"
     current_cost = current_volume* 0.0023173
     average_cost = average_volume* 0.0023173
     col3, col4, col5, col6 = st.columns(4)
@@ -213,7 +148,7 @@ def Historical(df_filtered,time_frame):
         st.metric(label=f"{time_frame} Volume (L)", value=f"{current_volume:.2f}", delta=f"{current_volume - average_volume:.2f} L")
 
     with col4:
-        st.metric(label="Average Volume (L)", value=f"{average_volume:.2f}")
+        st.metric(label="Average Volume (L)", value=f"{average_volume:.2f}", help=typical_range)
 
     with col5:
         st.metric(label=f"{time_frame} Cost ($)", value=f"${current_cost:.4f}", delta=f"${current_cost - average_cost:.4f}")
@@ -223,67 +158,55 @@ def Historical(df_filtered,time_frame):
 
     
 
-def calculate_vol(val, time_frame):
-    if time_frame == 'Daily':
-        return day_vol(val)
-    if time_frame == 'Weekly':
-        return week_vol(val)
-    if time_frame == "Monthly":
-        return month_vol(val)
-
-
-def day_vol(val):
-    return val*86.4
-def week_vol(val):
-    return val*604.8
-def month_vol(val):
-    return val*2.628*10**3     
+@st.cache_resource
+def open_live_log():
+    # One log per process; the compactor folds closed segments into the
+    # historical store and rollups in the background
+    live_log = SegmentLog(os.path.join(LIVE_LOG_DIR, LIVE_DEVICE_ID))
+    Compactor(LIVE_LOG_DIR, DATA_STORE, ROLLUP_DIR).start()
+    return live_log
 
 def usb_init():
-    comPort = "/dev/rfcomm0"
-    print("Attempting connection to: ", comPort)
-    test = 0
-    try:
-        serialPort = serial.Serial(port=comPort, baudrate=9600, timeout=0, parity=serial.PARITY_EVEN, stopbits=1)
-        print("Connection Successful!")
-        return serialPort
-    except Exception as e:
-        print("Connection Failed :(")
-    return -1
-
-def read_from_usb(connection):
-    size = 1024
-    if connection != -1:
-        try:
-            data = connection.readline(size)
-            if data:
-                return data.decode('utf-8', errors='ignore')  # Decode bytes to string
-            else:
-                return None
-        except SerialException as e:
-            print(f"SerialException: {e}")
-            return None
-    return None
-
-def parse_data_packet(packet):
-    parts = packet.split(';')
-
-# Extract each value based on the structure of the string
-    date = parts[0].split(":")[1].strip()
-    flow = float(parts[1].split(":")[1].strip())
-    temperature = float(parts[2].split(":")[1].strip())
-    turbidity = float(parts[3].split(":")[1].strip())
-
-
-    date_time = datetime.strptime(date, "%Y-%m-%d %H-%M-%S")
-
-
-    return date_time, flow, temperature, turbidity
-
-def Real_Time():
+    # One reader thread per session; reruns reuse it instead of reopening the port
+    from serial_reader import SerialReader
+    reader = st.session_state.get("serial_reader")
+    if reader is None or not reader.is_alive():
+        reader = SerialReader(SERIAL_PORT, maxsize=SERIAL_QUEUE_SIZE, raw=True)
+        reader.start()
+        st.session_state["serial_reader"] = reader
+    return reader
+
+def debug_panel(placeholder, downloads=True):
+    # Stage timings, counters and gauges collected so far (metrics.py). The
+    # Real Time loop redraws it without the downloads: a widget can't be
+    # created twice in one run.
+    with placeholder.container():
+        table = metrics.stage_table()
+        if table:
+            st.dataframe(pd.DataFrame(table).set_index("stage").drop(columns="total_s").round(2))
+        else:
+            st.caption("No stages timed yet")
+        snapshot = metrics.snapshot()
+        for item in snapshot["counters"] + snapshot["gauges"]:
+            labels = ", ".join(f"{k}={v}" for k, v in item["labels"].items())
+            st.caption(f"{item['name']}{f' ({labels})' if labels else ''}: {item['value']:,.0f}")
+        cache = query_cache().stats()
+        st.caption(f"Query cache: {cache['hit_ratio']:.0%} hits ({cache['hits']:,} of {cache['hits'] + cache['misses']:,}), "
+                   f"{cache['entries']} entries, {cache['bytes'] / 2**20:.1f} of {cache['budget_bytes'] / 2**20:.0f} MB, "
+                   f"{cache['evictions']} evicted, {cache['invalidations']} invalidated")
+        if downloads:
+            st.download_button("Prometheus text", metrics.prometheus_text(), file_name="hydromind_metrics.prom", mime="text/plain")
+            st.download_button("JSON lines", metrics.jsonl_line(), file_name="hydromind_metrics.jsonl", mime="application/json")
+
+def Real_Time(window_samples=REALTIME_WINDOW_SAMPLES, window_minutes=None, redraw_fps=REALTIME_FPS,
+              chart_points=downsample.CHART_POINTS, chart_method="lttb", debug_placeholder=None):
     #st.title("Real-Time Data Visualization")
-    columns = ['timestamp', 'flow_rate', 'temperature', 'turbidity']
-    data = pd.DataFrame(columns=columns)
+    # Only the newest window_samples (and at most window_minutes) are kept
+    max_age = pd.Timedelta(minutes=window_minutes) if window_minutes else None
+    data = RingBuffer(packets.COLUMNS, window_samples, max_age=max_age)
+    parse_errors = 0
+    # Raw bytes from the link: binary frames or text lines, whichever the sketch sends
+    decoder = wire.Decoder()
     
 
     col1, col2, col3 = st.columns(3)  
@@ -292,57 +215,94 @@ def Real_Time():
     chart_placeholder1 = col1.empty()
     chart_placeholder2 = col2.empty()
     chart_placeholder3 = col3.empty()
+    status_placeholder = st.empty()
+    alert_placeholder = st.empty()
+    # Leak and turbidity detectors, run on every batch as it arrives
+    monitor = detectors.Monitor(detectors.load_config())
 
-    connection = usb_init()
+    reader = usb_init()
+    live_log = open_live_log()
+    frame_interval = 1.0 / redraw_fps
+    packets_seen, rate_since = 0, time.monotonic()
 
     while True:
-        raw_data = read_from_usb(connection)
-        if raw_data is None:  # Check if raw_data is None
-            continue  # Skip the rest of the loop if no data is available
-        
-        date_time, flow_rate, temperature, turbidity = parse_data_packet(raw_data)
-
-        new_row = {
-            'timestamp': date_time,
-            'flow_rate': flow_rate,
-            'temperature': temperature,
-            'turbidity': turbidity
-        }
-        data = pd.concat([data, pd.DataFrame([new_row])], ignore_index=True)
-
-
-        # Convert timestamp column to index for plotting
-        data_indexed = data.set_index('timestamp')
-
-        # Update each chart separately
-        
-        chart_placeholder1.line_chart(data_indexed[['flow_rate']])
-        chart_placeholder2.line_chart(data_indexed[['temperature']])
-        chart_placeholder3.line_chart(data_indexed[['turbidity']])
-
-        time.sleep(1)
+        frame_start = time.monotonic()
+
+        # Take whatever the reader thread has queued since the last frame
+        metrics.gauge("queue_depth", reader.depth())
+        chunks = reader.drain(REALTIME_MAX_BATCH)
+        with metrics.stage("realtime_parse"):
+            timestamps, values, errors = decoder.feed(b"".join(chunks))
+        with metrics.stage("realtime_append"):
+            data.extend(timestamps, values)
+            live_log.append(timestamps, values)
+        metrics.inc("packets_total", len(timestamps))
+        metrics.inc("parse_errors_total", errors)
+        packets_seen += len(timestamps)
+        parse_errors += errors
+        if errors or decoder.stats["frames_lost"]:
+            status_placeholder.caption(f"Skipped {parse_errors} malformed packet(s), {decoder.stats['frames_lost']} frame(s) lost on the link")
+        with metrics.stage("realtime_detect"):
+            new_alerts = monitor.process(LIVE_DEVICE_ID, timestamps, values)
+        if new_alerts:
+            recent = list(monitor.alerts)[-3:]
+            alert_placeholder.error("\n\n".join(f"{pd.Timestamp(a['time']):%H:%M:%S} {a['message']}" for a in reversed(recent)))
+
+        if len(timestamps):
+            # Timestamp-indexed view over the buffer for plotting
+            data_indexed = data.frame()
+
+            # Update each chart separately, downsampled to the chart's resolution
+            with metrics.stage("realtime_charts"):
+                for placeholder, column in ((chart_placeholder1, 'flow_rate'), (chart_placeholder2, 'temperature'), (chart_placeholder3, 'turbidity')):
+                    placeholder.line_chart(downsample.downsample_frame(data_indexed[[column]], chart_points, chart_method))
+
+        if debug_placeholder is not None and frame_start - rate_since >= 1.0:
+            metrics.gauge("packets_per_s", packets_seen / (frame_start - rate_since))
+            metrics.gauge("frames_lost", decoder.stats["frames_lost"])
+            packets_seen, rate_since = 0, frame_start
+            debug_panel(debug_placeholder, downloads=False)
+
+        # Sleep out the rest of the frame; packets keep queueing meanwhile
+        time.sleep(max(0.0, frame_interval - (time.monotonic() - frame_start)))
 
 
     
 
-df = load_data()
+with metrics.stage("load_data"):
+    ensure_store()
+    version = data_version()
+    first_time, last_time = load_data(version)
+with metrics.stage("load_rollups"):
+    rollup_tables = load_rollups(version)
 
 
 with st.sidebar:
     st.title("HydroMIND Dashboard")
     st.header("⚙️ Settings")
-    max_date = df['timestamp'].max().date()
+    max_date = last_time.date()
     default_start_date = max_date - timedelta(days=365)  # Show a year by default
 
     chart_selection = st.selectbox("Select a chart type", ("Real Time", "Historical", "Projection"))
-
-    start_date = default_start_date
-    time_frame = "Daily"
-    df_filtered = aggregate_data(df, start_date, time_frame)
+    with st.expander("Chart detail"):
+        chart_points = st.number_input("Points per chart (0 = all)", min_value=0, max_value=100000, value=downsample.CHART_POINTS, step=100)
+        chart_method = {"LTTB": "lttb", "Min/max": "minmax"}[st.radio("Downsampling", ("LTTB", "Min/max"), horizontal=True)]
+    with st.expander("Debug"):
+        # The collector is process-wide and set at startup (HYDROMIND_METRICS=1);
+        # the checkbox only shows this session its numbers
+        debug_placeholder = None
+        if not metrics.enabled:
+            st.caption("Timing hooks are off; start the app with HYDROMIND_METRICS=1")
+        elif st.checkbox("Show timings", key="show_timings"):
+            debug_placeholder = st.empty()
 
 if chart_selection == "Real Time":
     st.markdown("<h1 style='text-align: center;'>Water monitor real time statistics</h1>", unsafe_allow_html=True)
-    Real_Time()
+    with st.sidebar:
+        window_samples = st.number_input("Window (samples)", min_value=10, max_value=100000, value=REALTIME_WINDOW_SAMPLES, step=100)
+        window_minutes = st.number_input("Window (minutes, 0 = no limit)", min_value=0, max_value=1440, value=0)
+        redraw_fps = st.slider("Redraw rate (frames/s)", min_value=1, max_value=10, value=REALTIME_FPS)
+    Real_Time(window_samples, window_minutes, redraw_fps, chart_points, chart_method, debug_placeholder)
 
 
 
@@ -356,16 +316,29 @@ if chart_selection == "Projection":
     show_ai_insights = st.sidebar.checkbox("Show AI-generated Insights", value=True)
     
 
-    monthly_data = load_historical_data()
-    model = load_prophet_model()
+    import projection
+    # Meters fitted by prediction/batch_train.py, if any
+    models_version = projection.model_store.latest_version()
+    meter = "This household"
+    if models_version is not None:
+        meter = st.sidebar.selectbox("Meter", ["This household"] + projection.meter_ids(models_version))
+
+    engine = st.sidebar.selectbox("Forecast engine", list(projection.ENGINES))
+
+    with metrics.stage("forecast"):
+        if meter == "This household":
+            monthly_data = projection.load_historical_data()
+            if engine == "Prophet":
+                forecast = projection.load_forecast(projection.model_fingerprint(os.path.getmtime(projection.MODEL_PATH)), horizon_months)
+        else:
+            monthly_data, forecast = projection.load_meter_forecast(models_version, meter, horizon_months)
+        if engine != "Prophet":
+            forecast = projection.fast_forecast(projection.ENGINES[engine], monthly_data, horizon_months)
     
 
-    future = model.make_future_dataframe(periods=horizon_months, freq='M')
-    forecast = model.predict(future)
-    
-
-    fig = create_forecast_chart(monthly_data, forecast)
-    st.plotly_chart(fig, use_container_width=True)
+    with metrics.stage("forecast_chart"):
+        fig = projection.create_forecast_chart(monthly_data, forecast)
+        st.plotly_chart(fig, use_container_width=True)
     
 #     # 2. Display AI-driven insights with increased font size for better readability
     if show_ai_insights:
@@ -381,17 +354,17 @@ if chart_selection == "Projection":
             "for encouraging water conservation and responsible water usage. "
             "Mention common household factors such as parents being at work or children at home if applicable."
         )
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful and friendly water usage advisor."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.7
-        )
-        insights = response.choices[0].message.content.strip()
-        st.markdown(f"<div style='font-size:18px;'>{insights}</div>", unsafe_allow_html=True)
+        # Generated in the background; the placeholder is filled in once the
+        # rest of the page has rendered
+        insights_started = time.perf_counter()
+        service = projection.insights_service()
+        insights_job = service.request(prompt)
+        if service.backend.name == "stub":
+            # Without OPENAI_API_KEY the advice comes from canned tips; say so
+            # rather than pass it off as AI-generated
+            st.caption("Sample advice from the offline stub, not AI-generated: "
+                       "set OPENAI_API_KEY to get personalized insights.")
+        insights_placeholder = st.empty()
     
     # 3. Display the comparison table (wider, using container width)
     st.markdown("#### Recent Historical vs. Forecasted Water Usage")
@@ -406,14 +379,31 @@ if chart_selection == "Projection":
     
     html_bytes = fig.to_html(full_html=False, include_plotlyjs='cdn')
     st.download_button("Download Forecast Chart HTML", html_bytes, file_name="forecast_chart.html", mime="text/html")
+
+    # 5. Stream the advice into its placeholder as it arrives
+    if show_ai_insights:
+        while not insights_job.done.wait(0.2):
+            insights_placeholder.markdown(f"<div style='font-size:18px;'>{insights_job.text()} ▌</div>", unsafe_allow_html=True)
+        metrics.observe("insights", time.perf_counter() - insights_started)
+        if insights_job.error is not None:
+            insights_placeholder.warning(f"Insights unavailable: {insights_job.error}")
+        else:
+            insights_placeholder.markdown(f"<div style='font-size:18px;'>{insights_job.text()}</div>", unsafe_allow_html=True)
     
 if chart_selection == "Historical":
     st.markdown("<h1 style='text-align: center;'>Water monitor historical statistics</h1>", unsafe_allow_html=True)
     with st.sidebar:
-        start_date = st.date_input("Start date", default_start_date, min_value=df['timestamp'].min().date(), max_value=max_date)
-        time_frame = st.selectbox("Select time frame", ("Daily", "Weekly", "Monthly"))
-    
-    Historical(df_filtered,time_frame)
+        start_date = st.date_input("Start date", default_start_date, min_value=first_time.date(), max_value=max_date)
+        time_frame = st.selectbox("Select time frame", ("Daily", "Weekly", "Monthly", "Custom"))
+        end_date = None
+        if time_frame == "Custom":
+            end_date = st.date_input("End date", min(start_date + timedelta(days=6), max_date), min_value=start_date, max_value=max_date)
+
+    with metrics.stage("aggregate"):
+        df_filtered, volume = historical_data(rollup_tables, start_date, time_frame, end_date, version)
+    days = (end_date - start_date).days + 1 if end_date else 1
+    with metrics.stage("historical"):
+        Historical(df_filtered,time_frame,days,volume,load_baselines(version))
 
 
 
@@ -431,4 +421,7 @@ st.markdown("""
         padding: 20px !important;
     }
     </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+if debug_placeholder is not None:
+    debug_panel(debug_placeholder)
\ No newline at end of file
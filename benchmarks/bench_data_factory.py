@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prediction"))
+import data_factory
+
+# Rows/sec for the original row-wise data_factory.py loop body vs the vectorized
+# generator, both writing CSV. python benchmarks/bench_data_factory.py --days 3
+
+
+def legacy_seasonal_factor(m):
+    if m in [6, 7, 8]:
+        return 1.2
+    elif m in [12, 1, 2]:
+        return 0.9
+    else:
+        return 1.0
+
+
+def legacy_chunk(current, next_month, output_file):
+    # The per-month body of the original script
+    timestamps = pd.date_range(start=current, end=next_month - pd.Timedelta(seconds=1), freq='s')
+    df = pd.DataFrame({'timestamp': timestamps})
+    df['hour_fraction'] = df['timestamp'].dt.hour + df['timestamp'].dt.minute / 60 + df['timestamp'].dt.second / 3600
+    df['daily_pattern'] = (np.sin(2 * np.pi * (df['hour_fraction'] / 24)) +
+                           0.5 * np.sin(2 * np.pi * ((df['hour_fraction'] - 8) / 24)))
+    df['month'] = df['timestamp'].dt.month
+    df['seasonal_factor'] = df['month'].apply(legacy_seasonal_factor)
+    df['day_of_week'] = df['timestamp'].dt.dayofweek
+    df['weekend_factor'] = df['day_of_week'].apply(lambda x: 0.95 if x >= 5 else 1.0)
+    df['noise'] = np.random.normal(0, 1, size=len(df))
+    df['flow_rate'] = 5 + 5 * df['daily_pattern'] * df['seasonal_factor'] * df['weekend_factor'] + df['noise']
+    df['flow_rate'] = df['flow_rate'].clip(lower=0)
+    df['timestamp'] = df['timestamp'].dt.strftime("%Y-%m-%d:%H:%M:%S")
+    df['day_type'] = df['timestamp'].apply(lambda ts: "Weekend"
+                                           if pd.to_datetime(ts, format="%Y-%m-%d:%H:%M:%S").dayofweek >= 5
+                                           else "Weekday")
+    df[['timestamp', 'flow_rate', 'day_type', 'month']].to_csv(output_file, index=False)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=2, help="days for the legacy run (it is slow)")
+    parser.add_argument("--new-days", type=int, default=62, help="days for the vectorized run")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = pd.Timestamp("2024-01-01")
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        rows = legacy_chunk(start, start + pd.Timedelta(days=args.days), os.path.join(tmp, "legacy.csv"))
+        legacy_rate = rows / (time.perf_counter() - t0)
+        print(f"legacy     : {rows:>12,} rows  {legacy_rate:12,.0f} rows/s")
+
+        end = start + pd.Timedelta(days=args.new_days - 1)
+        t0 = time.perf_counter()
+        rows = data_factory.generate(start, end, os.path.join(tmp, "new.csv"), workers=args.workers)
+        new_rate = rows / (time.perf_counter() - t0)
+        print(f"vectorized : {rows:>12,} rows  {new_rate:12,.0f} rows/s  (x{new_rate / legacy_rate:,.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+from streamlit import dataframe_util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import downsample
+from synthetic import sensor_history
+
+# Bytes one line chart sends to the browser (the Arrow payload st.line_chart
+# serializes) with and without downsampling, for Real Time windows and
+# Historical ranges. python benchmarks/bench_downsample.py --points 800
+
+
+def payload_bytes(df):
+    return len(dataframe_util.convert_pandas_df_to_arrow_bytes(df))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=downsample.CHART_POINTS)
+    args = parser.parse_args()
+
+    live = sensor_history(1, period_s=1).set_index("timestamp")
+    history = sensor_history(5 * 365, period_s=3600).set_index("timestamp").resample("D").mean()
+    cases = [
+        ("real time, 3,600 samples", live[["flow_rate"]].iloc[:3600]),
+        ("real time, 36,000 samples", live[["flow_rate"]].iloc[:36000]),
+        ("real time, 86,400 samples", live[["flow_rate"]]),
+        ("historical, 1 year daily", history[["flow_rate"]].iloc[-365:]),
+        ("historical, 5 years daily", history[["flow_rate"]]),
+    ]
+
+    print(f"target {args.points} points per chart")
+    print(f"{'':28s} {'rows':>8s} {'full':>10s} {'method':>7s} {'rows':>6s} {'bytes':>9s} {'ratio':>6s} {'time':>8s}")
+    for label, frame in cases:
+        full = payload_bytes(frame)
+        for method in downsample.METHODS:
+            t0 = time.perf_counter()
+            reduced = downsample.downsample_frame(frame, args.points, method)
+            elapsed = time.perf_counter() - t0
+            small = payload_bytes(reduced)
+            print(f"{label:28s} {len(frame):8,d} {full:10,d} {method:>7s} {len(reduced):6,d} {small:9,d} "
+                  f"{full / small:5.1f}x {elapsed * 1000:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
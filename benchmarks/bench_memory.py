@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import rollups
+import storage
+from query_cache import sizeof
+from synthetic import sensor_history
+
+# Resident memory of the history as N concurrent sessions see it, each
+# scenario in a fresh interpreter (numbers from /proc/self/status, after
+# every session has read the date range and one day's Historical view):
+#   float64 per session   load_data before: st.cache_data hands every
+#                         session its own unpickled float64 copy of the
+#                         raw samples
+#   rollups shared        what the app holds now: the rollup levels and
+#                         baselines (st.cache_resource, one object for all
+#                         sessions) and the date range from storage.time_bounds
+# python benchmarks/bench_memory.py --days 30 --sessions 4   (float64 costs ~0.9 GB per session-year)
+
+SCENARIOS = ["float64 per session", "rollups shared"]
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def child(scenario, store, sessions):
+    before = memory_kb()
+    if scenario == "float64 per session":
+        blob = pickle.dumps(storage.read_store(store))
+        frames = [pickle.loads(blob) for _ in range(sessions)]
+        del blob
+        for df in frames:
+            first, last = df["timestamp"].min(), df["timestamp"].max()
+            day = df[df["timestamp"] >= last.floor("D")].set_index("timestamp")["flow_rate"].resample("1h").mean()
+        held = frames
+    else:
+        rollup_dir = store + "_rollups"
+        tables = rollups.load_or_build(store, rollup_dir)
+        baselines = rollups.load_stats(rollup_dir)
+        first, last = storage.time_bounds(store)
+        for _ in range(sessions):
+            day = rollups.read_view(tables, "Daily", last.date())
+        held = [tables, baselines, (first, last)]
+    after = memory_kb()
+    print(json.dumps({
+        "bytes": sizeof(held),
+        **{name: (after[name] - before[name]) / 1024 for name in after},
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--period", type=float, default=1, help="seconds between samples")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.store, args.sessions)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "history")
+        df = sensor_history(args.days, period_s=args.period)
+        storage.write_partitions(df, store)
+        rollups.load_or_build(store, store + "_rollups")
+        print(f"{len(df):,} rows, {args.sessions} sessions")
+        del df
+        print(f"{'':22s} {'held MB':>9s} {'RSS MB':>8s} {'anon MB':>8s} {'file MB':>8s}")
+        for scenario in SCENARIOS:
+            result = subprocess.run(
+                [sys.executable, __file__, "--child", scenario, "--store", store, "--sessions", str(args.sessions)],
+                capture_output=True, text=True, check=True,
+            )
+            r = json.loads(result.stdout)
+            print(f"{scenario:22s} {r['bytes'] / 1e6:9.1f} {r['VmRSS']:8.1f} {r['RssAnon']:8.1f} {r['RssFile']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
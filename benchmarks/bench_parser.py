@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import packets
+
+# Lines/sec for the original per-line parser vs packets.parse_batch.
+# python benchmarks/bench_parser.py --lines 200000 --bad 0.01
+
+
+def legacy_parse_data_packet(packet):
+    # parse_data_packet() as it was in app.py
+    parts = packet.split(';')
+    date = parts[0].split(":")[1].strip()
+    flow = float(parts[1].split(":")[1].strip())
+    temperature = float(parts[2].split(":")[1].strip())
+    turbidity = float(parts[3].split(":")[1].strip())
+    date_time = datetime.strptime(date, "%Y-%m-%d %H-%M-%S")
+    return date_time, flow, temperature, turbidity
+
+
+def make_lines(n, bad_fraction, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2025, 2, 16, 9, 0, 0)
+    lines = []
+    for i in range(n):
+        ts = (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H-%M-%S")
+        line = f"Date: {ts};Flow: {rng.uniform(0, 30):.2f};Temperature: {rng.uniform(5, 30):.2f};Turbidity: {rng.randint(0, 100)}\r\n"
+        if rng.random() < bad_fraction:
+            line = line[: rng.randint(1, len(line) - 3)]  # truncated read
+        lines.append(line)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--bad", type=float, default=0.0, help="fraction of truncated lines")
+    parser.add_argument("--batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.bad)
+
+    t0 = time.perf_counter()
+    legacy_errors = 0
+    for line in lines:
+        try:
+            legacy_parse_data_packet(line)
+        except (IndexError, ValueError):
+            legacy_errors += 1
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    errors = 0
+    parsed = 0
+    for i in range(0, len(lines), args.batch):
+        times, _, bad = packets.parse_batch(lines[i:i + args.batch])
+        parsed += len(times)
+        errors += bad
+    t_batch = time.perf_counter() - t0
+
+    print(f"{len(lines):,} lines, {args.bad:.1%} truncated, batch size {args.batch}")
+    print(f"  legacy per-line : {len(lines) / t_legacy:12,.0f} lines/s  ({legacy_errors} raised)")
+    print(f"  parse_batch     : {len(lines) / t_batch:12,.0f} lines/s  ({errors} skipped, {parsed:,} parsed)")
+    print(f"  speed-up        : x{t_legacy / t_batch:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import time_index
+from synthetic import sensor_history
+
+# Boolean .dt.date masks (what aggregate_data used to do) vs searchsorted windows.
+# python benchmarks/bench_window.py --period 1   (1 Hz; 5 years needs a lot of RAM)
+
+
+def mask_daily(df, day):
+    return df[df["timestamp"].dt.date == day]
+
+
+def mask_weekly(df, day):
+    start = day - pd.Timedelta(days=day.weekday())
+    end = start + pd.Timedelta(days=6)
+    dates = df["timestamp"].dt.date
+    return df[(dates >= start) & (dates <= end)]
+
+
+def mask_monthly(df, day):
+    return df[(df["timestamp"].dt.year == day.year) & (df["timestamp"].dt.month == day.month)]
+
+
+def window_daily(df, day):
+    start = pd.Timestamp(day)
+    return time_index.window(df, start, start + pd.Timedelta(days=1))
+
+
+def window_weekly(df, day):
+    start = pd.Timestamp(day - pd.Timedelta(days=day.weekday()))
+    return time_index.window(df, start, start + pd.Timedelta(days=7))
+
+
+def window_monthly(df, day):
+    start = pd.Timestamp(year=day.year, month=day.month, day=1)
+    return time_index.window(df, start, start + pd.offsets.MonthBegin(1))
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--period", type=float, default=10, help="seconds between samples")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ("Daily", mask_daily, window_daily),
+        ("Weekly", mask_weekly, window_weekly),
+        ("Monthly", mask_monthly, window_monthly),
+    ]
+    for years in args.years:
+        df = sensor_history(365 * years, period_s=args.period)
+        day = date(2020 + years - 1, 6, 15)
+        print(f"\n{years} year(s), {len(df):,} rows")
+        for name, mask_fn, window_fn in cases:
+            t_mask, expected = best_of(lambda: mask_fn(df, day), args.repeat)
+            t_window, got = best_of(lambda: window_fn(df, day), args.repeat)
+            assert len(got) == len(expected)
+            print(f"  {name:8s} mask {t_mask * 1000:9.2f} ms   searchsorted {t_window * 1000:7.3f} ms   "
+                  f"x{t_mask / t_window:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
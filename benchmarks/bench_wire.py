@@ -0,0 +1,224 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import packets
+import wire
+
+# Checks wire.Decoder against synthetic streams fed in random-sized chunks,
+# as the serial reads deliver them, then times it:
+#   ascii      text lines only (old firmware); as in packets.parse_batch,
+#              a line without a temperature is skipped
+#   binary     frames of --frame readings
+#   mixed      runs of frames and text lines interleaved
+#   corrupted  frames with a flipped bit, dropped or cut short; the decoder
+#              must skip exactly those and count each one as lost
+# Then readings/s decoded against packets.parse_batch on the same readings,
+# and bytes per reading on the wire with what that allows at 9600 baud 8E1.
+#   python benchmarks/bench_wire.py --readings 200000 --frame 8
+#   python benchmarks/bench_wire.py --replay capture.bin   (raw bytes from the link)
+
+BAUDRATE = 9600
+BITS_PER_BYTE = 11   # start, 8 data, even parity, stop (serial_reader.open_port)
+CORRUPT_FRACTION = 0.02
+START = int(np.datetime64("2025-02-16T09:00:00", "s").astype(np.int64))
+
+
+def make_readings(n, seed=0):
+    # Sensor values at the wire's resolution, so both formats carry them exactly
+    rng = np.random.default_rng(seed)
+    flow = np.round(rng.uniform(0, 30, n), 2)
+    temperature = np.round(rng.uniform(5, 30, n), 2)
+    temperature[rng.random(n) < 0.01] = np.nan
+    turbidity = rng.integers(0, 101, n)
+    return flow, temperature, turbidity
+
+
+def make_frames(readings, frame_readings, period_ms=1000):
+    # [(frame bytes, timestamps in ns, values), ...], one entry per frame;
+    # whole-second readings, so the text lines carry the same timestamps
+    flow, temperature, turbidity = readings
+    frames = []
+    for seq, i in enumerate(range(0, len(flow), frame_readings)):
+        j = min(i + frame_readings, len(flow))
+        ms = np.arange(i, j) * period_ms
+        base = START + ms[0] // 1000
+        dt_ms = ms - (base - START) * 1000
+        data = wire.encode_frame(seq, base, dt_ms, flow[i:j], temperature[i:j], turbidity[i:j])
+        ns = (START * 1000 + ms) * 10**6
+        frames.append((data, ns, np.column_stack([flow[i:j], temperature[i:j], turbidity[i:j]])))
+    return frames
+
+
+def ascii_line(ns, value):
+    ts = np.datetime64(int(ns), "ns").astype("datetime64[s]").item().strftime("%Y-%m-%d %H-%M-%S")
+    temperature = "Error: No DS18B20 sensor detected!;" if np.isnan(value[1]) else f"Temperature: {value[1]:.2f};"
+    return f"Date: {ts};Flow: {value[0]:.2f};{temperature}Turbidity: {value[2]:.0f}\r\n".encode()
+
+
+def decode(stream, chunk_max, seed=0):
+    # Feeds the stream in random chunks of 1..chunk_max bytes
+    rng = random.Random(seed)
+    decoder = wire.Decoder()
+    times, values, errors = [], [], 0
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, chunk_max)
+        t, v, e = decoder.feed(stream[pos:pos + size])
+        times.append(t)
+        values.append(v)
+        errors += e
+        pos += size
+    return np.concatenate(times).view(np.int64), np.concatenate(values), errors, decoder.stats
+
+
+def check(name, stream, expected_ns, expected_values, chunk_max, expected_lost=0):
+    ns, values, errors, stats = decode(stream, chunk_max)
+    order = np.argsort(ns, kind="stable")
+    ok = (len(ns) == len(expected_ns) and np.array_equal(ns[order], expected_ns)
+          and np.allclose(values[order], expected_values, equal_nan=True)
+          and stats["frames_lost"] == expected_lost)
+    print(f"  {name:10s} {'ok' if ok else 'FAILED':6s} {len(ns):>9,} readings  frames={stats['frames']:,} "
+          f"lines={stats['ascii_lines']:,} crc_errors={stats['crc_errors']} lost={stats['frames_lost']} "
+          f"(expected {expected_lost}) errors={errors}")
+    return ok
+
+
+def run_checks(frames, chunk_max, seed=0):
+    rng = random.Random(seed)
+    all_ns = np.concatenate([ns for _, ns, _ in frames])
+    all_values = np.concatenate([v for _, _, v in frames])
+    results = []
+
+    stream = b"Device ON\r\n" + b"".join(ascii_line(ns, v) for ns, v in zip(all_ns, all_values))
+    sensor = ~np.isnan(all_values[:, 1])
+    results.append(check("ascii", stream, all_ns[sensor], all_values[sensor], chunk_max))
+
+    stream = b"".join(data for data, _, _ in frames)
+    results.append(check("binary", stream, all_ns, all_values, chunk_max))
+
+    # Every other run of frames goes out as text lines instead, as if the
+    # sketch was reflashed back and forth (sequence numbers continue)
+    parts, sent, ns_kept, values_kept = [b"Device ON\r\n"], [], [], []
+    for i, (data, ns, values) in enumerate(frames):
+        if i // 10 % 2 == 0:
+            parts.append(data)
+            sent.append(i)
+        else:
+            parts.extend(ascii_line(t, v) for t, v in zip(ns, values))
+            sensor = ~np.isnan(values[:, 1])
+            ns, values = ns[sensor], values[sensor]
+        ns_kept.append(ns)
+        values_kept.append(values)
+    # Runs sent as text leave gaps in the binary sequence numbers
+    gaps = sum(b - a - 1 for a, b in zip(sent, sent[1:]))
+    results.append(check("mixed", b"".join(parts), np.concatenate(ns_kept), np.concatenate(values_kept),
+                         chunk_max, expected_lost=gaps))
+
+    parts, ns_kept, values_kept, lost = [], [], [], 0
+    for i, (data, ns, values) in enumerate(frames):
+        damaged = 0 < i < len(frames) - 1 and rng.random() < CORRUPT_FRACTION
+        if not damaged:
+            parts.append(data)
+            ns_kept.append(ns)
+            values_kept.append(values)
+            continue
+        lost += 1
+        kind = rng.choice(["flip", "drop", "cut"])
+        if kind == "flip":
+            data = bytearray(data)
+            bit = rng.randrange(len(data) * 8)
+            data[bit // 8] ^= 1 << bit % 8
+            parts.append(bytes(data))
+        elif kind == "cut":
+            parts.append(data[:rng.randint(1, len(data) - 1)])
+    results.append(check("corrupted", b"".join(parts), np.concatenate(ns_kept), np.concatenate(values_kept),
+                         chunk_max, expected_lost=lost))
+    return all(results)
+
+
+def throughput(frames, repeat, batch_bytes):
+    # Readings/s: the decoder on binary frames and on text lines, and
+    # parse_batch on the same lines already split
+    binary = b"".join(data for data, _, _ in frames)
+    ns = np.concatenate([ns for _, ns, _ in frames])
+    values = np.concatenate([v for _, _, v in frames])
+    text = b"".join(ascii_line(t, v) for t, v in zip(ns, values))
+    lines = text.decode().splitlines(keepends=True)
+    n = len(ns)
+
+    def feed_all(stream):
+        decoder = wire.Decoder()
+        for i in range(0, len(stream), batch_bytes):
+            decoder.feed(stream[i:i + batch_bytes])
+
+    def parse_all():
+        batch = max(1, batch_bytes * n // len(text))
+        for i in range(0, len(lines), batch):
+            packets.parse_batch(lines[i:i + batch])
+
+    cases = [("Decoder, binary", lambda: feed_all(binary), len(binary)),
+             ("Decoder, text", lambda: feed_all(text), len(text)),
+             ("parse_batch, text", parse_all, len(text))]
+    print(f"\n{n:,} readings, fed {batch_bytes:,} bytes at a time (best of {repeat})")
+    for name, fn, size in cases:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        per_reading = size / n
+        link = BAUDRATE / BITS_PER_BYTE / per_reading
+        print(f"  {name:18s} {n / best:12,.0f} readings/s  {per_reading:5.1f} bytes/reading  "
+              f"{link:6.1f} readings/s at {BAUDRATE} baud")
+
+
+def replay(path, batch_bytes):
+    with open(path, "rb") as f:
+        stream = f.read()
+    decoder = wire.Decoder()
+    readings = errors = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(stream), batch_bytes):
+        timestamps, _, e = decoder.feed(stream[i:i + batch_bytes])
+        readings += len(timestamps)
+        errors += e
+    seconds = time.perf_counter() - t0
+    print(f"{path}: {len(stream):,} bytes, {readings:,} readings, {errors} errors "
+          f"in {seconds * 1000:.1f} ms ({readings / max(seconds, 1e-9):,.0f} readings/s)")
+    for name, value in decoder.stats.items():
+        print(f"  {name:14s} {value:,}")
+    print(f"  {'left over':14s} {len(decoder.buffer):,} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=200000)
+    parser.add_argument("--frame", type=int, default=8, help=f"readings per frame, at most {wire.MAX_READINGS}")
+    parser.add_argument("--chunk", type=int, default=256, help="largest random chunk fed during the checks")
+    parser.add_argument("--batch", type=int, default=64 * 1024, help="bytes per feed() when timing")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--replay", help="decode a raw capture from the serial link instead")
+    args = parser.parse_args()
+    if args.replay:
+        replay(args.replay, args.batch)
+        return
+    if not 0 < args.frame <= wire.MAX_READINGS:
+        parser.error(f"--frame must be 1..{wire.MAX_READINGS}")
+
+    frames = make_frames(make_readings(args.readings), args.frame)
+    checks = make_frames(make_readings(min(args.readings, 20000), seed=1), args.frame)
+    print(f"checks on {sum(len(ns) for _, ns, _ in checks):,} readings in chunks of 1..{args.chunk} bytes")
+    ok = run_checks(checks, args.chunk)
+    throughput(frames, args.repeat, args.batch)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
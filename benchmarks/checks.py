@@ -0,0 +1,218 @@
+import argparse
+import os
+import sys
+import tempfile
+import traceback
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "prediction"))
+import data_factory
+import data_preprocessing
+import forecasters
+import model_store
+import rollups
+import storage
+from segment_log import Compactor, SegmentLog
+from synthetic import sensor_history
+
+# Correctness checks for the storage and model paths, on synthetic data in
+# a temporary directory; no hardware, network or Streamlit needed. Each
+# check raises AssertionError on failure; the exit status is 1 if any did.
+#   python benchmarks/checks.py                     (all of them)
+#   python benchmarks/checks.py segment_log_restart
+
+CHECKS = {}
+
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+
+def live_samples(start, n, seed):
+    rng = np.random.default_rng(seed)
+    timestamps = np.datetime64(start, "ns") + np.arange(n) * np.timedelta64(1, "s")
+    return timestamps, rng.uniform(0, 20, (n, 3))
+
+
+@check
+def segment_log_restart(tmp):
+    # Two dashboard sessions, each logging and compacting its own samples:
+    # the second one's segments are numbered from 1 again, and must not
+    # replace what the first one already put in the store
+    store, log_root = os.path.join(tmp, "store"), os.path.join(tmp, "live")
+    history = sensor_history(1, period_s=60, start="2025-01-01")
+    storage.write_partitions(history, store)
+    for session, start in enumerate(["2025-01-02T08:00", "2025-01-02T09:00"]):
+        log = SegmentLog(os.path.join(log_root, "dev"))
+        log.append(*live_samples(start, 100, session), wait=True)
+        log.close()
+        assert Compactor(log_root, store, os.path.join(tmp, "rollups")).compact_once() == 1
+    rows = len(storage.read_store(store))
+    assert rows == len(history) + 200, f"{rows} rows in the store, expected {len(history) + 200}"
+
+
+@check
+def rollups_published_whole(tmp):
+    # A build being written (here: only its 10min level so far) must not be
+    # read, whatever its mtimes; a live compaction publishes every level
+    # at once, with the store version the app checks against
+    store, path, log_root = os.path.join(tmp, "store"), os.path.join(tmp, "rollups"), os.path.join(tmp, "live")
+    storage.write_partitions(sensor_history(2, period_s=60, start="2025-01-01"), store)
+    built = rollups.load_or_build(store, path)
+    half = tempfile.mkdtemp(prefix="build-", dir=path)
+    built["10min"].iloc[:10].to_parquet(rollups.rollup_path("10min", half))
+    loaded = rollups.load_rollups(path)
+    assert all(loaded[level].equals(built[level]) for level in rollups.LEVELS), "read a partial build"
+
+    log = SegmentLog(os.path.join(log_root, "dev"))
+    log.append(*live_samples("2025-01-03T08:00", 100, 0), wait=True)
+    log.close()
+    Compactor(log_root, store, path).compact_once()
+    assert rollups.read_manifest(path)["version"] == storage.store_mtime(store), "manifest behind the store"
+    newest = pd.Timestamp("2025-01-03T08:00")
+    loaded = rollups.load_or_build(store, path)
+    for level, table in loaded.items():
+        assert table.index.max() >= newest.floor(rollups.LEVELS[level]), f"{level} misses the new samples"
+
+
+@check
+def compaction_version_last(tmp):
+    # While a compaction is under way, the manifest version (what the app
+    # keys its caches on) still says the old one; by the time it moves on,
+    # the change log already covers it, so the query cache can keep the
+    # views outside the new samples
+    store, path, log_root = os.path.join(tmp, "store"), os.path.join(tmp, "rollups"), os.path.join(tmp, "live")
+    storage.write_partitions(sensor_history(2, period_s=60, start="2025-01-01"), store)
+    rollups.load_or_build(store, path)
+    old = rollups.read_manifest(path)["version"]
+    seen = []
+    save_rollups = rollups.save_rollups
+
+    def spy(tables, rollup_dir, version=None):
+        newest = max([c[0] for c in rollups.read_changes(rollup_dir)], default=None)
+        seen.append((rollups.read_manifest(rollup_dir)["version"], newest))
+        save_rollups(tables, rollup_dir, version)
+
+    log = SegmentLog(os.path.join(log_root, "dev"))
+    log.append(*live_samples("2025-01-03T08:00", 100, 0), wait=True)
+    log.close()
+    rollups.save_rollups = spy
+    try:
+        Compactor(log_root, store, path).compact_once()
+    finally:
+        rollups.save_rollups = save_rollups
+    new = rollups.read_manifest(path)["version"]
+    assert seen == [(old, new)], f"during the compaction (manifest, newest change) = {seen}, expected {[(old, new)]}"
+    assert new > old
+
+
+@check
+def store_time_bounds(tmp):
+    # The dashboard's date range from the Parquet footers matches the data
+    store = os.path.join(tmp, "store")
+    storage.write_partitions(sensor_history(40, period_s=600, start="2025-01-10"), store)
+    storage.write_partitions(pd.DataFrame({"timestamp": pd.to_datetime(["2025-02-25 13:00"]), "flow_rate": [1.0]}),
+                             store, basename="late-{i}.parquet")
+    timestamps = storage.read_store(store, columns=["timestamp"])["timestamp"]
+    bounds = storage.time_bounds(store)
+    assert bounds == (timestamps.min(), timestamps.max()), f"{bounds} != {timestamps.min(), timestamps.max()}"
+
+
+@check
+def store_reconverted(tmp):
+    # A replaced CSV is converted again, even when copied in with an older
+    # mtime, and samples compacted from the live log survive it
+    csv_file, store = os.path.join(tmp, "history.csv"), os.path.join(tmp, "store")
+    history = sensor_history(2, period_s=600, start="2025-01-01")
+    history.to_csv(csv_file, index=False)
+    assert storage.needs_conversion(csv_file, store)
+    storage.convert_csv(csv_file, store)
+    assert not storage.needs_conversion(csv_file, store), "converted store still out of date"
+    live = pd.DataFrame({"timestamp": pd.to_datetime(["2025-01-05 12:00"]), "flow_rate": [3.0]})
+    storage.write_partitions(live, store, basename="live-dev-0-{i}.parquet")
+
+    history.iloc[:100].to_csv(csv_file, index=False)
+    os.utime(csv_file, (0, 0))
+    assert storage.needs_conversion(csv_file, store), "replaced CSV not noticed"
+    storage.convert_csv(csv_file, store)
+    timestamps = storage.read_store(store, columns=["timestamp"])["timestamp"]
+    assert len(timestamps) == 101, f"{len(timestamps)} rows after reconverting, expected 101"
+    assert timestamps.max() == live["timestamp"].iloc[0], "live samples lost"
+
+
+@check
+def data_factory_formats(tmp):
+    # The generator's parquet store holds the same columns, types and values
+    # as its CSV; the month partitions must not replace the month column
+    start, end = pd.Timestamp("2024-12-31"), pd.Timestamp("2025-01-01")
+    csv_file, store = os.path.join(tmp, "flow.csv"), os.path.join(tmp, "store")
+    data_factory.generate(start, end, csv_file, "csv", workers=1)
+    data_factory.generate(start, end, store, "parquet", workers=1)
+    from_csv = pd.read_csv(csv_file)
+    from_csv["timestamp"] = pd.to_datetime(from_csv["timestamp"], format=data_preprocessing.RAW_TIMESTAMP_FORMAT)
+    from_store = storage.read_store(store)
+    # Text comes back from the store dictionary-encoded
+    from_store["day_type"] = from_store["day_type"].astype(object)
+    assert list(from_store.columns) == data_factory.COLUMNS, f"store columns {list(from_store.columns)}"
+    assert from_store.dtypes.equals(from_csv.dtypes), f"store {dict(from_store.dtypes)} != CSV {dict(from_csv.dtypes)}"
+    pd.testing.assert_frame_equal(from_store, from_csv)
+
+
+@check
+def model_store_prune(tmp):
+    # Pruning keeps the newest versions (in version order, not string order),
+    # the published one even when LATEST was pointed back at an old version,
+    # and the one published before it
+    versions = ["v20250101T000000", "v20250201T000000", "v20250301T000000"]
+    versions += [f"v20250301T000000-{n}" for n in range(2, 12)]
+    for version in versions:
+        os.makedirs(os.path.join(tmp, version))
+    model_store.publish(tmp, "v20250201T000000", tempfile.mkdtemp(dir=tmp))
+    model_store.prune(tmp, keep=1)
+    left = sorted(d for d in os.listdir(tmp) if d.startswith("v"))
+    assert left == ["v20250101T000000", "v20250201T000000", "v20250301T000000-11"], f"left {left}"
+
+
+@check
+def forecasters_short_series(tmp):
+    # Too little history is a ValueError naming what is missing, not an
+    # IndexError from inside the fit; the shortest series that fit predict
+    monthly = pd.DataFrame({"ds": pd.date_range("2024-01-31", periods=3, freq="ME"), "y": [10.0, 12.0, 11.0]})
+    for name, shortest in (("seasonal_naive", 1), ("holt_winters", 2)):
+        for n in range(shortest):
+            try:
+                forecasters.make(name).fit(monthly.iloc[:n])
+            except ValueError:
+                continue
+            raise AssertionError(f"{name} fitted {n} months")
+        forecast = forecasters.make(name).fit(monthly.iloc[:shortest]).predict(3)
+        assert len(forecast) == shortest + 3 and forecast["yhat"].notna().all(), f"{name}: {forecast}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("names", nargs="*", help=f"checks to run (default: all): {', '.join(CHECKS)}")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in CHECKS:
+            parser.error(f"unknown check {name!r}")
+    failed = 0
+    for name in args.names or CHECKS:
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                CHECKS[name](tmp)
+                print(f"  {name:32s} ok")
+            except Exception:
+                failed += 1
+                print(f"  {name:32s} FAILED")
+                traceback.print_exc()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
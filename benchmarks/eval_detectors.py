@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import detectors
+
+# Replays simulated households through detectors.Monitor the way the
+# ingestion path feeds it (batches of --batch samples) and scores the alarms:
+#   leaks   one per household, injected at a random time from day 1 on, at
+#           each of --leaks L/min; detection rate and delay from leak start.
+#           The median delay must not grow with the leak size; leaks of
+#           5 L/min or more must be reported sooner than a 1 L/min one, and
+#           those above a shower's flow (15 L/min or more) in under half
+#           its time. Exit status 1 otherwise, or on a false leak alarm.
+#   spikes  a few 5 s turbidity drops per household; detected within 60 s
+#   false   alarms in leak-free households, or before the leak started
+# Throughput is samples per second through Monitor.process.
+#   python benchmarks/eval_detectors.py --households 20 --days 3
+
+# Expected water uses per hour of the day: quiet nights, busy mornings and evenings
+USES_PER_HOUR = np.array([0.2] * 6 + [6] * 3 + [2] * 9 + [5] * 5 + [1])
+SPIKES_PER_HOUSEHOLD = 3
+
+
+def household(days, seed, leak_flow=0.0, period_s=1):
+    # (timestamps, values in packets.COLUMNS order, leak start, spike starts)
+    rng = np.random.default_rng(seed)
+    n = int(days * 86400 // period_s)
+    seconds = np.arange(n) * period_s
+    flow = np.zeros(n)
+    hours = np.arange(int(days * 24))
+    for hour, count in zip(hours, rng.poisson(USES_PER_HOUR[hours % 24])):
+        for _ in range(count):
+            start = hour * 3600 + rng.uniform(0, 3600)
+            # Mostly taps and flushes; one use in ten is a shower or a bath
+            duration = rng.uniform(300, 900) if rng.random() < 0.1 else rng.lognormal(np.log(40), 0.6)
+            flow[(seconds >= start) & (seconds < start + duration)] += rng.uniform(2, 12)
+    leak_start = None
+    if leak_flow:
+        leak_start = rng.uniform(86400, (days - 0.5) * 86400)
+        flow[seconds >= leak_start] += leak_flow
+    flow = np.clip(flow + rng.normal(0, 0.02, n), 0, None)
+
+    turbidity = 80 + rng.normal(0, 2, n)
+    spikes = np.sort(rng.uniform(3600, days * 86400 - 60, SPIKES_PER_HOUSEHOLD))
+    for start in spikes:
+        turbidity[(seconds >= start) & (seconds < start + 5)] -= 30
+    start = np.datetime64("2024-01-01T00:00:00", "ns")
+    timestamps = start + (seconds * 10**9).astype("timedelta64[ns]")
+    values = np.column_stack([flow, 15 + rng.normal(0, 0.5, n), turbidity])
+    return timestamps, values, leak_start, spikes
+
+
+def replay(monitor, device_id, timestamps, values, batch):
+    elapsed = 0.0
+    for lo in range(0, len(timestamps), batch):
+        t0 = time.perf_counter()
+        monitor.process(device_id, timestamps[lo:lo + batch], values[lo:lo + batch])
+        elapsed += time.perf_counter() - t0
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay simulated meters through the live detectors")
+    parser.add_argument("--households", type=int, default=10, help="per leak size, and leak-free")
+    parser.add_argument("--days", type=float, default=3)
+    parser.add_argument("--leaks", type=float, nargs="+", default=[0.25, 0.5, 1, 2, 5, 10, 20, 40], help="leak sizes, L/min")
+    parser.add_argument("--batch", type=int, default=60, help="samples per Monitor.process call")
+    parser.add_argument("--config", default=detectors.CONFIG_PATH)
+    args = parser.parse_args()
+
+    alerts = []
+    monitor = detectors.Monitor(detectors.load_config(args.config), on_alert=alerts.append)
+    origin = np.datetime64("2024-01-01T00:00:00", "ns")
+    rows, spikes_found, spikes_total = [], 0, 0
+    false_alarms, device_days = {"continuous_flow": 0, "turbidity_spike": 0}, 0.0
+    samples, elapsed = 0, 0.0
+    for leak_flow in [0.0] + args.leaks:
+        for i in range(args.households):
+            device_id = f"{leak_flow:g}-{i}"
+            timestamps, values, leak_start, spikes = household(args.days, seed=i + int(leak_flow * 1000) * 1000, leak_flow=leak_flow)
+            del alerts[:]
+            elapsed += replay(monitor, device_id, timestamps, values, args.batch)
+            samples += len(timestamps)
+            seconds = {name: np.array([(a["time"] - origin) / np.timedelta64(1, "s") for a in alerts if a["detector"] == name])
+                       for name in false_alarms}
+
+            leaks = seconds["continuous_flow"]
+            clean_until = leak_start if leak_start is not None else args.days * 86400
+            false_alarms["continuous_flow"] += int((leaks < clean_until).sum())
+            device_days += clean_until / 86400
+            if leak_start is not None:
+                after = leaks[leaks >= leak_start]
+                rows.append({"leak L/min": leak_flow, "detected": len(after) > 0,
+                             "delay_min": (after[0] - leak_start) / 60 if len(after) else np.nan})
+
+            found = [np.any((seconds["turbidity_spike"] >= s) & (seconds["turbidity_spike"] < s + 60)) for s in spikes]
+            spikes_found += sum(found)
+            spikes_total += len(spikes)
+            matched = [np.any((t >= spikes) & (t < spikes + 60)) for t in seconds["turbidity_spike"]]
+            false_alarms["turbidity_spike"] += len(matched) - sum(matched)
+
+    results = pd.DataFrame(rows).groupby("leak L/min").agg(
+        households=("detected", "size"),
+        detected=("detected", "mean"),
+        median_delay_min=("delay_min", "median"),
+        max_delay_min=("delay_min", "max"),
+    )
+    results["detected"] *= 100
+    with pd.option_context("display.float_format", "{:,.2f}".format, "display.width", 200):
+        print(results)
+    print(f"turbidity spikes detected: {spikes_found}/{spikes_total}")
+    total_days = args.households * (len(args.leaks) + 1) * args.days
+    print(f"false leak alarms: {false_alarms['continuous_flow']} in {device_days:.0f} leak-free device-days")
+    print(f"false turbidity alarms: {false_alarms['turbidity_spike']} in {total_days:.0f} device-days")
+    print(f"throughput: {samples / elapsed:,.0f} samples/s ({samples:,} samples, batches of {args.batch})")
+    # Alarms come on whole minutes, so delays compare to within one
+    delays = results["median_delay_min"]
+    failures = []
+    if not (results["detected"] == 100).all():
+        failures.append("a leak was missed")
+    if (delays.diff() > 1).any():
+        failures.append("a bigger leak took longer to report than a smaller one")
+    if 1 in delays.index:
+        drip = delays[1]
+        if (delays[delays.index >= 5] > drip - 2).any():
+            failures.append("a leak of 5 L/min or more took as long to report as a 1 L/min one")
+        if (delays[delays.index >= 15] > drip / 2).any():
+            failures.append("a leak of 15 L/min or more took over half as long to report as a 1 L/min one")
+    if false_alarms["continuous_flow"]:
+        failures.append("false leak alarms")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
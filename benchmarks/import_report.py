@@ -0,0 +1,100 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Cold-start import cost of app.py, from `python -X importtime`.
+# "startup" is every module-level import in app.py; each tab then adds the
+# imports it defers until first use. "eager" imports everything up front, the
+# way app.py used to. Each phase runs in a fresh interpreter; the fastest of
+# --repeat runs is reported.
+# python benchmarks/import_report.py --repeat 5 --top 10
+
+# Imports each tab makes on first use (Prophet itself is pulled in by
+# unpickling the model, only on a forecast-table miss; openai by the insights
+# worker, only on the first call to the OpenAI backend)
+TABS = {
+    "Historical": [],
+    "Real Time": ["serial_reader"],
+    "Projection": ["projection"],
+    "Projection (model load)": ["projection", "prophet"],
+    "Insights (first call)": ["projection", "openai"],
+}
+MARKER = "--- phase ---"
+
+
+def app_imports(path):
+    # Module-level imports only; imports inside functions or tab branches are deferred
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def run_importtime(phases):
+    # phases: [[module, ...], ...] imported in order in one interpreter.
+    # Returns per phase [(cumulative_us, module), ...] of its top-level imports.
+    lines = []
+    for modules in phases:
+        lines.append(f"import sys; sys.stderr.write({MARKER!r} + '\\n')")
+        lines.extend(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "\n".join(lines)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    out = []
+    for line in result.stderr.splitlines():
+        if line == MARKER:
+            out.append([])
+        elif line.startswith("import time:") and out:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                out[-1].append((int(cumulative), name.strip()))
+    return out
+
+
+def best_of(phases, repeat):
+    runs = [run_importtime(phases) for _ in range(repeat)]
+    return min(runs, key=lambda run: sum(us for phase in run for us, _ in phase))
+
+
+def total_ms(phase):
+    return sum(us for us, _ in phase) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest startup imports to list")
+    args = parser.parse_args()
+
+    startup = app_imports(args.app)
+    everything = list(dict.fromkeys(startup + [m for deps in TABS.values() for m in deps]))
+
+    base = best_of([startup], args.repeat)[0]
+    print(f"startup ({len(startup)} imports): {total_ms(base):8.1f} ms")
+    for us, name in sorted(base, reverse=True)[: args.top]:
+        print(f"  {name:<28s} {us / 1000:8.1f} ms")
+
+    for tab, deps in TABS.items():
+        extra = best_of([startup, deps], args.repeat)[1] if deps else []
+        print(f"+ {tab:<26s} {total_ms(extra):8.1f} ms  (first use)")
+
+    eager = best_of([everything], args.repeat)[0]
+    print(f"eager (all tabs at start):  {total_ms(eager):8.1f} ms")
+    print(f"startup saving:             {total_ms(eager) - total_ms(base):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
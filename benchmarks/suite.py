@@ -0,0 +1,268 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "prediction"))
+import data_factory
+import data_preprocessing
+import detectors
+import packets
+import rollups
+import stats
+import storage
+from bench_parser import make_lines
+from bench_window import best_of
+from ring_buffer import RingBuffer
+from segment_log import SegmentLog
+from synthetic import sensor_history
+
+# Every hot path of app.py and prediction/ on synthetic 1 Hz data, timed
+# (best of --repeat) and written as JSON. With a baseline, any case slower
+# than baseline * (1 + --tolerance) is a regression and the exit status is 1.
+#   python benchmarks/suite.py --sizes 1d 30d                  (compare with baseline.json)
+#   python benchmarks/suite.py --sizes 1d 30d --save-baseline  (after an intended change)
+#   python benchmarks/suite.py --sizes 1y 5y --only load_data aggregate_data
+# Per size: load_data (the date range from the Parquet footers), build_rollups, Historical
+# baselines, aggregate_data and the Historical view for every time frame,
+# data_factory generation and data_preprocessing.main (in memory and
+# streamed). Once: packet parsing, the Real Time append path, Prophet.
+# Timings depend on the machine; keep baselines per machine.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = ["1d", "30d"]
+UNITS = {"d": 1, "w": 7, "y": 365}
+TOLERANCE = 0.5        # best-of-5 timings still move by a third on a busy machine
+MIN_DELTA_S = 0.01    # changes smaller than this are noise, whatever the ratio
+FRAMES = ["Daily", "Weekly", "Monthly", "Custom"]
+PARSE_LINES = 200_000
+REALTIME_BATCH = 100       # lines per Real Time frame
+REALTIME_WINDOW = 3600     # app.py's REALTIME_WINDOW_SAMPLES
+PROPHET_MONTHS = 60
+PROPHET_HORIZON = 36
+
+
+def parse_size(text):
+    # "1d", "2w", "5y" -> days
+    return int(text[:-1]) * UNITS[text[-1]]
+
+
+def record(results, name, seconds, rows=None):
+    results[name] = {"seconds": seconds}
+    if rows:
+        results[name].update(rows=rows, rows_per_s=rows / seconds)
+    print(f"  {name:<40s} {seconds * 1000:10.2f} ms" + (f"  {rows / seconds:14,.0f} rows/s" if rows else ""), flush=True)
+
+
+def quietly(fn):
+    # The prediction scripts print progress; keep the report readable
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def historical_view(tables, frame, day, end):
+    # What the Historical tab computes per view: mean bins, the period's
+    # litres and the averages it compares against the baselines
+    means = rollups.read_view(tables, frame, day, end)
+    volume = rollups.read_view(tables, frame, day, end, stat="sum")[stats.VOLUME].sum()
+    return means["flow_rate"].mean(), means["temperature"].mean(), means["purity"].mean(), volume
+
+
+def bench_size(size, repeat, only, results, tmp):
+    days = parse_size(size)
+    start = pd.Timestamp("2020-01-01")
+    wanted = lambda name: not only or any(name.startswith(o) for o in only)
+    df = sensor_history(days, period_s=1, start=str(start.date()))
+    rows = len(df)
+    print(f"{size}: {rows:,} rows")
+
+    store = os.path.join(tmp, f"store_{size}")
+    storage.write_partitions(df, store)
+    if wanted("load_data"):
+        # What app.load_data does once the store exists: footer reads, so no rows/s
+        record(results, f"load_data[{size}]", best_of(lambda: storage.time_bounds(store), repeat)[0])
+    build_s, tables = best_of(lambda: rollups.build_rollups(df), repeat)
+    if wanted("build_rollups"):
+        record(results, f"build_rollups[{size}]", build_s, rows)
+    if wanted("historical_baselines"):
+        record(results, f"historical_baselines[{size}]", best_of(lambda: stats.build_stats(tables), repeat)[0])
+
+    # A day, week and month in the middle of the data, and the whole range
+    day = (start + pd.Timedelta(days=days // 2)).date()
+    end = (start + pd.Timedelta(days=days - 1)).date()
+    for frame in FRAMES:
+        first = start.date() if frame == "Custom" else day
+        if wanted("aggregate_data"):
+            record(results, f"aggregate_data[{frame},{size}]",
+                   best_of(lambda: rollups.read_view(tables, frame, first, end), repeat)[0])
+        if wanted("historical"):
+            record(results, f"historical[{frame},{size}]",
+                   best_of(lambda: historical_view(tables, frame, first, end), repeat)[0])
+    del df, tables
+
+    raw_csv = os.path.join(tmp, f"raw_{size}.csv")
+    if wanted("data_factory") or wanted("data_preprocessing"):
+        generate = quietly(lambda: data_factory.generate(start, start + pd.Timedelta(days=days - 1), raw_csv))
+        seconds, generated = best_of(generate, repeat)
+        if wanted("data_factory"):
+            record(results, f"data_factory[{size}]", seconds, generated)
+    if wanted("data_preprocessing"):
+        # From the CSV every time: the in-memory mode would otherwise convert
+        # it to a raw store on the first run and read that afterwards
+        daily_csv = os.path.join(tmp, f"daily_{size}.csv")
+        for mode, stream in (("memory", False), ("stream", True)):
+            def run():
+                shutil.rmtree(data_preprocessing.raw_store_path(raw_csv), ignore_errors=True)
+                data_preprocessing.main(stream=stream, csv_file=raw_csv, output_file=daily_csv)
+            record(results, f"data_preprocessing[{mode},{size}]", best_of(quietly(run), repeat)[0], generated)
+
+
+def bench_parser(repeat, results):
+    lines = make_lines(PARSE_LINES, 0.01)
+    record(results, "parse_batch", best_of(lambda: packets.parse_batch(lines), repeat)[0], len(lines))
+
+
+def bench_realtime(repeat, results, tmp):
+    # One Real Time frame after another: parse the queued lines, append to
+    # the window and the live log, run the detectors, build the chart frame
+    lines = make_lines(PARSE_LINES // 10, 0.0)
+    frames = [lines[i:i + REALTIME_BATCH] for i in range(0, len(lines), REALTIME_BATCH)]
+
+    def run():
+        data = RingBuffer(packets.COLUMNS, REALTIME_WINDOW)
+        monitor = detectors.Monitor()
+        log = SegmentLog(tempfile.mkdtemp(dir=tmp))
+        for frame in frames:
+            timestamps, values, _ = packets.parse_batch(frame)
+            data.extend(timestamps, values)
+            log.append(timestamps, values)
+            monitor.process("bench", timestamps, values)
+            data.frame()
+        log.close()
+
+    record(results, "realtime_append", best_of(run, repeat)[0], len(lines))
+
+
+def bench_prophet(repeat, results):
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").disabled = True
+    months = np.arange(PROPHET_MONTHS)
+    monthly = pd.DataFrame({
+        "ds": pd.date_range("2020-01-31", periods=PROPHET_MONTHS, freq="ME"),
+        "y": 200_000 + 20_000 * np.sin(2 * np.pi * months / 12) + np.random.default_rng(0).normal(0, 5_000, PROPHET_MONTHS),
+    })
+
+    def fit():
+        model = Prophet()
+        model.fit(monthly)
+        return model
+
+    fit_s, model = best_of(fit, repeat)
+    record(results, "prophet_fit", fit_s)
+    future = model.make_future_dataframe(periods=PROPHET_HORIZON, freq="ME")
+    record(results, "prophet_predict", best_of(lambda: model.predict(future), repeat)[0], len(future))
+
+
+def compare(results, baseline, tolerance):
+    # [(name, baseline_s, seconds), ...] of the cases that got slower
+    regressions = []
+    print(f"\n{'':40s} {'baseline':>11s} {'now':>11s} {'change':>8s}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"  {name:<40s} {'-':>11s} {result['seconds'] * 1000:9.2f}ms      new")
+            continue
+        before, now = baseline[name]["seconds"], result["seconds"]
+        slower = now > before * (1 + tolerance) and now - before > MIN_DELTA_S
+        flag = "  REGRESSION" if slower else ""
+        print(f"  {name:<40s} {before * 1000:9.2f}ms {now * 1000:9.2f}ms {now / before - 1:+8.0%}{flag}")
+        if slower:
+            regressions.append((name, before, now))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app and prediction hot paths")
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="data sizes at 1 Hz, e.g. 1d 30d 1y 5y")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", default=None, help="run only cases whose names start with these")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.5 = 50%%")
+    args = parser.parse_args()
+    for size in args.sizes:
+        if size[-1:] not in UNITS or not size[:-1].isdigit():
+            parser.error(f"bad size {size!r}; use e.g. 1d, 2w, 5y")
+
+    wanted = lambda name: not args.only or any(name.startswith(o) for o in args.only)
+    results = {}
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory() as tmp:
+        # The prediction scripts write relative paths (store/...); keep them in tmp
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for size in args.sizes:
+                bench_size(size, args.repeat, args.only, results, tmp)
+            print("fixed size:")
+            if wanted("parse_batch"):
+                bench_parser(args.repeat, results)
+            if wanted("realtime_append"):
+                bench_realtime(args.repeat, results, tmp)
+            if wanted("prophet"):
+                bench_prophet(args.repeat, results)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} REGRESSION(S) beyond {args.tolerance:.0%}:", file=sys.stderr)
+        for name, before, now in regressions:
+            print(f"  {name}: {before * 1000:.2f} ms -> {now * 1000:.2f} ms ({now / before:.2f}x)", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
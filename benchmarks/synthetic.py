@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic sensor history shaped like 1_year_data.csv, for benchmarks.
+
+
+def sensor_history(days, period_s=1, start="2020-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(days * 86400 // period_s)
+    timestamps = pd.date_range(start, periods=n, freq=pd.Timedelta(seconds=period_s))
+    hours = (np.arange(n) * period_s % 86400) / 3600
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "flow_rate": np.clip(5 + 5 * np.sin(2 * np.pi * hours / 24) + rng.normal(0, 1, n), 0, None),
+        "temperature": 15 + rng.normal(0, 2, n),
+        "purity": 80 + rng.normal(0, 5, n),
+    })
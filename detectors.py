@@ -0,0 +1,255 @@
+import json
+import os
+from collections import deque
+
+import numpy as np
+
+import packets
+
+# Online detection over the live sample stream, run on every batch as it is
+# parsed (ingest_async.py --detect, and the Real Time tab). Each detector
+# keeps a handful of floats per device, so work and memory per sample are
+# constant however long the stream runs, and a batch is handled with NumPy
+# rather than a Python loop per sample.
+#
+#   continuous_flow  leaks: a house normally has minutes with no flow at all,
+#                    a leak never does. Every minute's lowest flow above
+#                    idle_flow is added up CUSUM-style; any idle minute
+#                    resets the sum, which alarms at alarm_litres. The flow
+#                    is capped at cap_flow so that a long shower counts like
+#                    a small leak, so a drip alarms after hours and anything
+#                    from cap_flow up after alarm_litres / (cap_flow -
+#                    idle_flow) minutes (~33). Bigger leaks are told apart
+#                    by how long the flow stays high: `sustained` lists
+#                    (L/min, minutes) pairs, each longer than everyday use
+#                    keeps that much running, and the first one met alarms.
+#                    Up to a shower's flow (~12 L/min) that is not much
+#                    sooner, as back-to-back showers run for half an hour;
+#                    above it nothing ordinary lasts a quarter of an hour.
+#                    The defaults put a 5-12 L/min leak at ~32 min, 15-25
+#                    at ~16 and a burst of 30 or more at ~8.
+#   turbidity_spike  sudden turbidity changes: z-score of each sample
+#                    against an EWMA mean and variance; alarms above z and
+#                    re-arms once the reading is back under rearm.
+#
+# Settings come from DEFAULTS, overridden per device by a JSON file:
+#   {"default": {"continuous_flow": {"alarm_litres": 20}},
+#    "devices": {"kitchen": {"turbidity_spike": null}}}      (null = off)
+# benchmarks/eval_detectors.py replays simulated households with injected
+# leaks and spikes through them.
+
+CONFIG_PATH = os.getenv("HYDROMIND_DETECTORS", "detectors.json")
+MINUTE = 60 * 10**9
+MAX_ALERTS = 100
+
+DEFAULTS = {
+    "continuous_flow": {"column": "flow_rate", "idle_flow": 0.1, "cap_flow": 1.0, "alarm_litres": 30.0,
+                        "sustained": [[4.5, 32], [12.5, 16], [28.0, 8]]},
+    "turbidity_spike": {"column": "turbidity", "alpha": 0.01, "z": 6.0, "rearm": 2.0, "warmup": 300},
+}
+
+
+def ewma(x, alpha, start):
+    # m[t] = (1 - alpha) * m[t-1] + alpha * x[t] for a whole array, starting
+    # from m[-1] = start. Closed form per block; blocks are short enough
+    # that (1 - alpha) ** -k stays within float64.
+    beta = 1.0 - alpha
+    out = np.empty(len(x))
+    block = max(1, int(500 / -np.log(beta)))
+    m = start
+    for lo in range(0, len(x), block):
+        xs = x[lo:lo + block]
+        k = np.arange(1, len(xs) + 1)
+        out[lo:lo + len(xs)] = beta ** k * (m + alpha * np.cumsum(xs * beta ** -k))
+        m = out[lo + len(xs) - 1]
+    return out
+
+
+class ContinuousFlow:
+    name = "continuous_flow"
+
+    def __init__(self, column="flow_rate", idle_flow=0.1, cap_flow=1.0, alarm_litres=30.0,
+                 sustained=((4.5, 32), (12.5, 16), (28.0, 8))):
+        self.column = column
+        self.idle_flow = idle_flow
+        self.cap_flow = cap_flow
+        self.alarm_litres = alarm_litres
+        self.sustained = sorted((float(flow), int(minutes)) for flow, minutes in sustained)
+        self.minute = None        # the minute still receiving samples
+        self.minute_low = np.nan  # and its lowest flow so far
+        self.excess = 0.0
+        self.since = None         # first non-idle minute of the current run
+        self.held = [0] * len(self.sustained)  # minutes in a row at each sustained flow or more
+        self.alarmed = False
+
+    def process(self, ns, x):
+        alerts = []
+        minutes = ns // MINUTE
+        starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+        keys = minutes[starts]
+        lows = np.fmin.reduceat(x, starts)
+        if self.minute is not None:
+            if keys[0] == self.minute:
+                lows[0] = np.fmin(lows[0], self.minute_low)
+            else:
+                keys = np.r_[self.minute, keys]
+                lows = np.r_[self.minute_low, lows]
+        # Every minute but the last is complete
+        for key, low in zip(keys[:-1].tolist(), lows[:-1].tolist()):
+            if low != low:
+                continue
+            if low <= self.idle_flow:
+                self.excess = 0.0
+                self.since = None
+                self.held = [0] * len(self.sustained)
+                self.alarmed = False
+                continue
+            if self.since is None:
+                self.since = key
+            self.excess += min(low, self.cap_flow) - self.idle_flow
+            self.held = [n + 1 if low >= flow else 0 for n, (flow, _) in zip(self.held, self.sustained)]
+            if self.alarmed:
+                continue
+            held = [(flow, n) for n, (flow, minutes) in zip(self.held, self.sustained) if n >= minutes]
+            if held:
+                self.alarmed = True
+                flow, n = held[-1]
+                kind = "burst" if flow == self.sustained[-1][0] else "leak"
+                alerts.append(((key + 1) * MINUTE, low, f"Possible {kind}: at least {flow:g} L/min for {n} min"))
+            elif self.excess >= self.alarm_litres:
+                self.alarmed = True
+                hours = (key + 1 - self.since) / 60
+                alerts.append(((key + 1) * MINUTE, low,
+                               f"Possible leak: flow hasn't stopped for {hours:.1f} h (at least {low:.2f} L/min)"))
+        self.minute, self.minute_low = int(keys[-1]), float(lows[-1])
+        return alerts
+
+
+class EwmaSpike:
+    name = "turbidity_spike"
+
+    def __init__(self, column="turbidity", alpha=0.01, z=6.0, rearm=2.0, warmup=300):
+        self.column = column
+        self.alpha = alpha
+        self.z = z
+        self.rearm = rearm
+        self.warmup = warmup
+        self.mean = None
+        self.var = 0.0
+        self.seen = 0
+        self.armed = True
+
+    def process(self, ns, x):
+        ok = np.isfinite(x)
+        ns, x = ns[ok], x[ok]
+        if len(x) == 0:
+            return []
+        if self.mean is None:
+            self.mean = float(x[0])
+        # Spikes are clipped to the alarm band before they reach the baseline,
+        # using the band at the start of the batch
+        sd = np.sqrt(self.var)
+        clipped = np.clip(x, self.mean - self.z * sd, self.mean + self.z * sd) if self.seen >= self.warmup else x
+        means = ewma(clipped, self.alpha, self.mean)
+        before = np.r_[self.mean, means[:-1]]
+        # West's incremental variance, v[t] = (1 - a) * (v[t-1] + a * d[t]^2),
+        # is the same recurrence with input (1 - a) * d[t]^2
+        variances = ewma((1.0 - self.alpha) * (clipped - before) ** 2, self.alpha, self.var)
+        var_before = np.r_[self.var, variances[:-1]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.abs(x - before) / np.sqrt(var_before)
+        z[np.arange(self.seen, self.seen + len(x)) < self.warmup] = 0.0
+        z = np.nan_to_num(z, posinf=0.0)
+
+        # Alarm / re-arm hysteresis, visiting only the threshold crossings
+        alerts = []
+        high = np.flatnonzero(z > self.z)
+        low = np.flatnonzero(z < self.rearm)
+        i = 0
+        while True:
+            found = high if self.armed else low
+            j = np.searchsorted(found, i)
+            if j == len(found):
+                break
+            i = int(found[j])
+            if self.armed:
+                alerts.append((int(ns[i]), float(x[i]),
+                               f"{self.column.capitalize()} jumped to {x[i]:.1f} (usually {before[i]:.1f})"))
+            self.armed = not self.armed
+            i += 1
+
+        self.mean, self.var = float(means[-1]), float(variances[-1])
+        self.seen += len(x)
+        return alerts
+
+
+DETECTORS = {
+    "continuous_flow": ContinuousFlow,
+    "turbidity_spike": EwmaSpike,
+}
+
+
+def load_config(path=CONFIG_PATH):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def device_settings(config, device_id):
+    # DEFAULTS, then the file's "default" section, then the device's own
+    default = config.get("default", {})
+    device = config.get("devices", {}).get(device_id, {})
+    settings = {}
+    for name, params in DEFAULTS.items():
+        layers = [params, default.get(name, {}), device.get(name, {})]
+        if any(layer is None for layer in layers):
+            continue
+        settings[name] = {k: v for layer in layers for k, v in layer.items()}
+    return settings
+
+
+class Monitor:
+    def __init__(self, config=None, columns=packets.COLUMNS, on_alert=None, max_alerts=MAX_ALERTS):
+        self.config = config or {}
+        self.columns = list(columns)
+        self.on_alert = on_alert
+        self.alerts = deque(maxlen=max_alerts)
+        self.samples = 0
+        self._detectors = {}
+
+    def detectors(self, device_id):
+        if device_id not in self._detectors:
+            self._detectors[device_id] = [DETECTORS[name](**params)
+                                          for name, params in device_settings(self.config, device_id).items()]
+        return self._detectors[device_id]
+
+    def process(self, device_id, timestamps, values):
+        # timestamps: datetime64[ns] array, values: (n, len(columns)) array,
+        # as packets.parse_batch returns them. Returns the new alerts.
+        if len(timestamps) == 0:
+            return []
+        ns = np.asarray(timestamps, dtype="datetime64[ns]").view("i8")
+        values = np.asarray(values, dtype=np.float64)
+        self.samples += len(ns)
+        new = []
+        for detector in self.detectors(device_id):
+            column = values[:, self.columns.index(detector.column)]
+            for time, value, message in detector.process(ns, column):
+                new.append({
+                    "device_id": device_id,
+                    "detector": detector.name,
+                    "time": np.datetime64(time, "ns"),
+                    "value": value,
+                    "message": message,
+                })
+        new.sort(key=lambda alert: alert["time"])
+        for alert in new:
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return new
+
+    def on_batch(self, device_id, timestamps, values, errors=0):
+        # Same signature as IngestionEngine's on_batch
+        self.process(device_id, timestamps, values)
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Downsampling for line charts, done before the data is sent to the browser.
+# A chart can't show more distinct points than it is pixels wide, so each
+# series is cut to about `threshold` points:
+#   lttb    Largest-Triangle-Three-Buckets: one point per bucket, the one
+#           forming the largest triangle with its neighbours, which keeps
+#           the visual shape, spikes included
+#   minmax  the minimum and maximum of every bucket (2 points per bucket),
+#           cheaper and guaranteed to keep every extreme
+# Series at or under the threshold are returned unchanged.
+
+CHART_POINTS = int(os.getenv("HYDROMIND_CHART_POINTS", "800"))  # 0 = no downsampling
+METHODS = ("lttb", "minmax")
+
+
+def _x_values(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return np.asarray(index.values, dtype="datetime64[ns]").view("i8").astype(np.float64)
+    return np.asarray(index, dtype=np.float64)
+
+
+def lttb(x, y, threshold):
+    # Positions of the points to keep, first and last always included
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Mean of every bucket up front; bucket i is scored against the mean of
+    # bucket i + 1 (just the last point, for the final bucket)
+    sizes = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / sizes
+    avg_y = np.add.reduceat(y, edges) / sizes
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area (a, candidate, next average); the constant
+        # factor doesn't change the argmax
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(y, threshold):
+    # Positions of each bucket's min and max, in order
+    n = len(y)
+    buckets = max(threshold // 2, 1)
+    if threshold >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    buckets = -(-n // size)  # so only the last bucket is partly padding
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, size)
+    starts = np.arange(buckets) * size
+    lows = starts + np.nanargmin(blocks, axis=1)
+    highs = starts + np.nanargmax(blocks, axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+
+def keep_positions(index, values, threshold=CHART_POINTS, method="lttb"):
+    # Positions worth plotting. Empty bins (NaN) are skipped first: neither
+    # method can rank them.
+    values = np.asarray(values, dtype=np.float64)
+    if not threshold or len(values) <= threshold:
+        return np.arange(len(values))
+    finite = np.flatnonzero(np.isfinite(values))
+    if len(finite) <= threshold:
+        return finite
+    y = values[finite]
+    if method == "minmax":
+        chosen = minmax(y, threshold)
+    else:
+        chosen = lttb(_x_values(index)[finite], y, threshold)
+    return finite[chosen]
+
+
+def downsample(series, threshold=CHART_POINTS, method="lttb"):
+    # One time- or number-indexed series down to about `threshold` points
+    return series.iloc[keep_positions(series.index, series.to_numpy(), threshold, method)]
+
+
+def downsample_frame(df, threshold=CHART_POINTS, method="lttb"):
+    # Every column on its own; the union of kept rows is returned so the
+    # columns still share one index
+    if not threshold or len(df) <= threshold:
+        return df
+    rows = [keep_positions(df.index, df[column].to_numpy(), threshold, method) for column in df.columns]
+    return df.iloc[np.unique(np.concatenate(rows))] if rows else df
@@ -0,0 +1,155 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Forecasting engines for monthly series with one interface:
+#   engine = make("holt_winters").fit(monthly_data)   # ds/y frame
+#   forecast = engine.predict(horizon)                # ds/yhat/yhat_lower/yhat_upper
+# predict() returns the fitted history followed by `horizon` future months,
+# the same rows Prophet's make_future_dataframe + predict gives, so every
+# engine drops into create_forecast_chart and the comparison table.
+#
+# The NumPy engines fit in milliseconds and need no Prophet import:
+#   seasonal_naive  each month repeats the same month last year
+#   holt_winters    additive level + trend + yearly season (ETS(A,A,A)),
+#                   smoothing parameters picked by a vectorized grid search
+# Both have analytic prediction intervals. prediction/compare_forecasters.py
+# backtests them against Prophet.
+
+FREQ = "ME"  # month end; plain "M" is deprecated since pandas 2.2
+SEASON = 12
+INTERVAL_WIDTH = 0.8  # Prophet's default
+
+
+def _future_dates(ds, horizon):
+    return pd.date_range(ds.iloc[-1], periods=horizon + 1, freq=FREQ)[1:]
+
+
+def _frame(ds, yhat, sd, interval_width):
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    return pd.DataFrame({
+        "ds": ds,
+        "yhat": yhat,
+        "yhat_lower": yhat - z * sd,
+        "yhat_upper": yhat + z * sd,
+    })
+
+
+class SeasonalNaive:
+    name = "seasonal_naive"
+
+    def __init__(self, season=SEASON, interval_width=INTERVAL_WIDTH):
+        self.season = season
+        self.interval_width = interval_width
+
+    def fit(self, df):
+        if len(df) < 1:
+            raise ValueError("need at least 1 month of data, got 0")
+        self.ds = df["ds"].reset_index(drop=True)
+        self.y = df["y"].to_numpy(dtype=float)
+        # Without a full season of history, fall back to repeating the last value
+        self.m = self.season if len(self.y) > self.season else 1
+        residuals = self.y[self.m:] - self.y[:-self.m]
+        self.sigma = np.sqrt(np.mean(residuals ** 2)) if len(residuals) else 0.0
+        return self
+
+    def predict(self, horizon):
+        n, m = len(self.y), self.m
+        fitted = np.concatenate([self.y[:m], self.y[:-m]])
+        steps = np.arange(1, horizon + 1)
+        future = self.y[n - m + (steps - 1) % m]
+        # A seasonal random walk: uncertainty grows with each full season ahead
+        sd = np.concatenate([np.full(n, self.sigma), self.sigma * np.sqrt((steps - 1) // m + 1)])
+        ds = pd.concat([self.ds, pd.Series(_future_dates(self.ds, horizon))], ignore_index=True)
+        return _frame(ds, np.concatenate([fitted, future]), sd, self.interval_width)
+
+
+class HoltWinters:
+    name = "holt_winters"
+
+    GRID = np.linspace(0.05, 0.95, 10)
+
+    def __init__(self, season=SEASON, interval_width=INTERVAL_WIDTH):
+        self.season = season
+        self.interval_width = interval_width
+
+    def _smooth(self, y, alpha, beta, gamma):
+        # Runs every parameter combination at once: the state arrays have one
+        # entry per candidate, the loop is over time only
+        m = self.m
+        level = np.full(alpha.shape, y[:m].mean())
+        trend = np.full(alpha.shape, (y[m:2 * m].mean() - y[:m].mean()) / m if m > 1 else y[1] - y[0])
+        season = np.tile(y[:m] - y[:m].mean(), (len(alpha), 1)) if m > 1 else np.zeros((len(alpha), 1))
+        fitted = np.empty((len(alpha), len(y)))
+        for t in range(len(y)):
+            s = season[:, t % m]
+            fitted[:, t] = level + trend + s
+            error = y[t] - fitted[:, t]
+            new_level = level + trend + alpha * error
+            trend = trend + alpha * beta * error
+            season[:, t % m] = s + gamma * error
+            level = new_level
+        return fitted, level, trend, season
+
+    def fit(self, df):
+        # The trend is initialised from the first two months
+        if len(df) < 2:
+            raise ValueError(f"need at least 2 months of data, got {len(df)}")
+        self.ds = df["ds"].reset_index(drop=True)
+        y = df["y"].to_numpy(dtype=float)
+        self.y = y
+        # Two full seasons to initialise the seasonal terms, otherwise Holt's linear trend
+        self.m = self.season if len(y) >= 2 * self.season else 1
+        alpha, beta, gamma = (g.ravel() for g in np.meshgrid(self.GRID, self.GRID[:5], self.GRID[:5] if self.m > 1 else [0.0]))
+        fitted, level, trend, season = self._smooth(y, alpha, beta, gamma)
+        # Skip the first season when scoring; it only reflects the initial states
+        sse = ((y[self.m:] - fitted[:, self.m:]) ** 2).sum(axis=1)
+        best = np.argmin(sse)
+        self.alpha, self.beta, self.gamma = alpha[best], beta[best], gamma[best]
+        self.fitted = fitted[best]
+        self.level, self.trend, self.season_state = level[best], trend[best], season[best]
+        self.sigma = np.sqrt(sse[best] / max(len(y) - self.m, 1))
+        return self
+
+    def predict(self, horizon):
+        n, m = len(self.y), self.m
+        h = np.arange(1, horizon + 1)
+        future = self.level + h * self.trend + self.season_state[(n + h - 1) % m]
+        # Analytic ETS(A,A,A) forecast variance (Hyndman & Athanasopoulos, table 9.8)
+        a, b, g = self.alpha, self.beta * self.alpha, self.gamma
+        k = (h - 1) // m if m > 1 else np.zeros_like(h)
+        var = 1 + (h - 1) * (a ** 2 + a * b * h + b ** 2 * h * (2 * h - 1) / 6) + g * k * (2 * a + g + b * m * (k + 1))
+        sd = np.concatenate([np.full(n, self.sigma), self.sigma * np.sqrt(var)])
+        ds = pd.concat([self.ds, pd.Series(_future_dates(self.ds, horizon))], ignore_index=True)
+        return _frame(ds, np.concatenate([self.fitted, future]), sd, self.interval_width)
+
+
+class ProphetForecaster:
+    name = "prophet"
+
+    def __init__(self, model=None, **params):
+        # An already fitted model (e.g. the pickled one) can be wrapped as-is
+        self.model = model
+        self.params = params
+
+    def fit(self, df):
+        from prophet import Prophet
+        self.model = Prophet(**self.params)
+        self.model.fit(df[["ds", "y"]])
+        return self
+
+    def predict(self, horizon):
+        future = self.model.make_future_dataframe(periods=horizon, freq=FREQ)
+        return self.model.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
+ENGINES = {
+    "prophet": ProphetForecaster,
+    "holt_winters": HoltWinters,
+    "seasonal_naive": SeasonalNaive,
+}
+
+
+def make(name, **kwargs):
+    return ENGINES[name](**kwargs)
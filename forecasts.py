@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Precomputed Prophet forecasts for the Projection tab.
+# prophet_model.pkl -> prophet_model_forecasts.parquet, written by model.py
+# right after the model is saved. Prophet's history rows plus the forecast for
+# a horizon are exactly the first rows of the forecast for any longer horizon,
+# so one predict at the longest horizon covers every slider value and the
+# table is sliced per horizon. The table carries the fingerprint (hash of the
+# pickle) of the model it came from and is ignored once the model changes.
+#
+#   python forecasts.py prediction/prophet_model.pkl     (rebuild the table)
+
+HORIZONS = list(range(12, 37, 6))  # the Projection tab's slider values (months)
+FREQ = "ME"  # month end; plain "M" is deprecated since pandas 2.2
+METADATA_KEY = b"hydromind.forecasts"
+
+
+def model_fingerprint(model_path):
+    with open(model_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def table_path(model_path):
+    return os.path.splitext(model_path)[0] + "_forecasts.parquet"
+
+
+def predict(model, horizon):
+    # The live path: what the Projection tab used to run on every rerun
+    future = model.make_future_dataframe(periods=horizon, freq=FREQ)
+    return model.predict(future)
+
+
+def write_table(model, model_path, horizons=HORIZONS):
+    forecast = predict(model, max(horizons))
+    meta = {
+        "fingerprint": model_fingerprint(model_path),
+        "history_rows": len(model.history_dates),
+        "horizons": list(horizons),
+    }
+    table = pa.Table.from_pandas(forecast, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(meta).encode()})
+    path = table_path(model_path)
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_meta(model_path):
+    path = table_path(model_path)
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[METADATA_KEY])
+
+
+def precomputed(model_path, fingerprint, horizon):
+    # Forecast for `horizon` from the table, or None if the table is missing,
+    # was built from another model, or doesn't cover this horizon
+    meta = read_meta(model_path)
+    if meta is None or meta["fingerprint"] != fingerprint or horizon not in meta["horizons"]:
+        return None
+    forecast = pd.read_parquet(table_path(model_path))
+    return forecast.iloc[: meta["history_rows"] + horizon].reset_index(drop=True)
+
+
+def load_model(model_path):
+    with open(model_path, "rb") as f:
+        return pickle.load(f)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python forecasts.py <prophet_model.pkl>")
+        sys.exit(1)
+    path = write_table(load_model(sys.argv[1]), sys.argv[1])
+    print(f"Forecasts for horizons {HORIZONS} saved to {path}")
@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+import serial
+from serial.serialutil import SerialException
+
+import detectors
+import metrics
+import wire
+from segment_log import Compactor, SegmentLog
+
+# Concurrent ingestion from any number of serial meters on one event loop.
+# Each port is registered with the loop's reader (no thread per device, no
+# polling); bytes accumulate per device and go through the device's
+# wire.Decoder (binary frames or text lines) in batches every
+# flush_interval. Every batch is tagged with its device id. A port that
+# fails to open or drops is retried with exponential backoff plus jitter,
+# so a site full of flaky Bluetooth links doesn't stall the healthy ones.
+#
+#   python ingest_async.py /dev/rfcomm0 kitchen=/dev/rfcomm1
+#   python ingest_async.py --fake 24 --rate 10      (simulated meters)
+#   python ingest_async.py --fake 24 --rate 100 --binary
+#   python ingest_async.py /dev/rfcomm0 --log store/live --store store/1_year_data
+#   python ingest_async.py --fake 4 --detect --alerts alerts.jsonl  (leak/turbidity alarms)
+#   python ingest_async.py --fake 4 --metrics-port 9108 --metrics-jsonl metrics.jsonl
+
+BAUDRATE = 9600
+FLUSH_INTERVAL = 0.25
+INITIAL_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+
+def parse_ports(specs):
+    # "kitchen=/dev/rfcomm1" -> {"kitchen": "/dev/rfcomm1"}; bare paths use their basename
+    ports = {}
+    for spec in specs:
+        device_id, sep, port = spec.partition("=")
+        if not sep:
+            device_id, port = os.path.basename(spec), spec
+        ports[device_id] = port
+    return ports
+
+
+def open_serial(port, baudrate=BAUDRATE):
+    try:
+        return serial.Serial(port=port, baudrate=baudrate, timeout=0, parity=serial.PARITY_EVEN, stopbits=1)
+    except (SerialException, OSError):
+        return None
+
+
+class IngestionEngine:
+    def __init__(self, ports, on_batch=None, baudrate=BAUDRATE, flush_interval=FLUSH_INTERVAL,
+                 max_backoff=MAX_BACKOFF, opener=open_serial):
+        # ports: {device_id: port}; on_batch(device_id, timestamps, values, errors)
+        self.ports = dict(ports)
+        self.on_batch = on_batch
+        self.baudrate = baudrate
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.opener = opener
+        self.stats = {
+            device_id: {"connected": False, "samples": 0, "errors": 0, "frames_lost": 0, "reconnects": 0, "last_sample": None}
+            for device_id in self.ports
+        }
+        # Kept across reconnects: the sequence numbers tell what the gap cost
+        self.decoders = {device_id: wire.Decoder() for device_id in self.ports}
+        self._loop = None
+        self._stopping = None
+        self._thread = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        await asyncio.gather(*(self._run_device(device_id, port) for device_id, port in self.ports.items()))
+
+    def stop(self):
+        # Safe to call from any thread
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    def start_in_thread(self):
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="ingestion", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    async def _sleep(self, seconds):
+        # Sleep that ends early when the engine is stopped
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run_device(self, device_id, port):
+        stats = self.stats[device_id]
+        backoff = INITIAL_BACKOFF
+        while not self._stopping.is_set():
+            connection = self.opener(port, self.baudrate)
+            if connection is None:
+                stats["reconnects"] += 1
+                metrics.inc("reconnects_total", device=device_id)
+                await self._sleep(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = INITIAL_BACKOFF
+            stats["connected"] = True
+            try:
+                await self._pump(device_id, connection)
+            finally:
+                stats["connected"] = False
+                connection.close()
+            if not self._stopping.is_set():
+                stats["reconnects"] += 1
+                metrics.inc("reconnects_total", device=device_id)
+                await self._sleep(backoff)
+
+    async def _pump(self, device_id, connection):
+        fd = connection.fileno()
+        pending = bytearray()
+        failure = []
+
+        def on_readable():
+            try:
+                pending.extend(connection.read(connection.in_waiting or 1))
+            except (SerialException, OSError) as e:
+                failure.append(e)
+                self._loop.remove_reader(fd)
+
+        self._loop.add_reader(fd, on_readable)
+        try:
+            while not failure and not self._stopping.is_set():
+                await self._sleep(self.flush_interval)
+                self._flush(device_id, pending)
+        finally:
+            self._loop.remove_reader(fd)
+        self._flush(device_id, pending)
+
+    def _flush(self, device_id, pending):
+        decoder = self.decoders[device_id]
+        metrics.gauge("pending_bytes", len(pending) + len(decoder.buffer), device=device_id)
+        if not pending:
+            return
+        # Incomplete frames and lines stay in the decoder for the next flush
+        with metrics.stage("ingest_parse"):
+            timestamps, values, errors = decoder.feed(pending)
+        del pending[:]
+        stats = self.stats[device_id]
+        lost = decoder.stats["frames_lost"] - stats["frames_lost"]
+        stats["samples"] += len(timestamps)
+        stats["errors"] += errors
+        stats["frames_lost"] += lost
+        metrics.inc("packets_total", len(timestamps), device=device_id)
+        metrics.inc("parse_errors_total", errors, device=device_id)
+        metrics.inc("frames_lost_total", lost, device=device_id)
+        if len(timestamps):
+            stats["last_sample"] = timestamps[-1]
+        if self.on_batch is not None and (len(timestamps) or errors):
+            with metrics.stage("ingest_batch"):
+                self.on_batch(device_id, timestamps, values, errors)
+
+
+def print_stats(engine, previous):
+    now = time.monotonic()
+    elapsed = now - previous["time"]
+    total = 0
+    for device_id, stats in engine.stats.items():
+        rate = (stats["samples"] - previous.get(device_id, 0)) / elapsed
+        previous[device_id] = stats["samples"]
+        total += rate
+        state = "up" if stats["connected"] else "down"
+        metrics.gauge("packets_per_s", rate, device=device_id)
+        print(f"  {device_id:>12s} {state:4s} {rate:8.1f} samples/s  errors={stats['errors']} lost={stats['frames_lost']} reconnects={stats['reconnects']}")
+    print(f"  {'total':>12s}      {total:8.1f} samples/s")
+    previous["time"] = now
+
+
+def report_alert(alert, alerts_file=None):
+    print(f"  ALERT {alert['device_id']} {alert['time']} {alert['detector']}: {alert['message']}", flush=True)
+    if alerts_file is not None:
+        alerts_file.write(json.dumps({**alert, "time": str(alert["time"])}) + "\n")
+        alerts_file.flush()
+
+
+async def _main(args):
+    meters = []
+    ports = parse_ports(args.ports)
+    if args.fake:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Hardware"))
+        from fake_meter import FakeMeter
+        for i in range(args.fake):
+            meter = FakeMeter(rate=args.rate, seed=i, binary=args.binary)
+            meters.append(meter)
+            ports[f"fake{i:02d}"] = meter.port
+
+    logs = {}
+    handlers = []
+    compactor = None
+    alerts_file = None
+    if args.log:
+        # Persist every device's samples to its own segment log
+        logs = {device_id: SegmentLog(os.path.join(args.log, device_id)) for device_id in ports}
+        handlers.append(lambda device_id, timestamps, values, errors: logs[device_id].append(timestamps, values))
+        if args.store:
+            compactor = Compactor(args.log, args.store, args.store.rstrip("/") + "_rollups")
+            compactor.start()
+    if args.metrics_port or args.metrics_jsonl:
+        metrics.enable()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.detect:
+        # Detection runs on each batch right after it is parsed
+        if args.alerts:
+            alerts_file = open(args.alerts, "a")
+        monitor = detectors.Monitor(detectors.load_config(args.detect_config),
+                                    on_alert=lambda alert: report_alert(alert, alerts_file))
+        handlers.append(monitor.on_batch)
+
+    def on_batch(device_id, timestamps, values, errors):
+        for handler in handlers:
+            handler(device_id, timestamps, values, errors)
+
+    engine = IngestionEngine(ports, on_batch=on_batch if handlers else None)
+    tasks = [asyncio.create_task(meter.run()) for meter in meters]
+    tasks.append(asyncio.create_task(engine.run()))
+    previous = {"time": time.monotonic()}
+    started = time.monotonic()
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            await asyncio.sleep(args.report)
+            print(f"[{time.strftime('%H:%M:%S')}]")
+            print_stats(engine, previous)
+            if args.metrics_jsonl:
+                metrics.write_jsonl(args.metrics_jsonl)
+    finally:
+        engine.stop()
+        for meter in meters:
+            meter.stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for log in logs.values():
+            log.close()
+        if compactor is not None:
+            compactor.stop()
+            compactor.compact_once()
+        if alerts_file is not None:
+            alerts_file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read many serial water meters concurrently")
+    parser.add_argument("ports", nargs="*", help="serial ports, optionally as device_id=port")
+    parser.add_argument("--fake", type=int, default=0, help="also start this many pty-based fake meters")
+    parser.add_argument("--rate", type=float, default=1.0, help="packets per second per fake meter")
+    parser.add_argument("--binary", action="store_true", help="fake meters send wire.py frames instead of text lines")
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between stats reports")
+    parser.add_argument("--log", help="write samples to segment logs under this directory")
+    parser.add_argument("--store", help="with --log, compact closed segments into this Parquet store")
+    parser.add_argument("--detect", action="store_true", help="run the leak and turbidity detectors on every batch")
+    parser.add_argument("--detect-config", default=detectors.CONFIG_PATH, help="per-device detector settings (JSON)")
+    parser.add_argument("--alerts", help="with --detect, also append alerts to this JSON-lines file")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-jsonl", help="append a metrics snapshot to this file every report")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 = run forever)")
+    args = parser.parse_args()
+    if not args.ports and not args.fake:
+        parser.error("give at least one port or --fake N")
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
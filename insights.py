@@ -0,0 +1,177 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Water-saving advice for the Projection tab, generated off the script thread.
+# Responses are cached by a hash of the backend and prompt, with a TTL and a
+# bound on the number of entries (least recently used goes first), so reruns
+# and other sessions asking the same thing don't pay for another completion.
+# Identical requests in flight share one job. A job collects the text as the
+# backend streams it, so the page can render everything else and fill the
+# advice in as it arrives.
+#
+# Backends: "openai" (needs OPENAI_API_KEY) and "stub", a local canned
+# responder for running offline. HYDROMIND_INSIGHTS_BACKEND picks one; the
+# default is openai when a key is set, stub otherwise; the dashboard labels
+# stub output so canned tips aren't mistaken for generated advice.
+
+SYSTEM_PROMPT = "You are a helpful and friendly water usage advisor."
+CACHE_TTL = 6 * 3600      # seconds
+CACHE_ENTRIES = 128
+WORKERS = 2
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def __init__(self, model="gpt-4o-mini", max_tokens=150, temperature=0.7):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def generate(self, prompt):
+        import openai
+        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        stream = client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubBackend:
+    name = "stub"
+
+    TIPS = [
+        "Run the dishwasher and washing machine only with full loads.",
+        "Check for leaks: a dripping tap can waste over 10 litres a day.",
+        "Keep showers to five minutes and turn the tap off while brushing teeth.",
+        "Water the garden early in the morning or in the evening to cut evaporation.",
+        "If the children are home during the day, make a game of spotting running taps.",
+    ]
+
+    def __init__(self, delay=0.0):
+        self.delay = delay  # seconds per word, to mimic a streaming backend
+
+    def generate(self, prompt):
+        # Deterministic for a given prompt, so results are reproducible offline
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        tips = [self.TIPS[(seed + i) % len(self.TIPS)] for i in range(2)]
+        text = "Your usage has been running above normal. " + " ".join(tips)
+        for word in text.split(" "):
+            if self.delay:
+                time.sleep(self.delay)
+            yield word + " "
+
+
+BACKENDS = {"openai": OpenAIBackend, "stub": StubBackend}
+
+
+def default_backend():
+    name = os.getenv("HYDROMIND_INSIGHTS_BACKEND") or ("openai" if os.getenv("OPENAI_API_KEY") else "stub")
+    return BACKENDS[name]()
+
+
+class Job:
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = threading.Event()
+
+    def text(self):
+        return "".join(self.chunks).strip()
+
+
+class InsightsService:
+    def __init__(self, backend=None, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES, workers=WORKERS):
+        self.backend = backend or default_backend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()   # key -> (expires_at, text)
+        self._jobs = {}               # key -> Job still running
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="insights")
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, prompt):
+        return hashlib.sha256(f"{self.backend.name}\0{SYSTEM_PROMPT}\0{prompt}".encode()).hexdigest()
+
+    def _lookup(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if time.monotonic() >= expires_at:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text
+
+    def request(self, prompt):
+        # A finished Job for a cached prompt, otherwise the (new or shared)
+        # running one
+        key = self.key(prompt)
+        with self._lock:
+            text = self._lookup(key)
+            if text is not None:
+                self.hits += 1
+                job = Job()
+                job.chunks.append(text)
+                job.done.set()
+                return job
+            job = self._jobs.get(key)
+            if job is None:
+                self.misses += 1
+                job = self._jobs[key] = Job()
+                self._pool.submit(self._generate, key, prompt, job)
+            return job
+
+    def _generate(self, key, prompt, job):
+        try:
+            for chunk in self.backend.generate(prompt):
+                job.chunks.append(chunk)
+        except Exception as e:
+            # Failures are reported to the caller, never cached
+            job.error = e
+        with self._lock:
+            self._jobs.pop(key, None)
+            if job.error is None:
+                self._cache[key] = (time.monotonic() + self.ttl, job.text())
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        job.done.set()
+
+    def generate(self, prompt, timeout=None):
+        # Blocking convenience wrapper
+        job = self.request(prompt)
+        job.done.wait(timeout)
+        if job.error is not None:
+            raise job.error
+        return job.text()
+
+
+if __name__ == "__main__":
+    # python insights.py "Usage was high last week." [stub|openai]
+    import sys
+    if len(sys.argv) < 2:
+        print('usage: python insights.py "<prompt>" [stub|openai]')
+        sys.exit(1)
+    backend = BACKENDS[sys.argv[2]]() if len(sys.argv) > 2 else None
+    service = InsightsService(backend)
+    for attempt in ("first", "cached"):
+        started = time.perf_counter()
+        text = service.generate(sys.argv[1])
+        print(f"[{service.backend.name}, {attempt}, {time.perf_counter() - started:.3f}s] {text}")
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Timing hooks and counters for the dashboard and the ingestion loop, kept
+# in one process-wide registry:
+#   with metrics.stage("load_data"): ...            latency histogram per stage
+#   metrics.inc("packets_total", n, device="kitchen")
+#   metrics.gauge("queue_depth", reader.depth())
+# Off by default. While off, stage() hands back one shared no-op context
+# and inc()/gauge() return straight away, so an instrumented line costs a
+# function call and a flag check. Turn on with HYDROMIND_METRICS=1 or
+# enable(), once per process: the dashboard's debug panel only shows them.
+# Exported as Prometheus text (prometheus_text(), serve() for scraping) or
+# as JSON lines, one snapshot per line (write_jsonl()).
+
+PREFIX = "hydromind_"
+STAGE = "stage_seconds"
+# Histogram bucket upper bounds in seconds, Prometheus style (le="...")
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+enabled = os.getenv("HYDROMIND_METRICS", "0") not in ("", "0")
+started = time.time()
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_NULL = nullcontext()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (the
+        # largest one seen, past the last bucket)
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        out, seen = [], 0
+        for bound, n in zip(BUCKETS + ("+Inf",), self.counts):
+            seen += n
+            out.append((bound, seen))
+        return out
+
+
+class _Timer:
+    __slots__ = ("key", "t0")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _observe(self.key, time.perf_counter() - self.t0)
+        return False
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _observe(key, value):
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def enable(on=True):
+    global enabled
+    enabled = bool(on)
+
+
+def stage(name, **labels):
+    # Times the with-block into the stage_seconds histogram
+    if not enabled:
+        return _NULL
+    return _Timer(_key(STAGE, dict(labels, stage=name)))
+
+
+def observe(name, seconds, **labels):
+    # For durations measured elsewhere (e.g. across a background job)
+    if enabled:
+        _observe(_key(STAGE, dict(labels, stage=name)), seconds)
+
+
+def inc(name, value=1, **labels):
+    if not enabled or not value:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name, value, **labels):
+    if enabled:
+        with _lock:
+            _gauges[_key(name, labels)] = value
+
+
+def reset():
+    global started
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+        started = time.time()
+
+
+def snapshot():
+    with _lock:
+        return {
+            "time": time.time(),
+            "uptime_s": time.time() - started,
+            "histograms": [
+                {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum, "max": h.max,
+                 "buckets": {str(bound): n for bound, n in h.cumulative()}}
+                for (name, labels), h in _histograms.items()
+            ],
+            "counters": [{"name": name, "labels": dict(labels), "value": v} for (name, labels), v in _counters.items()],
+            "gauges": [{"name": name, "labels": dict(labels), "value": v} for (name, labels), v in _gauges.items()],
+        }
+
+
+def stage_table():
+    # One row per stage for the debug panel, slowest total first
+    with _lock:
+        rows = [{
+            "stage": dict(labels)["stage"],
+            "calls": h.count,
+            "mean_ms": h.sum / h.count * 1000,
+            "p50_ms": h.quantile(0.5) * 1000,
+            "p95_ms": h.quantile(0.95) * 1000,
+            "max_ms": h.max * 1000,
+            "total_s": h.sum,
+        } for (name, labels), h in _histograms.items() if name == STAGE]
+    return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text():
+    # Text exposition format, version 0.0.4
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+    lines, typed = [], set()
+    for (name, labels), h in histograms:
+        metric = PREFIX + name
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        for bound, n in h.cumulative():
+            lines.append(f"{metric}_bucket{_labels(labels, le=bound)} {n}")
+        lines.append(f"{metric}_sum{_labels(labels)} {h.sum}")
+        lines.append(f"{metric}_count{_labels(labels)} {h.count}")
+    for kind, items in (("counter", counters), ("gauge", gauges)):
+        for (name, labels), value in items:
+            metric = PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def jsonl_line():
+    return json.dumps(snapshot()) + "\n"
+
+
+def write_jsonl(path):
+    with open(path, "a") as f:
+        f.write(jsonl_line())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host="0.0.0.0"):
+    # /metrics for a Prometheus scraper, from a daemon thread
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
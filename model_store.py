@@ -0,0 +1,123 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import storage
+
+# Versioned store of per-meter forecasting models, written by
+# prediction/batch_train.py:
+#   store/meter_models/LATEST                 name of the current version
+#   store/meter_models/v20250301T120000/
+#       index.parquet      one row per meter: status, model file, fit time, ...
+#       forecasts.parquet  ds/yhat/yhat_lower/yhat_upper for every meter
+#       history.parquet    the monthly series each model was fitted on
+#       models/000042.json Prophet model as JSON (prophet.serialize)
+# The tables are sorted by meter_id in small row groups, so reading one
+# meter's forecast only touches the row groups that can contain it, and no
+# model is deserialized unless it is asked for. A version is built in a
+# temporary directory and only becomes visible when LATEST is switched to it.
+
+MODEL_STORE = storage.store_path("meter_models")
+LATEST = "LATEST"
+ROW_GROUP_ROWS = 4096
+
+
+def new_version(root=MODEL_STORE):
+    version = time.strftime("v%Y%m%dT%H%M%S")
+    n = 1
+    while os.path.exists(os.path.join(root, version)) or os.path.exists(os.path.join(root, f".tmp-{version}")):
+        n += 1
+        version = time.strftime("v%Y%m%dT%H%M%S") + f"-{n}"
+    tmp = os.path.join(root, f".tmp-{version}")
+    os.makedirs(os.path.join(tmp, "models"))
+    return version, tmp
+
+
+def model_file(i):
+    # Meter ids can be anything; files are numbered and the index maps them
+    return os.path.join("models", f"{i:06d}.json")
+
+
+def write_table(df, tmp, name):
+    table = pa.Table.from_pandas(df.sort_values("meter_id", kind="stable"), preserve_index=False)
+    pq.write_table(table, os.path.join(tmp, name), row_group_size=ROW_GROUP_ROWS, compression="zstd")
+
+
+def publish(root, version, tmp):
+    os.replace(tmp, os.path.join(root, version))
+    with open(os.path.join(root, LATEST + ".tmp"), "w") as f:
+        f.write(version)
+    os.replace(os.path.join(root, LATEST + ".tmp"), os.path.join(root, LATEST))
+
+
+def discard(tmp):
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def latest_version(root=MODEL_STORE):
+    path = os.path.join(root, LATEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+
+def version_dir(root=MODEL_STORE, version=None):
+    version = version or latest_version(root)
+    if version is None:
+        raise FileNotFoundError(f"no published models in {root}")
+    return os.path.join(root, version)
+
+
+def read_index(root=MODEL_STORE, version=None):
+    return pd.read_parquet(os.path.join(version_dir(root, version), "index.parquet"))
+
+
+def _read_meter(name, meter_id, root, version):
+    path = os.path.join(version_dir(root, version), name)
+    return pq.read_table(path, filters=[("meter_id", "==", meter_id)]).to_pandas().reset_index(drop=True)
+
+
+def meter_forecast(meter_id, root=MODEL_STORE, version=None):
+    return _read_meter("forecasts.parquet", meter_id, root, version)
+
+
+def meter_history(meter_id, root=MODEL_STORE, version=None):
+    return _read_meter("history.parquet", meter_id, root, version)
+
+
+def load_model(meter_id, root=MODEL_STORE, version=None):
+    from prophet.serialize import model_from_json
+    index = read_index(root, version)
+    row = index[(index["meter_id"] == meter_id) & (index["status"] == "ok")]
+    if row.empty:
+        raise KeyError(f"no model for meter {meter_id!r}")
+    with open(os.path.join(version_dir(root, version), row["model_file"].iloc[0])) as f:
+        return model_from_json(f.read())
+
+
+def _version_key(version):
+    # Versions made in the same second get -2, -3, ...: v..T120000-10 is
+    # newer than v..T120000-9, though it sorts before it as a string
+    stamp, _, n = version.partition("-")
+    return stamp, int(n or 1)
+
+
+def prune(root=MODEL_STORE, keep=3):
+    # Drop all but the newest `keep` versions. Whatever their age, the
+    # published one stays (LATEST may have been pointed back at an older
+    # version), and so does the one before it, which sessions that read
+    # LATEST just before the switch are still reading
+    current = latest_version(root)
+    versions = sorted((d for d in os.listdir(root) if d.startswith("v") and os.path.isdir(os.path.join(root, d))),
+                      key=_version_key)
+    kept = set(versions[max(0, len(versions) - keep):])
+    if current in versions:
+        kept.update(versions[max(0, versions.index(current) - 1):versions.index(current) + 1])
+    for version in versions:
+        if version not in kept:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
@@ -0,0 +1,71 @@
+import re
+
+import numpy as np
+
+# Parser for the ASCII packets the sketch sends over Bluetooth:
+#   Date: 2025-02-16 14-03-27;Flow: 1.25;Temperature: 19.50;Turbidity: 82
+# A batch of lines is decoded in one pass with a single compiled pattern into
+# columnar arrays. Lines that don't match (start-up banners, a missing
+# temperature sensor, truncated or garbled reads) are counted and skipped.
+
+COLUMNS = ["flow_rate", "temperature", "turbidity"]
+
+_NUMBER = r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+PACKET_RE = re.compile(
+    r"^\s*Date:\s*(\d{4}-\d{2}-\d{2}) (\d{2})-(\d{2})-(\d{2})\s*;"
+    r"\s*Flow:\s*" + _NUMBER + r"\s*;"
+    r"\s*Temperature:\s*" + _NUMBER + r"\s*;"
+    r"\s*Turbidity:\s*" + _NUMBER + r"\s*;?\s*$",
+    re.MULTILINE,
+)
+
+
+def _timestamps(matches):
+    # Fast path for the fixed "%Y-%m-%d %H-%M-%S" layout: rebuild ISO strings
+    # and let NumPy parse the whole column at once
+    iso = [f"{d}T{h}:{m}:{s}" for d, h, m, s, *_ in matches]
+    try:
+        return np.array(iso, dtype="datetime64[s]").astype("datetime64[ns]"), None
+    except ValueError:
+        pass
+    # Some line has an impossible date (e.g. month 13); find it the slow way
+    times = np.empty(len(iso), dtype="datetime64[ns]")
+    ok = np.ones(len(iso), dtype=bool)
+    for i, value in enumerate(iso):
+        try:
+            times[i] = np.datetime64(value, "ns")
+        except ValueError:
+            ok[i] = False
+    return times, ok
+
+
+def parse_batch(lines):
+    # Returns (timestamps, values, errors): a datetime64[ns] array, an
+    # (n, 3) float array in COLUMNS order and the number of skipped lines
+    if isinstance(lines, str):
+        lines = [lines]
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty((0, len(COLUMNS))), 0
+
+    # Newlines inside a line would let one packet span two; strip them first
+    text = "\n".join(line.replace("\n", " ").replace("\r", " ") for line in lines)
+    matches = PACKET_RE.findall(text)
+    errors = len(lines) - len(matches)
+    if not matches:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty((0, len(COLUMNS))), errors
+
+    times, ok = _timestamps(matches)
+    values = np.array([m[4:] for m in matches], dtype=np.float64)
+    if ok is not None:
+        errors += int((~ok).sum())
+        times, values = times[ok], values[ok]
+    return times, values, errors
+
+
+def parse_packet(line):
+    # Single-line convenience wrapper: (timestamp, flow, temperature, turbidity) or None
+    times, values, _ = parse_batch([line])
+    if len(times) == 0:
+        return None
+    return (times[0], *values[0])
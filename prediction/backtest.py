@@ -0,0 +1,151 @@
+import argparse
+import ast
+import itertools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model import load_monthly
+
+# Rolling-origin cross-validation for the monthly Prophet model.
+# Every cutoff trains on all months before it and forecasts the next
+# `horizon` months; cutoffs advance by `period` months starting after
+# `initial` months of history. Each (setting, cutoff) fit is an independent
+# task in a process pool, so a sweep over several settings takes about as
+# long as its slowest fits rather than the sum of all of them.
+#
+#   python backtest.py --initial 24 --period 3 --horizon 12
+#   python backtest.py --grid changepoint_prior_scale=0.01,0.05,0.5 --grid seasonality_mode=additive,multiplicative
+
+INITIAL = 24   # months of history before the first cutoff
+PERIOD = 3     # months between cutoffs
+HORIZON = 12   # months forecast from every cutoff
+
+
+def cutoffs(n_months, initial=INITIAL, period=PERIOD):
+    # Positions of the first test month; every cutoff has at least one test month
+    return list(range(initial, n_months, period)) if n_months > initial else []
+
+
+def parse_grid(specs):
+    # ["a=1,2", "b=x"] -> [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}]
+    axes = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        axes[name] = [_parse_value(v) for v in values.split(",")]
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(axes[n] for n in names))]
+
+
+def _parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def setting_name(params):
+    return ", ".join(f"{k}={v}" for k, v in params.items()) or "default"
+
+
+def _fit_and_forecast(task):
+    # Runs in a worker: one fit at one cutoff, errors for every step ahead
+    params, monthly, cut, horizon = task
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").disabled = True
+
+    train = monthly.iloc[:cut]
+    test = monthly.iloc[cut:cut + horizon]
+    t0 = time.perf_counter()
+    model = Prophet(**params)
+    model.fit(train)
+    fit_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    forecast = model.predict(test[["ds"]])
+    predict_s = time.perf_counter() - t0
+
+    return pd.DataFrame({
+        "setting": setting_name(params),
+        "cutoff": train["ds"].iloc[-1],
+        "horizon": np.arange(1, len(test) + 1),
+        "ds": test["ds"].values,
+        "y": test["y"].values,
+        "yhat": forecast["yhat"].values,
+        "fit_s": fit_s,
+        "predict_s": predict_s,
+    })
+
+
+def run(monthly, settings, initial=INITIAL, period=PERIOD, horizon=HORIZON, workers=None):
+    cuts = cutoffs(len(monthly), initial, period)
+    if not cuts:
+        raise ValueError(f"need more than {initial} months of data, got {len(monthly)}")
+    tasks = [(params, monthly, cut, horizon) for params in settings for cut in cuts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pd.concat(pool.map(_fit_and_forecast, tasks), ignore_index=True)
+
+
+def summarize(results):
+    # MAE, RMSE and MAPE per setting and steps ahead
+    err = results["yhat"] - results["y"]
+    scored = results.assign(abs_err=err.abs(), sq_err=err ** 2, pct_err=(err / results["y"]).abs() * 100)
+    summary = scored.groupby(["setting", "horizon"]).agg(
+        n=("abs_err", "size"),
+        MAE=("abs_err", "mean"),
+        RMSE=("sq_err", "mean"),
+        MAPE=("pct_err", "mean"),
+    )
+    summary["RMSE"] = np.sqrt(summary["RMSE"])
+    return summary
+
+
+def timings(results):
+    # One row per fit: the per-horizon rows of a fit share its timings
+    fits = results.drop_duplicates(["setting", "cutoff"])
+    return fits.groupby("setting").agg(
+        fits=("fit_s", "size"),
+        fit_mean_s=("fit_s", "mean"),
+        predict_mean_s=("predict_s", "mean"),
+        total_s=("fit_s", "sum"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the monthly Prophet model")
+    parser.add_argument("--input", default="daily_aggregated.csv")
+    parser.add_argument("--initial", type=int, default=INITIAL, help="months before the first cutoff")
+    parser.add_argument("--period", type=int, default=PERIOD, help="months between cutoffs")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="months forecast per cutoff")
+    parser.add_argument("--grid", action="append", default=[], help="Prophet setting to sweep, e.g. changepoint_prior_scale=0.01,0.5")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--output", help="write the per-cutoff forecasts and errors to this CSV")
+    args = parser.parse_args()
+
+    monthly = load_monthly(args.input)
+    settings = parse_grid(args.grid) or [{}]
+    n_cuts = len(cutoffs(len(monthly), args.initial, args.period))
+    print(f"{len(monthly)} months, {n_cuts} cutoffs x {len(settings)} setting(s), horizon {args.horizon}")
+
+    started = time.perf_counter()
+    results = run(monthly, settings, args.initial, args.period, args.horizon, args.workers)
+    wall = time.perf_counter() - started
+
+    with pd.option_context("display.float_format", "{:,.2f}".format, "display.max_rows", None):
+        print("\n--- Accuracy per horizon (months ahead) ---")
+        print(summarize(results))
+        print("\n--- Timing per fit (seconds) ---")
+        print(timings(results))
+    fit_total = results.drop_duplicates(["setting", "cutoff"])[["fit_s", "predict_s"]].sum().sum()
+    print(f"\nWall time {wall:.1f}s for {fit_total:.1f}s of fitting and predicting (x{fit_total / wall:.1f})")
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Per-cutoff results saved to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
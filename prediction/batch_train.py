@@ -0,0 +1,160 @@
+import argparse
+import logging
+import os
+import resource
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# model_store.py lives at the repo root next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import model_store
+
+# Fit one monthly Prophet model per meter, in parallel, into a new version of
+# the model store (see model_store.py). The input is a long table with one
+# row per meter and day (or any finer interval); it is summed to monthly
+# totals per meter, like model.py does for the single household.
+# With --max-memory-mb every worker runs under an address-space limit (that
+# much on top of an idle worker), so one oversized series fails its own fit
+# with a MemoryError instead of taking the machine down; failed meters are
+# recorded in the index and the rest are published.
+#
+#   python batch_train.py meters.csv --workers 8 --max-memory-mb 1500
+#   python batch_train.py meters.parquet --id-col household --value-col liters
+
+HORIZON = 36        # months forecast per meter (the Projection slider maximum)
+MIN_MONTHS = 3      # shorter series are skipped
+KEEP_VERSIONS = 3
+
+
+def read_long(path, id_col, time_col, value_col):
+    columns = [id_col, time_col, value_col]
+    if path.endswith(".parquet") or os.path.isdir(path):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns, parse_dates=[time_col])
+    return df.rename(columns={id_col: "meter_id", time_col: "timestamp", value_col: "value"})
+
+
+def to_monthly(df):
+    # Long table -> monthly totals per meter in Prophet's ds/y layout
+    monthly = df.groupby(["meter_id", pd.Grouper(key="timestamp", freq="ME")])["value"].sum()
+    return monthly.reset_index().rename(columns={"timestamp": "ds", "value": "y"})
+
+
+def _address_space():
+    # Current virtual size of this process in bytes (Linux), 0 if unknown
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _init_worker(max_memory_mb):
+    # Prophet is imported before the limit is set, so the limit is the
+    # memory a fit may take on top of an idle worker
+    import prophet
+    logging.getLogger("cmdstanpy").disabled = True
+    if max_memory_mb:
+        limit = _address_space() + max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _fit_meter(task):
+    # Runs in a worker; never raises, so one bad meter can't stop the batch
+    i, meter_id, series, horizon = task
+    result = {"i": i, "meter_id": meter_id, "months": len(series), "last_ds": series["ds"].max()}
+    t0 = time.perf_counter()
+    try:
+        from prophet import Prophet
+        from prophet.serialize import model_to_json
+        model = Prophet()
+        model.fit(series[["ds", "y"]])
+        future = model.make_future_dataframe(periods=horizon, freq="ME")
+        forecast = model.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+        forecast.insert(0, "meter_id", meter_id)
+        result.update(status="ok", error="", model_json=model_to_json(model), forecast=forecast)
+    except MemoryError:
+        result.update(status="failed", error="MemoryError: over the worker memory limit")
+    except Exception as e:
+        result.update(status="failed", error="".join(traceback.format_exception_only(e)).strip())
+    result["fit_s"] = time.perf_counter() - t0
+    return result
+
+
+def train(monthly, root=model_store.MODEL_STORE, workers=None, max_memory_mb=None,
+          horizon=HORIZON, min_months=MIN_MONTHS, keep=KEEP_VERSIONS):
+    version, tmp = model_store.new_version(root)
+    tasks = []
+    skipped = []
+    for meter_id, series in monthly.groupby("meter_id", sort=True):
+        if len(series) < min_months:
+            skipped.append({"meter_id": meter_id, "months": len(series), "last_ds": series["ds"].max(),
+                            "status": "skipped", "error": f"fewer than {min_months} months"})
+            continue
+        tasks.append((len(tasks), meter_id, series.reset_index(drop=True), horizon))
+
+    index = []
+    forecasts = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(max_memory_mb,)) as pool:
+            for n, result in enumerate(pool.map(_fit_meter, tasks, chunksize=4), start=1):
+                model_json = result.pop("model_json", None)
+                forecast = result.pop("forecast", None)
+                i = result.pop("i")
+                if result["status"] == "ok":
+                    result["model_file"] = model_store.model_file(i)
+                    with open(os.path.join(tmp, result["model_file"]), "w") as f:
+                        f.write(model_json)
+                    forecasts.append(forecast)
+                index.append(result)
+                if n % 50 == 0 or n == len(tasks):
+                    print(f"  {n}/{len(tasks)} meters fitted")
+
+        index = pd.DataFrame(index + skipped, columns=["meter_id", "status", "months", "last_ds", "fit_s", "model_file", "error"])
+        model_store.write_table(index, tmp, "index.parquet")
+        columns = ["meter_id", "ds", "yhat", "yhat_lower", "yhat_upper"]
+        model_store.write_table(pd.concat(forecasts) if forecasts else pd.DataFrame(columns=columns), tmp, "forecasts.parquet")
+        model_store.write_table(monthly, tmp, "history.parquet")
+    except BaseException:
+        model_store.discard(tmp)
+        raise
+    model_store.publish(root, version, tmp)
+    model_store.prune(root, keep)
+    return version, index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a monthly Prophet model per meter into the model store")
+    parser.add_argument("input", help="long-format CSV or Parquet: one row per meter and timestamp")
+    parser.add_argument("--id-col", default="meter_id")
+    parser.add_argument("--time-col", default="timestamp")
+    parser.add_argument("--value-col", default="daily_liters_sum")
+    parser.add_argument("--store", default=model_store.MODEL_STORE)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--max-memory-mb", type=int, default=None, help="memory a worker may use for fitting, on top of its baseline")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="months to forecast per meter")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="versions to keep in the store")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    monthly = to_monthly(read_long(args.input, args.id_col, args.time_col, args.value_col))
+    print(f"{monthly['meter_id'].nunique()} meters, {len(monthly)} monthly rows")
+    version, index = train(monthly, args.store, args.workers, args.max_memory_mb, args.horizon, keep=args.keep)
+
+    counts = index["status"].value_counts()
+    print(f"\nVersion {version} published to {args.store} in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    for _, row in index[index["status"] == "failed"].iterrows():
+        print(f"  {row['meter_id']}: {row['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest import INITIAL, PERIOD, cutoffs
+from model import load_monthly
+
+# forecasters.py lives at the repo root next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import forecasters
+
+# Accuracy and latency of every forecasting engine on the same rolling-origin
+# cutoffs as backtest.py. Runs serially, so the timings are comparable.
+#   python compare_forecasters.py --horizon 12
+#   python compare_forecasters.py --engines holt_winters seasonal_naive
+
+HORIZON = 12
+
+
+def evaluate(name, monthly, cuts, horizon):
+    rows = []
+    for cut in cuts:
+        train = monthly.iloc[:cut]
+        test = monthly.iloc[cut:cut + horizon]
+        t0 = time.perf_counter()
+        engine = forecasters.make(name).fit(train)
+        fit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        forecast = engine.predict(len(test)).iloc[-len(test):]
+        predict_s = time.perf_counter() - t0
+        y = test["y"].to_numpy()
+        rows.append(pd.DataFrame({
+            "engine": name,
+            "y": y,
+            "yhat": forecast["yhat"].to_numpy(),
+            "inside": (y >= forecast["yhat_lower"].to_numpy()) & (y <= forecast["yhat_upper"].to_numpy()),
+            "fit_s": fit_s,
+            "predict_s": predict_s,
+            "cut": cut,
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+
+def cold_import_s(module):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare forecasting engines on the monthly series")
+    parser.add_argument("--input", default="daily_aggregated.csv")
+    parser.add_argument("--engines", nargs="+", default=list(forecasters.ENGINES), choices=list(forecasters.ENGINES))
+    parser.add_argument("--initial", type=int, default=INITIAL)
+    parser.add_argument("--period", type=int, default=PERIOD)
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    args = parser.parse_args()
+
+    monthly = load_monthly(args.input)
+    cuts = cutoffs(len(monthly), args.initial, args.period)
+    if not cuts:
+        parser.error(f"need more than {args.initial} months of data, got {len(monthly)}")
+    print(f"{len(monthly)} months, {len(cuts)} cutoffs, horizon {args.horizon}")
+
+    # model.py already imports Prophet here, so its import cost is measured in
+    # fresh interpreters (the NumPy engines need nothing pandas doesn't)
+    import_s = {}
+    if "prophet" in args.engines:
+        import_s["prophet"] = cold_import_s("prophet") - cold_import_s("pandas")
+
+    summary = []
+    for name in args.engines:
+        results = evaluate(name, monthly, cuts, args.horizon)
+        err = results["yhat"] - results["y"]
+        fits = results.drop_duplicates("cut")
+        summary.append({
+            "engine": name,
+            "MAE": err.abs().mean(),
+            "RMSE": np.sqrt((err ** 2).mean()),
+            "MAPE": (err / results["y"]).abs().mean() * 100,
+            f"coverage_{forecasters.INTERVAL_WIDTH:.0%}": results["inside"].mean() * 100,
+            "fit_ms": fits["fit_s"].mean() * 1000,
+            "predict_ms": fits["predict_s"].mean() * 1000,
+            "import_ms": import_s.get(name, 0.0) * 1000,
+        })
+
+    with pd.option_context("display.float_format", "{:,.2f}".format, "display.width", 200, "display.max_columns", None):
+        print(pd.DataFrame(summary).set_index("engine"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,190 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import os
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# storage.py lives at the repo root next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import storage
+
+# Synthetic 1-second water flow data, one month shard per task.
+# Every column is computed with whole-array NumPy operations, shards run in a
+# process pool, and each shard draws from its own generator seeded by
+# (seed, year, month), so the output is identical for any number of workers.
+#
+#   python data_factory.py                                   (2020-2024 CSV)
+#   python data_factory.py --start 2022-01-01 --end 2022-12-31 --format parquet
 
 # Define simulation parameters
 start_date = pd.Timestamp("2020-01-01")
 end_date = pd.Timestamp("2024-12-31")
 output_file = "simulated_water_flow_5_years.csv"
+COLUMNS = ["timestamp", "flow_rate", "day_type", "month", "temperature"]
 
 # Baseline water flow and amplitude for the daily pattern
 baseline = 5      # baseline flow rate in L/min
 amplitude = 5     # amplitude for daily variation
 
-# Function to determine seasonal factor based on month
-def seasonal_factor(m):
-    if m in [6, 7, 8]:
-        return 1.2  # higher usage in summer
-    elif m in [12, 1, 2]:
-        return 0.9  # lower usage in winter
-    else:
-        return 1.0  # average for other months
-
-# Remove output file if it exists (to avoid appending to an old file)
-if os.path.exists(output_file):
-    os.remove(output_file)
-
-first_chunk = True
-current = start_date
-
-while current <= end_date:
-    # Determine the end of the current month
-    next_month = (current + pd.offsets.MonthEnd(1)).normalize() + pd.Timedelta(seconds=1)
-    if next_month > end_date:
-        next_month = end_date + pd.Timedelta(seconds=1)
-    
-    # Generate 1-second interval timestamps for the month
-    timestamps = pd.date_range(start=current, end=next_month - pd.Timedelta(seconds=1), freq='S')
-    df = pd.DataFrame({'timestamp': timestamps})
-    
-    # Extract time-of-day as a fractional hour (e.g., 13.5 means 13:30:00)
-    df['hour_fraction'] = df['timestamp'].dt.hour + df['timestamp'].dt.minute / 60 + df['timestamp'].dt.second / 3600
-    
-    # Daily pattern: a combination to simulate two usage peaks (morning and evening)
-    df['daily_pattern'] = (np.sin(2 * np.pi * (df['hour_fraction'] / 24)) + 
-                            0.5 * np.sin(2 * np.pi * ((df['hour_fraction'] - 8) / 24)))
-    
-    # Seasonal factor based on the month
-    df['month'] = df['timestamp'].dt.month
-    df['seasonal_factor'] = df['month'].apply(seasonal_factor)
-    
-    # Weekend factor: slightly lower usage on weekends (Saturday=5, Sunday=6)
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['weekend_factor'] = df['day_of_week'].apply(lambda x: 0.95 if x >= 5 else 1.0)
-    
-    # Combine factors to simulate flow rate, and add random noise (std deviation = 1 L/min)
-    df['noise'] = np.random.normal(0, 1, size=len(df))
-    df['flow_rate'] = baseline + amplitude * df['daily_pattern'] * df['seasonal_factor'] * df['weekend_factor'] + df['noise']
-    df['flow_rate'] = df['flow_rate'].clip(lower=0)  # ensure no negative flow
-    
-    # Format the timestamp as "yyyy-mm-dd:HH:MM:SS"
-    df['timestamp'] = df['timestamp'].dt.strftime("%Y-%m-%d:%H:%M:%S")
-    
-    # Determine day type for additional context
-    df['day_type'] = df['timestamp'].apply(lambda ts: "Weekend" 
-                                           if pd.to_datetime(ts, format="%Y-%m-%d:%H:%M:%S").dayofweek >= 5 
-                                           else "Weekday")
-    
-    # Select desired columns
-    df_out = df[['timestamp', 'flow_rate', 'day_type', 'month']]
-    
-    # Write the chunk to CSV
-    if first_chunk:
-        df_out.to_csv(output_file, index=False, mode='w')
-        first_chunk = False
-    else:
-        df_out.to_csv(output_file, index=False, mode='a', header=False)
-    
-    print(f"Chunk for {current.strftime('%Y-%m')} written with {len(df_out)} records.")
-    
-    # Move to the next month
-    current = next_month
-
-print("Data generation complete!")
+# Seasonal factor by month (index 1-12): higher usage in summer, lower in winter
+SEASONAL_FACTOR = np.array([np.nan, 0.9, 0.9, 1.0, 1.0, 1.0, 1.2, 1.2, 1.2, 1.0, 1.0, 1.0, 0.9])
+
+# Water temperature (°C): yearly cycle peaking in late summer plus a small daily swing
+temp_mean = 15
+temp_yearly_amplitude = 7
+temp_daily_amplitude = 1.5
+
+
+def month_shards(start, end):
+    # [(shard_start, shard_end_exclusive), ...] split on calendar months
+    shards = []
+    current = pd.Timestamp(start)
+    stop = pd.Timestamp(end) + pd.Timedelta(days=1)
+    while current < stop:
+        next_month = (current + pd.offsets.MonthBegin(1)).normalize()
+        shards.append((current, min(next_month, stop)))
+        current = next_month
+    return shards
+
+
+def shard_rng(seed, shard_start):
+    # Independent stream per month, stable regardless of how shards are scheduled
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard_start.year, shard_start.month)))
+
+
+def generate_shard(shard_start, shard_end, seed=0):
+    rng = shard_rng(seed, shard_start)
+    seconds = np.arange(shard_start.value // 10**9, shard_end.value // 10**9, dtype=np.int64)
+    timestamps = seconds.astype("datetime64[s]")
+
+    # Time-of-day as a fractional hour (e.g., 13.5 means 13:30:00)
+    hour_fraction = (seconds % 86400) / 3600
+
+    # Daily pattern: two usage peaks (morning and evening)
+    daily_pattern = (np.sin(2 * np.pi * (hour_fraction / 24)) +
+                     0.5 * np.sin(2 * np.pi * ((hour_fraction - 8) / 24)))
+
+    # Calendar fields straight from the datetime64 values
+    days = seconds // 86400
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday; Monday=0
+    month = (timestamps.astype("datetime64[M]").astype(np.int64) % 12) + 1
+    day_of_year = (timestamps.astype("datetime64[D]") - timestamps.astype("datetime64[Y]")).astype(np.int64)
+
+    seasonal = SEASONAL_FACTOR[month]
+    weekend = np.where(day_of_week >= 5, 0.95, 1.0)
+
+    # Combine factors to simulate flow rate, with random noise (std deviation = 1 L/min)
+    noise = rng.normal(0, 1, size=len(seconds))
+    flow_rate = np.clip(baseline + amplitude * daily_pattern * seasonal * weekend + noise, 0, None)
+
+    temperature = (temp_mean
+                   + temp_yearly_amplitude * np.sin(2 * np.pi * (day_of_year - 110) / 365.25)
+                   + temp_daily_amplitude * np.sin(2 * np.pi * (hour_fraction - 9) / 24)
+                   + rng.normal(0, 0.3, size=len(seconds)))
+
+    day_type = pd.Categorical.from_codes((day_of_week >= 5).astype(np.int8), categories=["Weekday", "Weekend"])
+
+    # Same columns as the original script, plus the temperature data_preprocessing.py expects
+    return pd.DataFrame({
+        "timestamp": timestamps.astype("datetime64[ns]"),
+        "flow_rate": flow_rate,
+        "day_type": day_type,
+        "month": month,
+        "temperature": temperature,
+    })
+
+
+def format_timestamps(timestamps):
+    # "yyyy-mm-dd:HH:MM:SS" as fixed-width bytes, digit by digit with array
+    # arithmetic (strftime on millions of rows dominates otherwise)
+    ts = timestamps.astype("datetime64[s]")
+    days = ts.astype("datetime64[D]")
+    months = ts.astype("datetime64[M]")
+    year = ts.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months.astype("datetime64[D]")).astype(np.int64) + 1
+    second_of_day = (ts - days.astype("datetime64[s]")).astype(np.int64)
+    fields = [
+        (0, 4, year), (5, 2, month), (8, 2, day),
+        (11, 2, second_of_day // 3600), (14, 2, second_of_day // 60 % 60), (17, 2, second_of_day % 60),
+    ]
+    out = np.empty((len(ts), 19), dtype=np.uint8)
+    for offset, width, value in fields:
+        for k in range(width):
+            out[:, offset + width - 1 - k] = ord("0") + (value // 10**k) % 10
+    out[:, [4, 7]] = ord("-")
+    out[:, [10, 13, 16]] = ord(":")
+    return out.view("S19").ravel()
+
+
+def _write_shard(task):
+    index, shard_start, shard_end, seed, fmt, out = task
+    df = generate_shard(shard_start, shard_end, seed)
+    if fmt == "parquet":
+        storage.write_partitions(df, out, basename=f"part-{index:05d}-{{i}}.parquet")
+        return None, len(df)
+    part_file = f"{out}.part{index:05d}"
+    table = pa.Table.from_pandas(df.drop(columns="timestamp"), preserve_index=False)
+    table = table.add_column(0, "timestamp", pa.array(format_timestamps(df["timestamp"].values)).cast(pa.string()))
+    options = pa_csv.WriteOptions(include_header=False, batch_size=64 * 1024, quoting_style="none")
+    pa_csv.write_csv(table, part_file, write_options=options)
+    return part_file, len(df)
+
+
+def generate(start, end, out, fmt="csv", workers=None, seed=0):
+    shards = month_shards(start, end)
+    tasks = [(i, s, e, seed, fmt, out) for i, (s, e) in enumerate(shards)]
+
+    # Remove old output (to avoid appending to an old file)
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    elif os.path.exists(out):
+        os.remove(out)
+
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if fmt == "parquet":
+            for (shard_start, _), (_, n) in zip(shards, pool.map(_write_shard, tasks)):
+                rows += n
+                print(f"Chunk for {shard_start.strftime('%Y-%m')} written with {n} records.")
+        else:
+            # Shards finish out of order; stitch the part files together in order
+            with open(out, "wb") as f:
+                f.write((",".join(COLUMNS) + "\n").encode())
+                for (shard_start, _), (part_file, n) in zip(shards, pool.map(_write_shard, tasks)):
+                    with open(part_file, "rb") as part:
+                        shutil.copyfileobj(part, f, length=16 * 1024 * 1024)
+                    os.remove(part_file)
+                    rows += n
+                    print(f"Chunk for {shard_start.strftime('%Y-%m')} written with {n} records.")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic 1-second water flow data")
+    parser.add_argument("--start", default=str(start_date.date()))
+    parser.add_argument("--end", default=str(end_date.date()), help="last day (inclusive)")
+    parser.add_argument("--output", default=None, help="CSV file, or store directory for parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.output
+    if out is None:
+        out = output_file if args.format == "csv" else storage.store_path(os.path.splitext(output_file)[0])
+
+    started = time.perf_counter()
+    rows = generate(pd.Timestamp(args.start), pd.Timestamp(args.end), out, args.format, args.workers, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Data generation complete! {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,175 @@
+import argparse
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
+
+# storage.py lives at the repo root next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import storage
+
+RAW_TIMESTAMP_FORMAT = "%Y-%m-%d:%H:%M:%S"
+CSV_FILE = "simulated_water_flow_3_years.csv"
+OUTPUT_FILE = "daily_aggregated.csv"
+CHUNK_MB = 64
+WATERMARK_SUFFIX = ".watermark.json"
+ROLLING_CONTEXT_DAYS = 29  # days before the first new day the 30-day window can reach
+
+# Per-day partial aggregates. Every column merges with a plain sum/min/max,
+# so partials from any split of the input combine into the exact daily totals.
+PARTIAL_MERGE = {
+    "flow_sum": "sum",
+    "flow_count": "sum",
+    "flow_max": "max",
+    "flow_min": "min",
+    "temp_sum": "sum",
+    "temp_count": "sum",
+}
+
+
+def raw_store_path(csv_file):
+    return storage.store_path(os.path.splitext(os.path.basename(csv_file))[0])
 
-def main():
-    # 1. Load the CSV
-    csv_file = "simulated_water_flow_3_years.csv"
-    print(f"Reading CSV: {csv_file}")
-    
-    # Parse timestamp with the known format "yyyy-mm-dd:HH:MM:SS"
-    df = pd.read_csv(
-        csv_file,
-        parse_dates=["timestamp"],
-        date_parser=lambda x: pd.to_datetime(x, format="%Y-%m-%d:%H:%M:%S")
+
+def partial_daily(df):
+    # Mergeable daily partials for one chunk of raw rows
+    day = df["timestamp"].values.astype("datetime64[D]")
+    return df.groupby(day).agg(
+        flow_sum=("flow_rate", "sum"),
+        flow_count=("flow_rate", "count"),
+        flow_max=("flow_rate", "max"),
+        flow_min=("flow_rate", "min"),
+        temp_sum=("temperature", "sum"),
+        temp_count=("temperature", "count"),
     )
-    
+
+
+def merge_partials(partials):
+    return pd.concat(partials).groupby(level=0).agg(PARTIAL_MERGE)
+
+
+def csv_ranges(csv_file, chunk_bytes):
+    # Split the file into byte ranges that each end on a line boundary
+    size = os.path.getsize(csv_file)
+    ranges = []
+    with open(csv_file, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def _aggregate_csv_range(task):
+    csv_file, header, start, end = task
+    with open(csv_file, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), usecols=["timestamp", "flow_rate", "temperature"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format=RAW_TIMESTAMP_FORMAT)
+    return partial_daily(df)
+
+
+def _aggregate_parquet_file(path):
+    df = pq.read_table(path, columns=["timestamp", "flow_rate", "temperature"]).to_pandas()
+    return partial_daily(df)
+
+
+def stream_daily(csv_file, workers=None, chunk_mb=CHUNK_MB, since=None):
+    # Out-of-core daily aggregation: chunks are parsed and reduced to daily
+    # partials in worker processes, and the partials are merged as they come
+    # back. A day split across two chunks simply has two partials. Only
+    # `workers` chunks are ever in memory at once, however long the input.
+    # With `since`, only raw data from that day onwards is read.
+    raw_store = raw_store_path(csv_file)
+    use_store = storage.store_exists(raw_store) and (
+        not os.path.exists(csv_file) or storage.store_mtime(raw_store) >= os.path.getmtime(csv_file)
+    )
+    if use_store:
+        print(f"Streaming store: {raw_store}")
+        files = []
+        for year, month, part_dir in storage.list_partitions(raw_store):
+            if since is not None and pd.Timestamp(year=year, month=month, day=1) + pd.offsets.MonthBegin(1) <= since:
+                continue
+            files.extend(os.path.join(part_dir, f) for f in sorted(os.listdir(part_dir)) if f.endswith(".parquet"))
+        fn, tasks = _aggregate_parquet_file, files
+    else:
+        print(f"Streaming CSV: {csv_file} in {chunk_mb} MB chunks")
+        header, ranges = csv_ranges(csv_file, chunk_mb * 1024 * 1024)
+        if since is not None:
+            ranges = ranges[first_range_at(csv_file, ranges, since):]
+        fn, tasks = _aggregate_csv_range, [(csv_file, header, start, end) for start, end in ranges]
+
+    merged = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i, partial in enumerate(pool.map(fn, tasks)):
+            if since is not None:
+                partial = partial[partial.index >= since]
+            merged = partial if merged is None else merge_partials([merged, partial])
+            print(f"  chunk {i + 1}/{len(tasks)} merged ({len(merged)} days so far)")
+    if merged is None:
+        return pd.DataFrame(columns=list(PARTIAL_MERGE))
+    return merged
+
+
+def first_range_at(csv_file, ranges, since):
+    # Index of the first byte range that can hold rows on or after `since`,
+    # found by bisecting on each range's first timestamp (the file is in time order)
+    def first_timestamp(start):
+        with open(csv_file, "rb") as f:
+            f.seek(start)
+            line = f.readline().decode()
+        return pd.to_datetime(line.split(",")[0], format=RAW_TIMESTAMP_FORMAT)
+
+    lo, hi = 0, len(ranges)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if first_timestamp(ranges[mid][0]) < since:
+            lo = mid + 1
+        else:
+            hi = mid
+    return max(lo - 1, 0)
+
+
+def partials_to_daily(merged, start=None):
+    # Finish the merged partials into the same daily columns as the in-memory path
+    merged.index = pd.DatetimeIndex(merged.index, name="timestamp")
+    if len(merged):
+        first = merged.index.min() if start is None else start
+        merged = merged.reindex(pd.date_range(first, merged.index.max(), freq="D", name="timestamp"))
+    daily_agg = pd.DataFrame(index=merged.index)
+    daily_agg["daily_liters_sum"] = merged["flow_sum"].fillna(0) * (1.0 / 60.0)
+    daily_agg["daily_flow_mean"] = merged["flow_sum"] / merged["flow_count"].where(merged["flow_count"] > 0)
+    daily_agg["daily_flow_max"] = merged["flow_max"]
+    daily_agg["daily_flow_min"] = merged["flow_min"]
+    daily_agg["daily_temp_mean"] = merged["temp_sum"] / merged["temp_count"].where(merged["temp_count"] > 0)
+    return daily_agg.reset_index()
+
+
+def load_daily_in_memory(csv_file):
+    # 1. Load the raw data
+    raw_store = raw_store_path(csv_file)
+    print(f"Reading: {csv_file} (store: {raw_store})")
+
+    # The CSV is converted once into the partitioned Parquet store; only the
+    # columns used below are read back. Falls back to parsing the CSV directly
+    # with the known format "yyyy-mm-dd:HH:MM:SS".
+    df = storage.load_or_convert(
+        csv_file, raw_store, columns=["flow_rate", "temperature"], timestamp_format=RAW_TIMESTAMP_FORMAT
+    )
+    if df is None:
+        df = pd.read_csv(csv_file, usecols=["timestamp", "flow_rate", "temperature"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format=RAW_TIMESTAMP_FORMAT)
+
     # 2. Set timestamp as index and sort by time
     df.set_index("timestamp", inplace=True)
     df.sort_index(inplace=True)
@@ -51,7 +208,10 @@ def main():
         "daily_temp_mean"      # average temperature
     ]
     daily_agg.reset_index(inplace=True)
+    return daily_agg
 
+
+def add_features(daily_agg):
     # ------------------------------------------------------------------
     # 5. Add Time-Based Features (year, month, day, day_of_week, day_type)
     # ------------------------------------------------------------------
@@ -60,29 +220,108 @@ def main():
     daily_agg["day"] = daily_agg["timestamp"].dt.day
     daily_agg["day_of_week"] = daily_agg["timestamp"].dt.dayofweek  # Monday=0, Sunday=6
 
-    def classify_day_type(row):
-        # Weekend if Saturday (5) or Sunday (6)
-        return "Weekend" if row["day_of_week"] in [5, 6] else "Weekday"
-    
-    daily_agg["day_type"] = daily_agg.apply(classify_day_type, axis=1)
+    # Weekend if Saturday (5) or Sunday (6)
+    daily_agg["day_type"] = np.where(daily_agg["day_of_week"] >= 5, "Weekend", "Weekday")
+    return daily_agg
+
 
+def add_rolling(daily_agg, history=None):
     # ------------------------------------------------------------------
     # 6. Rolling Averages (on daily_liters_sum)
     #    - 7-day and 30-day rolling means
+    #    `history` holds the daily sums just before daily_agg, so windows
+    #    that reach back past its first day still see the earlier days.
     # ------------------------------------------------------------------
-    daily_agg.set_index("timestamp", inplace=True)
-    daily_agg["rolling_7d_liters_mean"] = daily_agg["daily_liters_sum"].rolling(window=7, min_periods=1).mean()
-    daily_agg["rolling_30d_liters_mean"] = daily_agg["daily_liters_sum"].rolling(window=30, min_periods=1).mean()
-    daily_agg.reset_index(inplace=True)
+    liters = daily_agg.set_index("timestamp")["daily_liters_sum"]
+    if history is not None and len(history):
+        liters = pd.concat([history.tail(ROLLING_CONTEXT_DAYS), liters])
+    rolling_7d = liters.rolling(window=7, min_periods=1).mean()
+    rolling_30d = liters.rolling(window=30, min_periods=1).mean()
+    daily_agg["rolling_7d_liters_mean"] = rolling_7d.iloc[-len(daily_agg):].values if len(daily_agg) else []
+    daily_agg["rolling_30d_liters_mean"] = rolling_30d.iloc[-len(daily_agg):].values if len(daily_agg) else []
+    return daily_agg
+
+
+def read_watermark(output_file):
+    path = output_file + WATERMARK_SUFFIX
+    if not os.path.exists(path) or not os.path.exists(output_file):
+        return None
+    with open(path) as f:
+        return pd.Timestamp(json.load(f)["last_complete_day"])
+
+
+def write_watermark(output_file, last_complete_day):
+    path = output_file + WATERMARK_SUFFIX
+    with open(path + ".tmp", "w") as f:
+        json.dump({"last_complete_day": str(last_complete_day.date())}, f)
+    os.replace(path + ".tmp", path)
+
+
+def refresh(csv_file, output_file, workers=None, chunk_mb=CHUNK_MB):
+    # Incremental refresh: only raw data after the watermark (the last day
+    # known to be complete) is read, only those days are recomputed, and only
+    # their rolling windows are updated. The newest day in the raw data may
+    # still be filling up, so it is recomputed on the next run as well.
+    watermark = read_watermark(output_file)
+    if watermark is None:
+        print("No watermark yet; aggregating everything")
+        since = None
+        existing = None
+    else:
+        since = watermark + pd.Timedelta(days=1)
+        print(f"Watermark {watermark.date()}; refreshing from {since.date()}")
+        existing = pd.read_csv(output_file, parse_dates=["timestamp"])
+        existing = existing[existing["timestamp"] < since]
+
+    new_days = partials_to_daily(stream_daily(csv_file, workers=workers, chunk_mb=chunk_mb, since=since), start=since)
+    if new_days.empty:
+        print("No new data since the watermark.")
+        return existing
+
+    history = None if existing is None else existing.set_index("timestamp")["daily_liters_sum"]
+    new_days = add_rolling(add_features(new_days), history)
+    daily_agg = new_days if existing is None else pd.concat([existing, new_days], ignore_index=True)
+
+    daily_agg.to_csv(output_file + ".tmp", index=False)
+    os.replace(output_file + ".tmp", output_file)
+    last_complete_day = new_days["timestamp"].max() - pd.Timedelta(days=1)
+    if watermark is None or last_complete_day > watermark:
+        write_watermark(output_file, last_complete_day)
+    print(f"Refreshed {len(new_days)} day(s); {len(daily_agg)} days in {output_file}.")
+    return daily_agg
+
+
+def main(stream=False, workers=None, chunk_mb=CHUNK_MB, csv_file=CSV_FILE, output_file=OUTPUT_FILE, incremental=False):
+    if incremental:
+        refresh(csv_file, output_file, workers=workers, chunk_mb=chunk_mb)
+        return
+
+    if stream:
+        daily_agg = partials_to_daily(stream_daily(csv_file, workers=workers, chunk_mb=chunk_mb))
+    else:
+        daily_agg = load_daily_in_memory(csv_file)
+
+    daily_agg = add_rolling(add_features(daily_agg))
 
     # Quick peek at the final daily dataset
     print("\n--- Daily Aggregated Data (Head) ---")
     print(daily_agg.head())
 
     # 7. Save aggregated data
-    output_file = "daily_aggregated.csv"
     daily_agg.to_csv(output_file, index=False)
+    if len(daily_agg):
+        write_watermark(output_file, daily_agg["timestamp"].max() - pd.Timedelta(days=1))
     print(f"\nDaily aggregated data saved to {output_file}.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Aggregate 1-second water flow data to daily features")
+    parser.add_argument("--input", default=CSV_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--stream", action="store_true", help="out-of-core mode with bounded memory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for --stream")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_MB, help="CSV chunk size for --stream")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only aggregate raw data after the stored watermark (streams the input)")
+    args = parser.parse_args()
+    main(stream=args.stream, workers=args.workers, chunk_mb=args.chunk_mb, csv_file=args.input,
+         output_file=args.output, incremental=args.incremental)
@@ -1,3 +1,5 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import pickle
@@ -6,13 +8,22 @@ from prophet import Prophet
 from prophet.plot import plot_plotly
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
-def main():
-    # 1. Load daily aggregated data and resample to monthly totals
-    df_daily = pd.read_csv("daily_aggregated.csv", parse_dates=["timestamp"])
+# forecasts.py lives at the repo root next to app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import forecasts
+
+def load_monthly(daily_csv="daily_aggregated.csv"):
+    # Daily aggregated data resampled to monthly totals, in Prophet's ds/y layout
+    df_daily = pd.read_csv(daily_csv, parse_dates=["timestamp"])
     df_daily.set_index("timestamp", inplace=True)
     monthly_data = df_daily.resample("M").agg({"daily_liters_sum": "sum"})
     monthly_data.reset_index(inplace=True)
     monthly_data.rename(columns={"timestamp": "ds", "daily_liters_sum": "y"}, inplace=True)
+    return monthly_data
+
+def main():
+    # 1. Load daily aggregated data and resample to monthly totals
+    monthly_data = load_monthly()
     print("Monthly Data Head:")
     print(monthly_data.head())
 
@@ -60,6 +71,10 @@ def main():
         pickle.dump(model_full, f)
     print("\nProphet model saved as 'prophet_model.pkl'.")
 
+    # Precompute the Projection tab's forecasts for every slider horizon
+    table = forecasts.write_table(model_full, "prophet_model.pkl")
+    print(f"Forecasts for horizons {forecasts.HORIZONS} saved as '{table}'.")
+
     # 7. Create an interactive Plotly chart
     last_hist_date = monthly_data['ds'].max()
     forecast_future = forecast_full[forecast_full['ds'] > last_hist_date]
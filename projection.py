@@ -0,0 +1,117 @@
+import pickle
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+import forecasters
+import forecasts
+import insights
+import model_store
+import storage
+
+# Everything the Projection tab needs, in one place. app.py imports this
+# module only when the tab is first opened, so plotly (and Prophet, which
+# comes in with the pickled model on a forecast-table miss) stay out of the
+# Historical and Real Time startup path.
+
+DAILY_CSV = "daily_aggregated.csv"
+DAILY_STORE = storage.store_path("daily_aggregated")
+MODEL_PATH = "./prediction/prophet_model.pkl"
+# Sidebar label -> forecasters engine; the NumPy ones fit on the fly in milliseconds
+ENGINES = {
+    "Prophet": "prophet",
+    "Holt-Winters": "holt_winters",
+    "Seasonal naive": "seasonal_naive",
+}
+
+
+@st.cache_resource
+def load_prophet_model():
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    return model
+
+@st.cache_resource
+def insights_service():
+    # One response cache and worker pool shared by every session
+    return insights.InsightsService()
+
+@st.cache_data(max_entries=2)
+def model_fingerprint(mtime):
+    return forecasts.model_fingerprint(MODEL_PATH)
+
+@st.cache_data(max_entries=2 * len(forecasts.HORIZONS))
+def load_forecast(fingerprint, horizon):
+    # Served from the table model.py precomputes; Prophet's predict (with its
+    # uncertainty sampling) only runs when the table doesn't match the model
+    forecast = forecasts.precomputed(MODEL_PATH, fingerprint, horizon)
+    if forecast is None:
+        forecast = forecasts.predict(load_prophet_model(), horizon)
+    return forecast
+
+@st.cache_data(max_entries=2)
+def meter_ids(version):
+    # Meters with a fitted model in this version of the batch model store
+    index = model_store.read_index(version=version)
+    return index.loc[index["status"] == "ok", "meter_id"].tolist()
+
+@st.cache_data(max_entries=64)
+def load_meter_forecast(version, meter_id, horizon):
+    # One meter's monthly history and precomputed forecast, read without
+    # touching any other meter's rows or models
+    monthly_data = model_store.meter_history(meter_id, version=version)[["ds", "y"]]
+    forecast = model_store.meter_forecast(meter_id, version=version).drop(columns="meter_id")
+    return monthly_data, forecast.iloc[: len(monthly_data) + horizon]
+
+@st.cache_data(max_entries=64)
+def fast_forecast(engine, monthly_data, horizon):
+    return forecasters.make(engine).fit(monthly_data).predict(horizon)
+
+@st.cache_data
+def load_historical_data():
+    # Load the daily aggregated data and resample to monthly totals
+    df_daily = storage.load_or_convert(DAILY_CSV, DAILY_STORE, columns=["daily_liters_sum"], timestamp_format=None)
+    if df_daily is None:
+        df_daily = pd.read_csv(DAILY_CSV, parse_dates=["timestamp"])
+    df_daily.set_index("timestamp", inplace=True)
+    monthly_data = df_daily.resample("ME").agg({"daily_liters_sum": "sum"})
+    monthly_data.reset_index(inplace=True)
+    monthly_data.rename(columns={"timestamp": "ds", "daily_liters_sum": "y"}, inplace=True)
+    return monthly_data
+
+def create_forecast_chart(monthly_data, forecast):
+    last_hist_date = monthly_data['ds'].max()
+    forecast_future = forecast[forecast['ds'] > last_hist_date]
+    historical_trace = go.Scatter(
+        x=monthly_data['ds'],
+        y=monthly_data['y'],
+        mode='lines+markers',
+        name='Historical',
+        line=dict(color='blue')
+    )
+    forecast_trace = go.Scatter(
+        x=forecast_future['ds'],
+        y=forecast_future['yhat'],
+        mode='lines+markers',
+        name='Forecast',
+        line=dict(color='red')
+    )
+    ci_trace = go.Scatter(
+        x=forecast_future['ds'].tolist() + forecast_future['ds'][::-1].tolist(),
+        y=forecast_future['yhat_upper'].tolist() + forecast_future['yhat_lower'][::-1].tolist(),
+        fill='toself',
+        fillcolor='rgba(255, 0, 0, 0.2)',
+        line=dict(color='rgba(255,255,255,0)'),
+        hoverinfo="skip",
+        showlegend=True,
+        name='Confidence Interval'
+    )
+    fig = go.Figure(data=[historical_trace, forecast_trace, ci_trace])
+    fig.update_layout(
+        title="Historical Water Usage & 2-Year Forecast",
+        xaxis_title="Date",
+        yaxis_title="Monthly Water Usage (Liters)",
+        template="plotly_white"
+    )
+    return fig
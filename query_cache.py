@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Process-wide cache of Historical query results, shared by every session
+# and rerun. Entries are keyed by the query (view, level, range) and
+# remember the [start, end) window of samples they were computed from.
+#   cache.get_or_compute(key, start, end, version, lambda: ...)
+# Memory is bounded by budget_bytes (DataFrames counted with deep=True);
+# past it the least recently used entries go first.
+# The cache follows the data version (the raw store's mtime). When the
+# version moves on, the changes log the compactor keeps next to the rollups
+# (rollups.record_change) says which span of time the new samples cover, and
+# only entries whose window overlaps it are dropped; last week's views stay
+# cached while today's are recomputed. A version the log doesn't cover (the
+# CSV reconverted, a store rebuilt by hand) drops everything.
+# Results are shared objects: callers must not modify them.
+
+BUDGET_MB = float(os.getenv("HYDROMIND_QUERY_CACHE_MB", "64"))
+
+
+def sizeof(value):
+    # Bytes an entry holds, close enough for budgeting
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    def __init__(self, budget_bytes=BUDGET_MB * 2**20, changes=None):
+        # changes() -> [[version, first in ns, last in ns], ...] as rollups.read_changes gives
+        self.budget_bytes = budget_bytes
+        self.changes = changes
+        self.version = None
+        self.bytes = 0
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "uncached": 0}
+        self._entries = OrderedDict()  # key -> (value, start in ns, end in ns, nbytes)
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, start, end, version, compute):
+        with self._lock:
+            if version != self.version:
+                self._advance(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counts["hits"] += 1
+                metrics.inc("query_cache_hits_total")
+                return entry[0]
+            self.counts["misses"] += 1
+            metrics.inc("query_cache_misses_total")
+
+        # Computed outside the lock; two sessions missing the same key at
+        # once both compute it, which is cheaper than making one wait
+        value = compute()
+        nbytes = sizeof(value)
+        with self._lock:
+            if version != self.version or nbytes > self.budget_bytes:
+                # From an older version than the cache holds, or too big to keep
+                self.counts["uncached"] += 1
+                return value
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[3]
+            self._entries[key] = (value, pd.Timestamp(start).value, pd.Timestamp(end).value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.budget_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][3]
+                self.counts["evictions"] += 1
+            self._gauges()
+        return value
+
+    def _advance(self, version):
+        # Moves the cache to `version`, keeping what the changes since allow.
+        # A session still on an older version is served what is cached but
+        # stores nothing.
+        if self.version is not None and version is not None and version < self.version:
+            return
+        landed = None
+        if self.version is not None and self._entries:
+            changes = self.changes() if self.changes is not None else []
+            if changes and max(change[0] for change in changes) >= version:
+                landed = [(first, last) for v, first, last in changes if self.version < v <= version]
+        if landed is None:
+            dropped = list(self._entries)
+        else:
+            dropped = [key for key, (_, start, end, _) in self._entries.items()
+                       if any(start <= last and first < end for first, last in landed)]
+        for key in dropped:
+            self.bytes -= self._entries.pop(key)[3]
+        self.counts["invalidations"] += len(dropped)
+        self.version = version
+        self._gauges()
+
+    def _gauges(self):
+        metrics.gauge("query_cache_bytes", self.bytes)
+        metrics.gauge("query_cache_entries", len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self._gauges()
+
+    def stats(self):
+        # For sizing: hit ratio, how full it is and how much was pushed out
+        with self._lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return dict(
+                self.counts,
+                hit_ratio=self.counts["hits"] / lookups if lookups else 0.0,
+                entries=len(self._entries),
+                bytes=self.bytes,
+                budget_bytes=self.budget_bytes,
+                version=self.version,
+            )
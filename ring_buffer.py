@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Fixed-capacity circular buffer for the live sensor stream.
+# Every sample is written twice, at slot i and at slot i + capacity, so the
+# newest `size` samples always sit contiguously in [head, head + size) and can
+# be handed out as a NumPy view. Appends are O(1) and memory never grows.
+
+
+class RingBuffer:
+    def __init__(self, columns, capacity, max_age=None):
+        # max_age (a Timedelta) optionally trims the view to the last T of data
+        self.columns = list(columns)
+        self.capacity = int(capacity)
+        self.max_age = pd.Timedelta(max_age) if max_age is not None else None
+        self._times = np.zeros(2 * self.capacity, dtype="datetime64[ns]")
+        self._values = np.full((2 * self.capacity, len(self.columns)), np.nan)
+        self._next = 0
+        self.size = 0
+        self.total = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, values):
+        i = self._next
+        t = np.datetime64(pd.Timestamp(timestamp), "ns")
+        self._times[i] = t
+        self._times[i + self.capacity] = t
+        self._values[i] = values
+        self._values[i + self.capacity] = values
+        self._next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, timestamps, values):
+        # Batch append; only the last `capacity` rows can survive anyway
+        total = len(timestamps)
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")[-self.capacity:]
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.columns))[-self.capacity:]
+        k = len(timestamps)
+        slots = (self._next + np.arange(k)) % self.capacity
+        self._times[slots] = timestamps
+        self._times[slots + self.capacity] = timestamps
+        self._values[slots] = values
+        self._values[slots + self.capacity] = values
+        self._next = (self._next + k) % self.capacity
+        self.size = min(self.size + k, self.capacity)
+        self.total += total
+
+    def _bounds(self):
+        end = self._next + self.capacity if self.size == self.capacity else self._next
+        start = end - self.size
+        if self.max_age is not None and self.size:
+            newest = self._times[end - 1]
+            cutoff = newest - self.max_age.to_timedelta64()
+            start += int(np.searchsorted(self._times[start:end], cutoff, side="left"))
+        return start, end
+
+    def times(self):
+        start, end = self._bounds()
+        return self._times[start:end]
+
+    def values(self, column=None):
+        start, end = self._bounds()
+        if column is None:
+            return self._values[start:end]
+        return self._values[start:end, self.columns.index(column)]
+
+    def frame(self):
+        # Oldest-to-newest DataFrame indexed by timestamp over the buffer's
+        # memory; valid until the next append overwrites the oldest slot
+        start, end = self._bounds()
+        index = pd.DatetimeIndex(self._times[start:end], name="timestamp")
+        return pd.DataFrame(self._values[start:end], index=index, columns=self.columns, copy=False)
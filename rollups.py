@@ -0,0 +1,280 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import stats
+import storage
+import time_index
+
+# Multi-resolution rollups of the raw sensor history.
+# Each level is a table indexed by bin start with <column>_sum, _count, _min,
+# _max and _mean for every numeric column. Only the 10-minute level is built
+# from raw samples; the coarser levels are rolled up from it. All four stats
+# merge associatively, so new samples are folded in without rescanning history.
+
+LEVELS = {
+    "10min": "10min",
+    "hourly": "60min",
+    "12h": "720min",
+    "daily": "1D",
+}
+STATS = ["sum", "count", "min", "max"]
+CHANGES = "changes.json"
+MAX_CHANGES = 256
+MANIFEST = "current.json"
+KEEP_BUILDS = 2
+
+
+def _flatten(grouped):
+    grouped.columns = [f"{col}_{stat}" for col, stat in grouped.columns]
+    grouped.index.name = "timestamp"
+    return grouped
+
+
+def value_columns(table):
+    return [c[: -len("_sum")] for c in table.columns if c.endswith("_sum")]
+
+
+def _add_means(table):
+    for col in value_columns(table):
+        count = table[f"{col}_count"]
+        table[f"{col}_mean"] = table[f"{col}_sum"] / count.where(count > 0)
+    return table
+
+
+def _bin_raw(df, freq):
+    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    grouped = df.groupby(df["timestamp"].dt.floor(freq))[numeric_columns].agg(STATS)
+    return _flatten(grouped)
+
+
+def _roll_up(table, freq):
+    # Coarser bins from finer ones: sums and counts add, mins/maxes reduce
+    how = {}
+    for col in value_columns(table):
+        how[f"{col}_sum"] = "sum"
+        how[f"{col}_count"] = "sum"
+        how[f"{col}_min"] = "min"
+        how[f"{col}_max"] = "max"
+    return table.groupby(table.index.floor(freq)).agg(how)
+
+
+def build_rollups(df):
+    base = _bin_raw(stats.with_volume(df), LEVELS["10min"])
+    tables = {"10min": base}
+    for level, freq in LEVELS.items():
+        if level != "10min":
+            tables[level] = _roll_up(base, freq)
+    return {level: _add_means(table.sort_index()) for level, table in tables.items()}
+
+
+def _merge(old, new):
+    # Combine two partial tables of the same level, bin by bin
+    combined = pd.concat([old, new])
+    how = {}
+    for col in value_columns(new):
+        how[f"{col}_sum"] = "sum"
+        how[f"{col}_count"] = "sum"
+        how[f"{col}_min"] = "min"
+        how[f"{col}_max"] = "max"
+    merged = combined[list(how)].groupby(level=0).agg(how)
+    return _add_means(merged.sort_index())
+
+
+def update_rollups(rollups, new_rows):
+    # Fold newly arrived raw samples into every level. Only the bins the new
+    # rows fall into are touched; the rest of each table is carried over as is.
+    if new_rows.empty:
+        return rollups
+    fresh = build_rollups(new_rows)
+    updated = {}
+    for level, table in rollups.items():
+        first_bin = fresh[level].index.min()
+        untouched = table[table.index < first_bin]
+        touched = table[table.index >= first_bin]
+        updated[level] = pd.concat([untouched, _merge(touched, fresh[level])])
+    return updated
+
+
+def replace_since(rollups, recent_rows, since):
+    # Recompute every bin from `since` (a day boundary) onwards out of the raw
+    # rows for that period. Unlike update_rollups this is idempotent, so it's
+    # safe to repeat after a crash.
+    since = pd.Timestamp(since)
+    fresh = build_rollups(recent_rows) if not recent_rows.empty else None
+    replaced = {}
+    for level, table in rollups.items():
+        kept = table[table.index < since]
+        replaced[level] = kept if fresh is None else pd.concat([kept, fresh[level]])
+    return replaced
+
+
+def level_for_span(start, end):
+    # Finest level that keeps a custom range to a few hundred points
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    if span <= pd.Timedelta(days=2):
+        return "10min"
+    if span <= pd.Timedelta(days=14):
+        return "hourly"
+    if span <= pd.Timedelta(days=93):
+        return "12h"
+    return "daily"
+
+
+def read_level(rollups, level, start, end, stat="mean"):
+    # Bins of one level in [start, end) with one stat per column, shaped like
+    # the raw data: a timestamp column followed by one column per reading
+    table = rollups[level]
+    window = time_index.window(table, start, end)
+    columns = value_columns(table)
+    out = window[[f"{col}_{stat}" for col in columns]]
+    out.columns = columns
+    return out.reset_index()
+
+
+def view_range(frame, date, end_date=None):
+    # (level, start, end) of one Historical view: a day of 10-minute bins, a
+    # week (Monday to Sunday) hourly, a month in 12-hour bins, or a custom
+    # [date, end_date] range at whichever level suits its span
+    if frame == "Daily":
+        start = pd.Timestamp(date)
+        return "10min", start, start + pd.Timedelta(days=1)
+    if frame == "Weekly":
+        start = pd.Timestamp(date - pd.Timedelta(days=date.weekday()))
+        return "hourly", start, start + pd.Timedelta(days=7)
+    if frame == "Monthly":
+        start = pd.Timestamp(year=date.year, month=date.month, day=1)
+        return "12h", start, start + pd.offsets.MonthBegin(1)
+    if frame == "Custom":
+        start = pd.Timestamp(date)
+        end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+        return level_for_span(start, end), start, end
+
+
+def read_view(rollups, frame, date, end_date=None, stat="mean"):
+    # The bins one Historical view shows
+    level, start, end = view_range(frame, date, end_date)
+    return read_level(rollups, level, start, end, stat)
+
+
+# On disk every save is a build directory of one Parquet file per level
+# plus the baselines, and current.json names the published build and the
+# raw store version (its mtime) it was built from:
+#   store/1_year_data_rollups/current.json
+#   store/1_year_data_rollups/build-k3j2x9/10min.parquet ...
+# The manifest is replaced last, in one rename, so a reader gets all the
+# levels of one build, never some new and some old.
+
+
+def rollup_path(level, build):
+    return os.path.join(build, f"{level}.parquet")
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def current_build(path):
+    manifest = read_manifest(path)
+    return os.path.join(path, manifest["build"]) if manifest else None
+
+
+def save_rollups(rollups, path, version=None):
+    # The baselines are refreshed with every save, so they always describe
+    # the same data as the levels. version: the raw store's mtime when the
+    # rows these tables were built from were read
+    os.makedirs(path, exist_ok=True)
+    build = tempfile.mkdtemp(prefix="build-", dir=path)
+    tables = dict(rollups, stats=stats.build_stats(rollups))
+    for level, table in tables.items():
+        table.to_parquet(rollup_path(level, build))
+    tmp = os.path.join(build, MANIFEST)
+    with open(tmp, "w") as f:
+        json.dump({"build": os.path.basename(build), "version": version}, f)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    _prune_builds(path, os.path.basename(build))
+
+
+def _prune_builds(path, current):
+    # The build before the current one stays for readers that read the old
+    # manifest just before the swap
+    builds = sorted((d for d in os.listdir(path) if d.startswith("build-")),
+                    key=lambda d: os.path.getmtime(os.path.join(path, d)))
+    for name in builds[:-KEEP_BUILDS]:
+        if name != current:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def load_rollups(path):
+    build = current_build(path)
+    return {level: pd.read_parquet(rollup_path(level, build)) for level in LEVELS}
+
+
+def load_stats(path):
+    return pd.read_parquet(rollup_path("stats", current_build(path)))
+
+
+def record_change(path, version, first, last):
+    # Logs that samples from first to last (inclusive) landed when the raw
+    # store reached `version` (its mtime), so a cache of views can keep the
+    # ones outside that span (query_cache.py). Only the newest MAX_CHANGES
+    # are kept.
+    change = [version, pd.Timestamp(first).value, pd.Timestamp(last).value]
+    changes = read_changes(path)[-(MAX_CHANGES - 1):] + [change]
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, CHANGES + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(changes, f)
+    os.replace(tmp, os.path.join(path, CHANGES))
+
+
+def read_changes(path):
+    # [[version, first in ns, last in ns], ...], oldest first
+    try:
+        with open(os.path.join(path, CHANGES)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def rollups_exist(path):
+    build = current_build(path)
+    return build is not None and all(os.path.exists(rollup_path(level, build)) for level in list(LEVELS) + ["stats"])
+
+
+def load_or_build(raw_store, path):
+    # Rebuild from the raw store only when it has changed since the build
+    # was made (the version in the manifest, not a file's mtime: a build
+    # being written is not published yet)
+    if not storage.store_exists(raw_store):
+        return None
+    version = storage.store_mtime(raw_store)
+    manifest = read_manifest(path)
+    if rollups_exist(path) and (manifest.get("version") or 0) >= version:
+        return load_rollups(path)
+    rollups = build_rollups(storage.read_store(raw_store))
+    save_rollups(rollups, path, version)
+    return rollups
+
+
+if __name__ == "__main__":
+    # python rollups.py store/1_year_data [store/1_year_data_rollups]
+    if len(sys.argv) < 2:
+        print("usage: python rollups.py <raw store> [rollup dir]")
+        sys.exit(1)
+    raw_store = sys.argv[1]
+    out = sys.argv[2] if len(sys.argv) > 2 else raw_store.rstrip("/") + "_rollups"
+    version = storage.store_mtime(raw_store)
+    tables = build_rollups(storage.read_store(raw_store))
+    save_rollups(tables, out, version)
+    for level, table in tables.items():
+        print(f"{level}: {len(table)} bins")
@@ -0,0 +1,248 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import rollups
+import storage
+
+# Append-only log for live samples, one directory per device:
+#   live/<device_id>/00000042.active   segment currently being written
+#   live/<device_id>/00000041.seg      closed, waiting for the compactor
+# Records are fixed-size binary rows (int64 ns timestamp + three float64
+# readings), so writing is a memcpy and reading is np.fromfile. Appends from
+# any thread are queued and a committer thread writes them as one group every
+# commit_interval with a single fsync, so the cost of durability is paid per
+# group, not per sample. Segments roll by size or age; a crash can only lose
+# the last uncommitted group, and a torn trailing record is cut off on reopen.
+#
+# The Compactor folds closed segments into the partitioned Parquet store and
+# refreshes the rollups for the days they touch, then deletes them. The
+# span of the samples folded in is logged with the store's new version, so
+# the dashboard's query cache drops only the views it affects.
+
+RECORD = np.dtype([
+    ("timestamp", "<i8"),
+    ("flow_rate", "<f8"),
+    ("temperature", "<f8"),
+    ("turbidity", "<f8"),
+])
+ACTIVE = ".active"
+CLOSED = ".seg"
+
+SEGMENT_BYTES = 16 * 1024 * 1024
+SEGMENT_SECONDS = 300
+COMMIT_INTERVAL = 0.2
+COMPACT_INTERVAL = 60
+
+# The sketch's turbidity score is what the historical data calls purity
+LIVE_TO_HISTORY = {"turbidity": "purity"}
+
+
+def _segment_number(name):
+    return int(name.split(".")[0])
+
+
+def list_segments(path, suffix=CLOSED):
+    if not os.path.isdir(path):
+        return []
+    names = sorted((f for f in os.listdir(path) if f.endswith(suffix)), key=_segment_number)
+    return [os.path.join(path, f) for f in names]
+
+
+def read_segment(path):
+    size = os.path.getsize(path)
+    records = np.fromfile(path, dtype=RECORD, count=size // RECORD.itemsize)
+    df = pd.DataFrame({name: records[name] for name in RECORD.names})
+    df["timestamp"] = df["timestamp"].values.view("datetime64[ns]")
+    return df
+
+
+class SegmentLog:
+    def __init__(self, path, segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS,
+                 commit_interval=COMMIT_INTERVAL):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.commit_interval = commit_interval
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._pending = []
+        self._appended_seq = 0
+        self._committed_seq = 0
+        self._write_lock = threading.Lock()
+        self.groups = 0
+        self.records = 0
+
+        # Anything left active by a previous process is closed as-is
+        for leftover in list_segments(path, ACTIVE):
+            self._close_file(leftover)
+        existing = list_segments(path, CLOSED)
+        self._next_segment = _segment_number(os.path.basename(existing[-1])) + 1 if existing else 1
+        self._file = None
+        self._file_path = None
+        self._opened_at = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"segment-log-{path}", daemon=True)
+        self._thread.start()
+
+    def append(self, timestamps, values, wait=False):
+        # Queue samples for the next group commit; wait=True blocks until
+        # they are on disk
+        timestamps = np.asarray(timestamps, dtype="datetime64[ns]")
+        if len(timestamps) == 0:
+            return
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), -1)
+        records = np.empty(len(timestamps), dtype=RECORD)
+        records["timestamp"] = timestamps.view("i8")
+        for i, name in enumerate(RECORD.names[1:]):
+            records[name] = values[:, i]
+        with self._lock:
+            self._pending.append(records)
+            self._appended_seq += 1
+            seq = self._appended_seq
+            if wait:
+                while self._committed_seq < seq:
+                    self._committed.wait()
+
+    def commit(self):
+        # Write and fsync everything queued so far as one group
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                seq = self._appended_seq
+            if pending:
+                if self._file is None:
+                    self._open_segment()
+                data = b"".join(records.tobytes() for records in pending)
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.groups += 1
+                self.records += sum(len(records) for records in pending)
+            with self._lock:
+                self._committed_seq = seq
+                self._committed.notify_all()
+            if self._file is not None:
+                too_big = self._file.tell() >= self.segment_bytes
+                too_old = time.monotonic() - self._opened_at >= self.segment_seconds
+                if too_big or too_old:
+                    self._roll()
+
+    def roll(self):
+        with self._write_lock:
+            if self._file is not None:
+                self._roll()
+
+    def _open_segment(self):
+        self._file_path = os.path.join(self.path, f"{self._next_segment:08d}{ACTIVE}")
+        self._next_segment += 1
+        self._file = open(self._file_path, "ab", buffering=0)
+        self._opened_at = time.monotonic()
+
+    def _roll(self):
+        self._file.close()
+        self._close_file(self._file_path)
+        self._file = None
+        self._file_path = None
+
+    def _close_file(self, path):
+        # Drop a torn trailing record, then publish the segment for compaction
+        size = os.path.getsize(path)
+        whole = size - size % RECORD.itemsize
+        if whole != size:
+            with open(path, "r+b") as f:
+                f.truncate(whole)
+        if whole == 0:
+            os.remove(path)
+            return
+        os.replace(path, path[: -len(ACTIVE)] + CLOSED)
+
+    def _run(self):
+        while not self._stop.wait(self.commit_interval):
+            self.commit()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.commit()
+        self.roll()
+
+    def tail(self):
+        # Everything not yet compacted: closed segments plus the active one
+        paths = list_segments(self.path, CLOSED) + list_segments(self.path, ACTIVE)
+        if not paths:
+            return pd.DataFrame(columns=RECORD.names)
+        return pd.concat([read_segment(p) for p in paths], ignore_index=True)
+
+
+class Compactor(threading.Thread):
+    def __init__(self, log_root, raw_store, rollup_dir, interval=COMPACT_INTERVAL):
+        super().__init__(name="segment-compactor", daemon=True)
+        self.log_root = log_root
+        self.raw_store = raw_store
+        self.rollup_dir = rollup_dir
+        self.interval = interval
+        self.compacted = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self.compact_once()
+
+    def closed_segments(self):
+        if not os.path.isdir(self.log_root):
+            return []
+        segments = []
+        for device_id in sorted(os.listdir(self.log_root)):
+            for path in list_segments(os.path.join(self.log_root, device_id), CLOSED):
+                segments.append((device_id, path))
+        return segments
+
+    def compact_once(self):
+        # Every step is idempotent (fixed file names in the store, rollups
+        # recomputed from the store), so a crash mid-way is repaired by the
+        # next run instead of double counting
+        segments = self.closed_segments()
+        if not segments:
+            return 0
+        first = last = None
+        for device_id, path in segments:
+            df = read_segment(path).rename(columns=LIVE_TO_HISTORY)
+            if df.empty:
+                continue
+            # Segment numbers start again at 1 once a restarted log finds its
+            # directory empty, so the first sample's time keeps the name
+            # unique; it is still fixed per segment, so a repeat overwrites
+            name = os.path.basename(path)[: -len(CLOSED)]
+            stamp = df["timestamp"].iloc[0].value
+            storage.write_partitions(df, self.raw_store, basename=f"live-{device_id}-{stamp}-{name}-{{i}}.parquet")
+            first = df["timestamp"].min() if first is None else min(first, df["timestamp"].min())
+            last = df["timestamp"].max() if last is None else max(last, df["timestamp"].max())
+
+        if first is not None:
+            # The app follows the version in the rollup manifest, so the
+            # change is logged first and the manifest published last: a
+            # rerun meanwhile still sees the previous version throughout
+            version = storage.store_mtime(self.raw_store)
+            rollups.record_change(self.rollup_dir, version, first, last)
+            if rollups.rollups_exist(self.rollup_dir):
+                since = first.floor("D")
+                recent = storage.read_store(self.raw_store, start=since)
+                tables = rollups.replace_since(rollups.load_rollups(self.rollup_dir), recent, since)
+                rollups.save_rollups(tables, self.rollup_dir, version)
+            else:
+                rollups.load_or_build(self.raw_store, self.rollup_dir)
+
+        for _, path in segments:
+            os.remove(path)
+        self.compacted += len(segments)
+        return len(segments)
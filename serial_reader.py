@@ -0,0 +1,127 @@
+import queue
+import threading
+
+import serial
+from serial.serialutil import SerialException
+
+# Background reader for the Bluetooth serial link.
+# A dedicated thread does blocking readline() calls with a timeout (no busy
+# spinning) and hands raw lines to a bounded queue. The dashboard drains the
+# queue in batches at its own redraw rate, so ingestion is never held back by
+# chart updates and a slow UI can't make memory grow without limit.
+# With raw=True the thread queues byte chunks as they arrive instead of
+# lines, for the framed binary format (wire.Decoder reassembles them). A
+# dropped chunk would cut frames in half, so raw mode only blocks; bytes the
+# OS buffer loses meanwhile show up as wire.Decoder's frames_lost.
+
+DEFAULT_PORT = "/dev/rfcomm0"
+BAUDRATE = 9600
+READ_TIMEOUT = 0.5      # seconds a readline() may block before re-checking stop
+RECONNECT_DELAY = 2.0   # seconds between attempts when the port is unavailable
+MAX_LINE = 1024
+
+# What to do with a new line when the queue is full:
+#   drop_oldest - discard the oldest queued line (live view stays current)
+#   drop_newest - discard the incoming line
+#   block       - wait for the consumer (backpressure into the OS buffer)
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+def open_port(port=DEFAULT_PORT, baudrate=BAUDRATE, timeout=READ_TIMEOUT):
+    print("Attempting connection to: ", port)
+    try:
+        connection = serial.Serial(port=port, baudrate=baudrate, timeout=timeout, parity=serial.PARITY_EVEN, stopbits=1)
+        print("Connection Successful!")
+        return connection
+    except (SerialException, OSError) as e:
+        print("Connection Failed :", e)
+        return None
+
+
+class SerialReader(threading.Thread):
+    def __init__(self, port=DEFAULT_PORT, baudrate=BAUDRATE, maxsize=10000, overflow=None,
+                 timeout=READ_TIMEOUT, opener=open_port, raw=False):
+        # Default: drop_oldest for lines, block for raw chunks
+        if overflow is None:
+            overflow = "block" if raw else "drop_oldest"
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        if raw and overflow != "block":
+            raise ValueError(f"raw chunks can't be dropped without cutting frames; use overflow='block', got {overflow!r}")
+        super().__init__(name=f"serial-reader-{port}", daemon=True)
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.opener = opener
+        self.raw = raw
+        self.connected = False
+        self.received = 0
+        self.dropped = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _put(self, line):
+        if self.overflow == "block":
+            while not self._stop_event.is_set():
+                try:
+                    self.queue.put(line, timeout=self.timeout)
+                    return
+                except queue.Full:
+                    continue
+            return
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+            if self.overflow == "drop_oldest":
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self.queue.put_nowait(line)
+
+    def run(self):
+        connection = None
+        while not self._stop_event.is_set():
+            if connection is None:
+                connection = self.opener(self.port, self.baudrate, self.timeout)
+                self.connected = connection is not None
+                if connection is None:
+                    self._stop_event.wait(RECONNECT_DELAY)
+                    continue
+            try:
+                if self.raw:
+                    # Whatever has arrived, or block up to `timeout` for one byte
+                    data = connection.read(connection.in_waiting or 1)
+                else:
+                    # Blocks for up to `timeout` seconds waiting for a full line
+                    data = connection.readline(MAX_LINE)
+            except (SerialException, OSError) as e:
+                print(f"SerialException: {e}")
+                connection.close()
+                connection = None
+                self.connected = False
+                continue
+            if data:
+                self.received += 1
+                self._put(data if self.raw else data.decode("utf-8", errors="ignore"))
+        if connection is not None:
+            connection.close()
+        self.connected = False
+
+    def drain(self, max_items=None):
+        # Everything queued right now (up to max_items), without waiting
+        lines = []
+        while max_items is None or len(lines) < max_items:
+            try:
+                lines.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return lines
+
+    def depth(self):
+        return self.queue.qsize()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Baselines for the Historical tab, computed once over the whole history and
+# stored with the rollups (stats.parquet next to the levels).
+#
+# Volume is integrated, not estimated: every raw sample's flow (L/min) is
+# multiplied by the time until the next sample, so the rollups carry a
+# volume_l column whose _sum is the litres used in each bin. Gaps longer
+# than MAX_GAP_SAMPLES sampling periods (meter offline) count as one period.
+#
+# build_stats() turns the daily rollup into one row per time frame (Daily,
+# Weekly, Monthly): the mean and percentiles, across every complete period
+# of that length, of each reading's period mean and of the period's volume.
+
+VOLUME = "volume_l"
+READINGS = ["flow_rate", "temperature", "purity"]
+PERCENTILES = [10, 50, 90]
+MAX_GAP_SAMPLES = 5
+FRAMES = {
+    "Daily": "D",
+    "Weekly": "W-SUN",    # weeks run Monday to Sunday, like the Weekly view
+    "Monthly": "ME",      # month end; plain "M" is deprecated since pandas 2.2
+}
+
+
+def sample_volume(timestamps, flow_rate):
+    # Litres per sample: flow (L/min) times minutes until the next sample.
+    # The last sample, and any gap longer than MAX_GAP_SAMPLES typical
+    # periods, gets one typical period.
+    ns = np.asarray(timestamps, dtype="datetime64[ns]").view("i8")
+    flow = np.asarray(flow_rate, dtype=np.float64)
+    if len(ns) == 0:
+        return np.empty(0)
+    if len(ns) == 1:
+        return np.zeros(1)
+    dt = np.diff(ns)
+    period = np.median(dt)
+    dt = np.where(dt > MAX_GAP_SAMPLES * period, period, dt)
+    minutes = np.append(dt, period) / 60e9
+    return np.nan_to_num(flow) * minutes
+
+
+def with_volume(df):
+    if "flow_rate" not in df.columns or VOLUME in df.columns:
+        return df
+    return df.assign(**{VOLUME: sample_volume(df["timestamp"].values, df["flow_rate"].values)})
+
+
+def _complete_periods(daily, count_column, freq):
+    # Roll days up to periods, keeping only whole ones: a day needs most of
+    # a typical day's samples, a week or month all of its days
+    counts = daily[count_column]
+    daily = daily[counts >= 0.9 * counts.median()]
+    if freq == "D":
+        return daily
+    sums = daily.resample(freq).sum(min_count=1)
+    days = counts.reindex(daily.index).resample(freq).size()
+    period_days = sums.index.days_in_month if freq == "ME" else 7
+    return sums[days.to_numpy() == period_days]
+
+
+def build_stats(rollups):
+    daily = rollups["daily"]
+    readings = [c for c in READINGS if f"{c}_sum" in daily.columns]
+    columns = [f"{c}_{s}" for c in readings for s in ("sum", "count")] + [f"{VOLUME}_sum"]
+    daily = daily[[c for c in columns if c in daily.columns]]
+
+    rows = {}
+    for frame, freq in FRAMES.items():
+        periods = _complete_periods(daily, f"{readings[0]}_count", freq)
+        values = {c: periods[f"{c}_sum"] / periods[f"{c}_count"].where(periods[f"{c}_count"] > 0) for c in readings}
+        if f"{VOLUME}_sum" in periods.columns:
+            values[VOLUME] = periods[f"{VOLUME}_sum"]
+        row = {"periods": len(periods)}
+        for name, series in values.items():
+            series = series.dropna().to_numpy()
+            row[f"{name}_mean"] = series.mean() if len(series) else np.nan
+            for p, v in zip(PERCENTILES, np.percentile(series, PERCENTILES) if len(series) else [np.nan] * len(PERCENTILES)):
+                row[f"{name}_p{p}"] = v
+        rows[frame] = row
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    table.index.name = "frame"
+    return table
@@ -0,0 +1,224 @@
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Columnar store for sensor history.
+# A CSV is converted once (again only when the CSV changes; source.json in
+# the store records which version it came from) into Parquet files
+# partitioned by month:
+#   store/<name>/year=YYYY/month=MM/part-*.parquet
+# and read back with column pruning (only the columns asked for are decoded)
+# and partition pruning (only the months overlapping [start, end) are opened).
+
+STORE_DIR = "store"
+CSV_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHUNK_ROWS = 1_000_000
+SOURCE_FILE = "source.json"
+
+
+def store_path(name):
+    return os.path.join(STORE_DIR, name)
+
+
+def store_exists(path):
+    return os.path.isdir(path) and any(p.startswith("year=") for p in os.listdir(path))
+
+
+def _typed_table(df):
+    # Fixed column types: ns timestamps, int64/float64 numbers, dictionary-encoded strings
+    fields = []
+    for col in df.columns:
+        if col == "timestamp":
+            fields.append(pa.field(col, pa.timestamp("ns")))
+        elif pd.api.types.is_integer_dtype(df[col]):
+            fields.append(pa.field(col, pa.int64()))
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+def write_partitions(df, path, basename="part-{i}.parquet"):
+    # Write a frame into the year=/month= layout, one file per touched month.
+    # Existing files with the same basename in those months are replaced.
+    # The keys are only in the directory names, not columns of the files, so
+    # a data column of the same name (data_factory's month) is kept as it is.
+    if df.empty:
+        return
+    table = _typed_table(df)
+    timestamps = df["timestamp"]
+    months = df.groupby([timestamps.dt.year, timestamps.dt.month], sort=True).indices
+    for (year, month), rows in months.items():
+        part_dir = os.path.join(path, f"year={year}", f"month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        pq.write_table(table.take(rows), os.path.join(part_dir, basename.replace("{i}", "0")))
+
+
+def convert_csv(csv_file, path, timestamp_format=CSV_TIMESTAMP_FORMAT, chunk_rows=CHUNK_ROWS):
+    # Conversion of a raw CSV into the partitioned store, on first use and
+    # again whenever the CSV is replaced (needs_conversion).
+    # The CSV is read in chunks so the conversion itself never holds the whole file.
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunk_rows)):
+        chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], format=timestamp_format)
+        write_partitions(chunk, tmp_path, basename=f"part-{i:05d}-{{i}}.parquet")
+        rows += len(chunk)
+
+    # Samples the live log compacted into the old store (live-*.parquet,
+    # segment_log.py) are not in the CSV; they move over to the new one
+    if os.path.exists(path):
+        for year, month, part_dir in list_partitions(path):
+            live = [f for f in os.listdir(part_dir) if f.startswith("live-")]
+            if live:
+                target = os.path.join(tmp_path, f"year={year}", f"month={month}")
+                os.makedirs(target, exist_ok=True)
+                for f in live:
+                    shutil.copy2(os.path.join(part_dir, f), os.path.join(target, f))
+
+    # Which CSV the store was made from, for needs_conversion
+    with open(os.path.join(tmp_path, SOURCE_FILE), "w") as f:
+        json.dump({"csv": os.path.abspath(csv_file), "mtime": os.path.getmtime(csv_file)}, f)
+
+    # Swap the finished store in place so readers never see a half-written one
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def needs_conversion(csv_file, path):
+    # The store is missing, or was converted from an older version of the
+    # CSV (a different mtime, so a file copied in with its old mtime counts)
+    if not os.path.exists(csv_file):
+        return False
+    if not store_exists(path):
+        return True
+    try:
+        with open(os.path.join(path, SOURCE_FILE)) as f:
+            return json.load(f)["mtime"] != os.path.getmtime(csv_file)
+    except FileNotFoundError:
+        # Converted before the source was recorded
+        return os.path.getmtime(csv_file) > os.path.getmtime(path)
+
+
+def load_or_convert(csv_file, path, columns=None, start=None, end=None, timestamp_format=CSV_TIMESTAMP_FORMAT):
+    # Read from the store, converting the CSV first if the store is missing
+    # or older than the CSV. Returns None when neither exists.
+    if os.path.exists(csv_file):
+        if needs_conversion(csv_file, path):
+            convert_csv(csv_file, path, timestamp_format=timestamp_format)
+    elif not store_exists(path):
+        return None
+    return read_store(path, columns=columns, start=start, end=end)
+
+
+def store_mtime(path):
+    # Latest modification across the store; adding a file to a month
+    # directory bumps that directory's mtime
+    return max([os.path.getmtime(path)] + [os.path.getmtime(d) for _, _, d in list_partitions(path)])
+
+
+def list_partitions(path):
+    # [(year, month, directory), ...] in chronological order
+    parts = []
+    for year_dir in os.listdir(path):
+        if not year_dir.startswith("year="):
+            continue
+        for month_dir in os.listdir(os.path.join(path, year_dir)):
+            if not month_dir.startswith("month="):
+                continue
+            year = int(year_dir.split("=")[1])
+            month = int(month_dir.split("=")[1])
+            parts.append((year, month, os.path.join(path, year_dir, month_dir)))
+    parts.sort()
+    return parts
+
+
+def _file_bounds(file):
+    # (min, max) timestamp of one file from its row-group statistics, or
+    # from the column itself when the writer left none
+    metadata = pq.ParquetFile(file).metadata
+    column = metadata.schema.to_arrow_schema().get_field_index("timestamp")
+    lows, highs = [], []
+    for i in range(metadata.num_row_groups):
+        statistics = metadata.row_group(i).column(column).statistics
+        if statistics is None or not statistics.has_min_max:
+            timestamps = pq.read_table(file, columns=["timestamp"]).column(0).to_pandas()
+            return timestamps.min(), timestamps.max()
+        lows.append(pd.Timestamp(statistics.min))
+        highs.append(pd.Timestamp(statistics.max))
+    return min(lows, default=None), max(highs, default=None)
+
+
+def time_bounds(path):
+    # First and last timestamp in the store, from the Parquet footers of
+    # the first and last month only; no data pages are read
+    parts = list_partitions(path)
+    if not parts:
+        return None, None
+    bounds = []
+    for _, _, part_dir in (parts[0], parts[-1]):
+        bounds.extend(_file_bounds(os.path.join(part_dir, f)) for f in os.listdir(part_dir) if f.endswith(".parquet"))
+    lows = [low for low, _ in bounds if low is not None]
+    highs = [high for _, high in bounds if high is not None]
+    return min(lows, default=None), max(highs, default=None)
+
+
+def read_store(path, columns=None, start=None, end=None):
+    # Read [start, end) from the store; either bound may be None.
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    files = []
+    for year, month, part_dir in list_partitions(path):
+        month_start = pd.Timestamp(year=year, month=month, day=1)
+        month_end = month_start + pd.offsets.MonthBegin(1)
+        if start is not None and month_end <= start:
+            continue
+        if end is not None and month_start >= end:
+            continue
+        files.extend(
+            os.path.join(part_dir, f) for f in sorted(os.listdir(part_dir)) if f.endswith(".parquet")
+        )
+
+    if columns is not None and "timestamp" not in columns:
+        columns = ["timestamp"] + list(columns)
+
+    if not files:
+        return pd.DataFrame(columns=columns or ["timestamp"])
+
+    row_filter = None
+    if start is not None:
+        row_filter = ds.field("timestamp") >= pa.scalar(start.value, pa.timestamp("ns"))
+    if end is not None:
+        end_filter = ds.field("timestamp") < pa.scalar(end.value, pa.timestamp("ns"))
+        row_filter = end_filter if row_filter is None else row_filter & end_filter
+
+    dataset = ds.dataset(files, format="parquet")
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    df = table.to_pandas()
+    df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    return df
+
+
+if __name__ == "__main__":
+    # python storage.py 1_year_data.csv [store/1_year_data] [timestamp format]
+    if len(sys.argv) < 2:
+        print("usage: python storage.py <csv file> [store path] [timestamp format]")
+        sys.exit(1)
+    csv_file = sys.argv[1]
+    out = sys.argv[2] if len(sys.argv) > 2 else store_path(os.path.splitext(os.path.basename(csv_file))[0])
+    fmt = sys.argv[3] if len(sys.argv) > 3 else CSV_TIMESTAMP_FORMAT
+    n = convert_csv(csv_file, out, timestamp_format=fmt)
+    print(f"Converted {n} rows from {csv_file} into {out}")
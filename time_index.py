@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# Time-range slicing on frames sorted by time.
+# The timestamps are viewed as int64 epoch nanoseconds and bisected with
+# searchsorted, so a [start, end) window costs O(log n) and comes back as a
+# positional slice of the original frame (no mask, no copy of the data).
+
+
+def epoch_ns(df):
+    # int64 nanoseconds since the epoch, taken from the DatetimeIndex if the
+    # frame has one, otherwise from its timestamp column (a view, not a copy)
+    times = df.index if isinstance(df.index, pd.DatetimeIndex) else df["timestamp"]
+    return np.asarray(times.values, dtype="datetime64[ns]").view("i8")
+
+
+def ensure_sorted(df):
+    times = df.index if isinstance(df.index, pd.DatetimeIndex) else df["timestamp"]
+    if times.is_monotonic_increasing:
+        return df
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.sort_index(kind="stable")
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def window_bounds(df, start=None, end=None):
+    times = epoch_ns(df)
+    lo = 0 if start is None else int(np.searchsorted(times, pd.Timestamp(start).value, side="left"))
+    hi = len(times) if end is None else int(np.searchsorted(times, pd.Timestamp(end).value, side="left"))
+    return lo, max(lo, hi)
+
+
+def window(df, start=None, end=None):
+    # Rows with start <= time < end; either bound may be None
+    lo, hi = window_bounds(df, start, end)
+    return df.iloc[lo:hi]